@@ -1,160 +1,147 @@
+from typing import Dict
+
 from aiogram import F
 from aiogram.dispatcher.router import Router
 from aiogram.exceptions import TelegramBadRequest
-from aiogram.types import CallbackQuery
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
 from loguru import logger
+from sqlalchemy.orm import selectinload
 
 import bot.application_form.dao
-from bot.admins.keyboards.inline_kb import approve_admin_keyboard
 from bot.application_form.dao import ApplicationDAO
-from bot.application_form.models import ApplicationStatus
-from bot.config import bot
-from bot.database import connection
+from bot.application_form.models import Application, ApplicationStatus
+from bot.application_form.render import RenderedCard, card_renderer
+from bot.config import bot, redis_client, settings, storage
+from bot.utils.edit_digest import edit_digests
+from bot.utils.fan_out import FanOutResult, fan_out
+from bot.utils.idempotency import release_press
 
 admin_router = Router()
 
 
-@admin_router.callback_query(F.data.startswith("approve_admin_"))
-@connection()
+async def edit_admin_cards(
+    admin_message_ids: Dict[str, int], card: RenderedCard
+) -> FanOutResult:
+    """
+    Одновременно обновляет карточку заявки у всех администраторов.
+
+    Args:
+        admin_message_ids (Dict[str, int]): Словарь admin_id → message_id карточки.
+        card (RenderedCard): Новая карточка (текст и клавиатура).
+
+    Returns:
+        FanOutResult: Результаты и ошибки редактирования по каждому администратору.
+    """
+
+    async def edit_card(admin_id: str) -> bool:
+        # Повторное нажатие с тем же результатом не доходит до Telegram
+        return await edit_digests.edit_text(
+            admin_id,
+            admin_message_ids[admin_id],
+            card.text,
+            reply_markup=card.reply_markup,
+        )
+
+    return await fan_out(
+        admin_message_ids, edit_card, concurrency=settings.FAN_OUT_CONCURRENCY
+    )
+
+
+# Решение администратора: статус заявки и значок статуса в сообщении пользователю
+ADMIN_DECISIONS = {
+    True: (ApplicationStatus.APPROVED, "🟢"),
+    False: (ApplicationStatus.REJECTED, "🔴"),
+}
+
+
+@admin_router.callback_query(
+    F.data.startswith("approve_admin_"), flags={"idempotent": True}
+)
 async def admin_application_callback(call: CallbackQuery, session) -> None:
-    """ """
+    """
+    Обрабатывает решение администратора по заявке: меняет статус, обновляет
+    карточку у всех администраторов и сообщает пользователю новый статус.
+    """
     try:
-        await call.answer(text="Проверяю ввод", show_alert=False)
-
         approve_inf = call.data.replace("approve_admin_", "").split("_")
         user_id = int(approve_inf[1])
-        print(user_id)
         application_id = int(approve_inf[2])
-        print(application_id)
-        approve_inf = approve_inf[0]
-        print(approve_inf)
-        approve_inf = True if approve_inf == "True" else False
-        # await call.message.edit_reply_markup(reply_markup=None)
-        if approve_inf:
-            await ApplicationDAO.update(
-                session=session,
-                filters={"id": application_id},
-                values={"status": ApplicationStatus("Принято")},
-            )
-            application = await ApplicationDAO.find_one_or_none_by_id(
-                data_id=application_id, session=session
-            )
-            response_message: str = f"Заявка № {application_id}\n\nСтатус заявки: 🟢 {application.status.value}\n\n"
-            if application.owner is not None:
-                response_message += (
-                    "Собственные счета - ДА\n\n"
-                    if application.owner
-                    else "Собственные счета - Нет\n\n"
-                )
-            if not application.owner and application.owner is not None and application.can_contact is not None:
-                response_message += (
-                    "Может связаться с собственником счета - ДА\n\n"
-                    if application.can_contact
-                    else "Может связаться с собственником счета - Нет\n\n"
-                )
-            # Добавляем задолженности по банкам, если они есть
-            if application.text_application:
-                response_message += f"Ваш вопрос:\n{application.text_application}"
-            if application.debts:
-                response_message += "Задолженности по банкам:\n"
-                for debt in application.debts:
-                    response_message += f"🔸 Банк: <b>{debt.bank_name}</b>, Сумма задолженности: <b>{debt.total_amount}</b> руб.\n"
-
-            response_message += f"\n\n <b>{application.user.phone_number}</b> \n\n"
-            response_message += "\n\n Берете заявку в работу?"
-            # Десериализуем JSON-строку в словарь
-            admin_message_ids = application.admin_message_ids
-            if admin_message_ids:
-                for admin_id, msg_id in admin_message_ids.items():
-                    try:
-                        await bot.edit_message_text(
-                            chat_id=admin_id,
-                            message_id=msg_id,
-                            text=response_message,
-                            reply_markup=approve_admin_keyboard(
-                                "Берем", "Отказ", user_id, application_id
-                            ),
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при обновлении сообщения у админа {admin_id}: {e}"
-                        )
-
-            # await call.message.edit_text(response_message,
-            #                              reply_markup=approve_admin_keyboard('Берем', 'Отказ', user_id, application_id))
-
-            # await bot.send_message(
-            #     chat_id=call.from_user.id,
-            #     text="Вот ты что-то выбрал как админ а у пользователя ничего",
-            # )
-            await bot.send_message(
-                chat_id=user_id,
-                text=f"Статус заказа № {application_id} поменялcя на 🟢 {application.status.value}",
-            )
-        else:
-            await ApplicationDAO.update(
-                session=session,
-                filters={"id": application_id},
-                values={"status": ApplicationStatus("Отклонено")},
-            )
-            application = await ApplicationDAO.find_one_or_none_by_id(
-                data_id=application_id, session=session
-            )
-            response_message: str = f"Заявка № {application_id}\n\nСтатус заявки: 🔴 {application.status.value}\n\n"
-            if application.owner is not None:
-                response_message += (
-                    "Собственные счета - ДА\n\n"
-                    if application.owner
-                    else "Собственные счета - Нет\n\n"
-                )
-            if not application.owner and application.owner is not None and application.can_contact is not None:
-                response_message += (
-                    "Может связаться с собственником счета - ДА\n\n"
-                    if application.can_contact
-                    else "Может связаться с собственником счета - Нет\n\n"
-                )
-            if application.text_application:
-                response_message += f"Ваш вопрос:\n{application.text_application}"
-            # Добавляем задолженности по банкам, если они есть
-            if application.debts:
-                response_message += "Задолженности по банкам:\n"
-                for debt in application.debts:
-                    response_message += f"🔸 Банк: <b>{debt.bank_name}</b>, Сумма задолженности: <b>{debt.total_amount}</b> руб.\n"
-            response_message += f"\n\n <b>{application.user.phone_number}</b> \n\n"
-            response_message += "\n\n Берете заявку в работу?"
-
-            admin_message_ids = application.admin_message_ids
-            if admin_message_ids:
-                for admin_id, msg_id in admin_message_ids.items():
-                    try:
-                        await bot.edit_message_text(
-                            chat_id=admin_id,
-                            message_id=msg_id,
-                            text=response_message,
-                            reply_markup=approve_admin_keyboard(
-                                "Берем", "Отказ", user_id, application_id
-                            ),
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка при обновлении сообщения у админа {admin_id}: {e}"
-                        )
-
-            # await call.message.edit_text(response_message,
-            #                              reply_markup=approve_admin_keyboard('Берем', 'Отказ', user_id, application_id))
-            # await bot.send_message(
-            #     chat_id=call.from_user.id,
-            #     text="Вот ты чтото выбрал как админ а у пользователя ничего",
-            # )
-            await bot.send_message(
-                chat_id=user_id,
-                text=f"Статус заказа № {application_id} поменялcя на 🔴 {application.status.value} ",
+        approved = approve_inf[0] == "True"
+        logger.debug(
+            f"Решение по заявке {application_id} пользователя {user_id}: {approved}"
+        )
+        status, status_icon = ADMIN_DECISIONS[approved]
+
+        # Меняем статус и сразу получаем заявку для карточки (UPDATE ... RETURNING)
+        updated = await ApplicationDAO.update_returning(
+            session=session,
+            filters={"id": application_id},
+            values={"status": status},
+            options=(
+                selectinload(Application.user),
+                selectinload(Application.debts),
+            ),
+        )
+        if not updated:
+            # Заявку успели удалить
+            await call.answer(
+                text=f"Заявка № {application_id} не найдена", show_alert=True
             )
+            return
+        await call.answer(text="Проверяю ввод", show_alert=False)
+        application = updated[0]
+
+        # Карточка одна на всех администраторов
+        card = card_renderer.admin_card(application)
+        admin_message_ids = application.admin_message_ids
+        if admin_message_ids:
+            await edit_admin_cards(admin_message_ids, card)
+
+        await bot.send_message(
+            chat_id=user_id,
+            text=f"Статус заказа № {application_id} поменялcя на {status_icon} {application.status.value}",
+        )
 
     except TelegramBadRequest:
         # Это срабатывает, если сообщение не было изменено (например, текст остался таким же)
-        pass
+        await release_press(redis_client, call)
     except Exception as e:
         # Логируем ошибку
         logger.error(f"Ошибка при обработке запроса: {e}")
+        # Даем нажать кнопку снова
+        await release_press(redis_client, call)
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
+
+
+@admin_router.message(Command("fsm_report"), F.from_user.id.in_(settings.ADMIN_IDS))
+async def fsm_report(message: Message) -> None:
+    """
+    Обрабатывает команду /fsm_report: показывает, сколько пользователей находится в
+    каждом состоянии FSM и сколько памяти Redis занимают их данные.
+
+    Аргументы:
+        message (Message): Сообщение администратора с командой.
+    """
+    try:
+        report = await storage.backend.memory_report()
+        if not report:
+            await message.answer("Данных FSM в Redis нет.")
+            return
+
+        lines = ["<b>FSM в Redis</b>\n"]
+        total_count, total_size = 0, 0
+        for state, (count, size) in sorted(
+            report.items(), key=lambda item: item[1][1], reverse=True
+        ):
+            lines.append(
+                f"🔸 {state or 'без состояния'}: {count} польз., {size / 1024:.1f} КБ"
+            )
+            total_count += count
+            total_size += size
+        lines.append(f"\nВсего: {total_count} польз., {total_size / 1024:.1f} КБ")
+        await message.answer("\n".join(lines))
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /fsm_report: {e}")
+        await message.answer("Не удалось собрать отчет по FSM. Попробуйте позже.")
@@ -1,11 +1,17 @@
+from typing import List, Optional, Sequence, Tuple
+
 from sqlalchemy import delete as sqlalchemy_delete
+from sqlalchemy import insert
 from sqlalchemy import update as sqlalchemy_update
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql.base import ExecutableOption
 
 from bot.application_form.models import Application, BankDebt, Photo, Video
 from bot.config import logger
 from bot.dao.base import BaseDAO, T
+from bot.users.models import User
 
 
 class ApplicationDAO(BaseDAO[Application]):
@@ -53,10 +59,9 @@ class ApplicationDAO(BaseDAO[Application]):
         new_instance = cls.model(**values_dict)
         session.add(new_instance)
         try:
-            await session.commit()
+            await session.flush()
             logger.info(f"Запись {cls.model.__name__} успешно добавлена.")
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при добавлении записи: {e}")
             raise e
         return new_instance
@@ -82,11 +87,9 @@ class ApplicationDAO(BaseDAO[Application]):
         query = sqlalchemy_delete(cls.model).filter_by(**filter_dict)
         try:
             result = await session.execute(query)
-            await session.commit()
             logger.info(f"Удалено {result.rowcount} записей.")
             return result.rowcount
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при удалении записей: {e}")
             raise e
 
@@ -98,9 +101,11 @@ class ApplicationDAO(BaseDAO[Application]):
 
         Этот метод используется для массового обновления записей в базе данных
         на основе фильтров, предоставленных в виде словаря, и установки новых значений для выбранных столбцов.
+        Выполняется один `UPDATE` без синхронизации сессии: уже загруженные заявки
+        не обновляются, новые значения возвращает `update_returning`.
 
         Аргументы:
-            session (AsyncSession): Сессия для взаимодействия с базой данных. Используется для выполнения запросов и коммитов.
+            session (AsyncSession): Сессия для взаимодействия с базой данных. Используется для выполнения запросов, фиксирует изменения `DbSessionMiddleware`.
             filters (dict): Словарь, содержащий фильтры, по которым будут обновляться записи.
                             Пример: {'status': 'pending', 'user_id': 123}.
             values (dict): Словарь, содержащий новые значения, которые будут применены к записям,
@@ -110,8 +115,8 @@ class ApplicationDAO(BaseDAO[Application]):
             int: Количество обновленных записей, если операция успешна.
 
         Исключения:
-            SQLAlchemyError: Если произошла ошибка при обновлении записи, операция откатывается,
-                             и ошибка будет залогирована и передана выше.
+            SQLAlchemyError: Если произошла ошибка при обновлении записи, ошибка будет залогирована
+                             и передана выше (транзакцию апдейта откатывает `DbSessionMiddleware`).
         """
         filter_dict = filters
         values_dict = values
@@ -128,23 +133,140 @@ class ApplicationDAO(BaseDAO[Application]):
             )  # Применяем фильтры
             .values(**values_dict)  # Устанавливаем новые значения
             .execution_options(
-                synchronize_session="fetch"
-            )  # Обновляем с синхронизацией сессии
+                synchronize_session=False
+            )  # Без SELECT для синхронизации сессии
         )
 
         try:
-            # Выполняем запрос и коммитим изменения
+            # Выполняем запрос, фиксация — в конце обработки апдейта
             result = await session.execute(query)
-            await session.commit()
             logger.info(f"Обновлено {result.rowcount} записей.")
             return result.rowcount
 
         except SQLAlchemyError as e:
-            # В случае ошибки откатываем транзакцию и логируем ошибку
-            await session.rollback()
+            # В случае ошибки логируем её, откат выполнит DbSessionMiddleware
             logger.error(f"Ошибка при обновлении записей: {e}")
             raise e
 
+    @classmethod
+    async def update_returning(
+        cls,
+        session: AsyncSession,
+        filters: dict,
+        values: dict,
+        options: Sequence[ExecutableOption] = (),
+    ) -> List[Application]:
+        """
+        Обновляет заявки по фильтрам и возвращает их обновленными одним `UPDATE ... RETURNING`.
+
+        Аргументы:
+            session (AsyncSession): Сессия для взаимодействия с базой данных.
+            filters (dict): Фильтры, например {'id': 15}.
+            values (dict): Новые значения, например {'status': ApplicationStatus.APPROVED}.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (selectinload).
+
+        Возвращает:
+            List[Application]: Обновленные заявки.
+        """
+        return await cls._update_returning(session, filters, values, options)
+
+    @classmethod
+    async def create_with_children(
+        cls,
+        session: AsyncSession,
+        values: dict,
+        photos: Optional[List[str]] = None,
+        videos: Optional[List[str]] = None,
+        debts: Optional[List[Tuple[str, float]]] = None,
+    ) -> Application:
+        """
+        Создает заявку вместе с фотографиями, видео и задолженностями.
+
+        Заявка вставляется одним `INSERT ... RETURNING`, а дочерние записи каждого
+        типа — одним многострочным INSERT (executemany). Вместо 1 + N запросов
+        (по запросу на каждое фото, видео и банк) выполняется не больше четырех,
+        все в транзакции текущего апдейта.
+
+        Аргументы:
+            session (AsyncSession): Сессия для взаимодействия с базой данных.
+            values (dict): Значения полей заявки (user_id, status, owner, can_contact...).
+            photos (Optional[List[str]]): file_id фотографий.
+            videos (Optional[List[str]]): file_id видео.
+            debts (Optional[List[Tuple[str, float]]]): Пары (название банка, сумма задолженности).
+
+        Возвращает:
+            Application: Созданная заявка.
+        """
+        photos = photos or []
+        videos = videos or []
+        debts = debts or []
+        logger.info(
+            f"Создание заявки с параметрами: {values}, фото: {len(photos)}, "
+            f"видео: {len(videos)}, банков: {len(debts)}"
+        )
+        try:
+            application: Application = await session.scalar(
+                insert(Application).values(**values).returning(Application)
+            )
+            children = [
+                (Photo, [{"file_id": file_id} for file_id in photos]),
+                (Video, [{"file_id": file_id} for file_id in videos]),
+                (
+                    BankDebt,
+                    [
+                        {"bank_name": bank, "total_amount": amount}
+                        for bank, amount in debts
+                    ],
+                ),
+            ]
+            for model, rows in children:
+                if rows:
+                    for row in rows:
+                        row["application_id"] = application.id
+                    await session.execute(insert(model), rows)
+            logger.info(f"Заявка {application.id} создана.")
+            return application
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при создании заявки: {e}")
+            raise e
+
+    @classmethod
+    async def last_for_user(
+        cls,
+        session: AsyncSession,
+        telegram_id: int,
+        options: Sequence[ExecutableOption] = (),
+    ) -> Optional[Application]:
+        """
+        Возвращает последнюю заявку пользователя по его telegram_id.
+
+        Выбирается одна строка (ORDER BY id DESC LIMIT 1), без загрузки остальных
+        заявок пользователя. Нужные связи передаются через `options`.
+
+        Аргументы:
+            session (AsyncSession): Сессия для взаимодействия с базой данных.
+            telegram_id (int): Telegram ID пользователя.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
+
+        Возвращает:
+            Optional[Application]: Последняя заявка или None, если заявок нет.
+        """
+        logger.info(f"Поиск последней заявки пользователя {telegram_id}")
+        query = (
+            select(cls.model)
+            .join(User, cls.model.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+            .order_by(cls.model.id.desc())
+            .limit(1)
+            .options(*options)
+        )
+        try:
+            result = await session.execute(query)
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске последней заявки пользователя: {e}")
+            raise e
+
 
 class PhotoDAO(BaseDAO[Photo]):
     """
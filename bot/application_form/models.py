@@ -1,7 +1,7 @@
 from enum import Enum as PyEnum
 from typing import Dict, Optional
 
-from sqlalchemy import JSON, BigInteger, Boolean, Enum, ForeignKey, String
+from sqlalchemy import JSON, BigInteger, Boolean, Enum, ForeignKey, Index, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from bot.database import Base, int_pk
@@ -33,8 +33,20 @@ class Application(Base):
     Таблица:
         - Имя таблицы: `applications`
         - Внешние ключи: `user_id` → `users.id` (с каскадным удалением)
+        - Индексы: (user_id, id), status, created_at и частичный индекс ожидающих заявок
     """
 
+    __table_args__ = (
+        Index("ix_applications_user_id_id", "user_id", "id"),
+        Index("ix_applications_status", "status"),
+        Index("ix_applications_created_at", "created_at"),
+        Index(
+            "ix_applications_pending",
+            "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
+
     id: Mapped[int_pk]
     user_id: Mapped[int] = mapped_column(
         BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
@@ -47,24 +59,26 @@ class Application(Base):
     owner: Mapped[bool] = mapped_column(Boolean, nullable=True)
     can_contact: Mapped[bool] = mapped_column(Boolean, nullable=True)
 
-    user = relationship("User", back_populates="applications", lazy="selectin")
+    # Связи не загружаются неявно: нужные загружаются опциями запроса
+    # (selectinload/joinedload), случайное обращение к незагруженной связи вызывает ошибку
+    user = relationship("User", back_populates="applications", lazy="raise")
     photos = relationship(
         "Photo",
         back_populates="application",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
     videos = relationship(
         "Video",
         back_populates="application",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
     debts = relationship(
         "BankDebt",
         back_populates="application",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
 
 
@@ -82,7 +96,7 @@ class Photo(Base):
         String, nullable=False, unique=False
     )  # ID файла в Telegram
     application_id: Mapped[int] = mapped_column(
-        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True
     )  # ID заявки
 
     # Связь с заявкой
@@ -103,7 +117,7 @@ class Video(Base):
         String, nullable=False, unique=False
     )  # ID файла в Telegram
     application_id: Mapped[int] = mapped_column(
-        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True
     )  # ID заявки
 
     # Связь с заявкой
@@ -126,7 +140,7 @@ class BankDebt(Base):
         BigInteger, nullable=False
     )  # Сумма задолженности
     application_id: Mapped[int] = mapped_column(
-        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("applications.id", ondelete="CASCADE"), nullable=False, index=True
     )  # ID заявки
 
     # Связь с заявкой
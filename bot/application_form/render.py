@@ -0,0 +1,304 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from aiogram.types import (
+    InlineKeyboardMarkup,
+    InputMedia,
+    InputMediaPhoto,
+    InputMediaVideo,
+)
+from sqlalchemy import inspect
+
+from bot.admins.keyboards.inline_kb import approve_admin_keyboard
+from bot.application_form.models import Application, ApplicationStatus
+from bot.application_form.utils import form_debts
+from bot.users.keyboards.inline_kb import approve_keyboard
+from bot.users.models import User
+
+STATUS_ICONS = {
+    ApplicationStatus.PENDING: "🟡",
+    ApplicationStatus.APPROVED: "🟢",
+    ApplicationStatus.REJECTED: "🔴",
+}
+# Сколько отрисованных карточек хранить в памяти процесса
+CARD_CACHE_SIZE = 512
+
+
+def _loaded(instance: Union[Application, User], name: str) -> Any:
+    """
+    Возвращает значение атрибута заявки или пользователя, только если он уже загружен.
+
+    Связи заявки объявлены с `lazy="raise"`, а серверные значения по умолчанию
+    (`updated_at`) после INSERT не читаются: обращение к ним вызвало бы ошибку
+    или запрос к БД.
+    """
+    if name in inspect(instance).unloaded:
+        return None
+    return getattr(instance, name)
+
+
+@dataclass(frozen=True)
+class ApplicationSnapshot:
+    """
+    Компактный снимок заявки — всё, что нужно для карточки.
+
+    Атрибуты:
+        id (Optional[int]): ID заявки.
+        status (ApplicationStatus): Статус заявки.
+        owner (Optional[bool]): Собственные ли счета.
+        can_contact (Optional[bool]): Может ли пользователь связаться с собственником счета.
+        text_application (Optional[str]): Текст свободного вопроса.
+        debts (Tuple[Tuple[str, float], ...]): Пары (банк, сумма задолженности).
+        telegram_id (Optional[int]): Telegram ID автора заявки.
+        phone_number (Optional[str]): Телефон автора заявки.
+    """
+
+    id: Optional[int]
+    status: ApplicationStatus
+    owner: Optional[bool] = None
+    can_contact: Optional[bool] = None
+    text_application: Optional[str] = None
+    debts: Tuple[Tuple[str, float], ...] = ()
+    telegram_id: Optional[int] = None
+    phone_number: Optional[str] = None
+
+    @classmethod
+    def from_application(
+        cls,
+        application: Application,
+        debts: Optional[Iterable[Tuple[str, float]]] = None,
+        user: Optional[User] = None,
+    ) -> "ApplicationSnapshot":
+        """
+        Строит снимок из заявки. Незагруженные связи не читаются.
+
+        Args:
+            application (Application): Заявка.
+            debts (Optional[Iterable[Tuple[str, float]]]): Задолженности, если они уже
+                известны (например, из FSM) и связь `debts` не загружена.
+            user (Optional[User]): Автор заявки, если связь `user` не загружена.
+
+        Returns:
+            ApplicationSnapshot: Снимок заявки.
+        """
+        if debts is None:
+            debts = [
+                (debt.bank_name, debt.total_amount)
+                for debt in _loaded(application, "debts") or []
+            ]
+        if user is None:
+            user = _loaded(application, "user")
+        return cls(
+            id=application.id,
+            status=application.status,
+            owner=application.owner,
+            can_contact=application.can_contact,
+            text_application=application.text_application,
+            debts=tuple(debts),
+            telegram_id=user.telegram_id if user is not None else None,
+            phone_number=user.phone_number if user is not None else None,
+        )
+
+    @classmethod
+    def from_form(
+        cls, user_data: Dict[str, Any], text_application: Optional[str] = None
+    ) -> "ApplicationSnapshot":
+        """
+        Строит снимок еще не сохраненной заявки из данных анкеты в FSM.
+
+        Args:
+            user_data (Dict[str, Any]): Данные FSM пользователя.
+            text_application (Optional[str]): Текст свободного вопроса.
+
+        Returns:
+            ApplicationSnapshot: Снимок заявки без ID.
+        """
+        return cls(
+            id=None,
+            status=ApplicationStatus(
+                user_data.get("check_state", ApplicationStatus.PENDING.value)
+            ),
+            owner=user_data.get("owner"),
+            can_contact=user_data.get("can_contact"),
+            text_application=text_application,
+            debts=tuple(form_debts(user_data)),
+        )
+
+
+@dataclass(frozen=True)
+class RenderedCard:
+    """
+    Готовая карточка заявки.
+
+    Атрибуты:
+        text (str): Текст сообщения.
+        reply_markup (Optional[InlineKeyboardMarkup]): Клавиатура под сообщением.
+    """
+
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+
+
+def form_media(user_data: Dict[str, Any]) -> List[InputMedia]:
+    """Возвращает фото и видео из данных анкеты в FSM для отправки альбомом."""
+    media: List[InputMedia] = [
+        InputMediaPhoto(type="photo", media=photo_id)
+        for photo_id in user_data.get("photos", [])
+    ]
+    if user_data.get("video"):
+        media.append(InputMediaVideo(type="video", media=user_data["video"]))
+    return media
+
+
+def card_body(snapshot: ApplicationSnapshot) -> str:
+    """Возвращает общую часть карточки: статус, ответы анкеты, вопрос и задолженности."""
+    icon = STATUS_ICONS.get(snapshot.status, "")
+    text = f"Статус заявки: {icon} {snapshot.status.value}\n\n"
+    if snapshot.owner is not None:
+        text += (
+            "Собственные счета - ДА\n\n"
+            if snapshot.owner
+            else "Собственные счета - Нет\n\n"
+        )
+        if not snapshot.owner and snapshot.can_contact is not None:
+            text += (
+                "Может связаться с собственником счета - ДА\n\n"
+                if snapshot.can_contact
+                else "Может связаться с собственником счета - Нет\n\n"
+            )
+    if snapshot.text_application:
+        text += f"Ваш вопрос:\n{snapshot.text_application}\n\n"
+    if snapshot.debts:
+        text += "Задолженности по банкам:\n"
+        for bank, amount in snapshot.debts:
+            text += (
+                f"🔸 Банк: <b>{bank}</b>, Сумма задолженности: <b>{amount}</b> руб.\n"
+            )
+    return text
+
+
+def user_card(snapshot: ApplicationSnapshot) -> RenderedCard:
+    """Карточка, которую пользователь подтверждает после заполнения заявки."""
+    text = (
+        "Ваша заявка:\n\n"
+        if snapshot.id is None
+        else f"Спасибо! Ваша заявка № {snapshot.id} успешно оформлена. \n\n"
+    )
+    text += card_body(snapshot).rstrip("\n")
+    text += "\n\nПроверьте верно ли указаны все данные?"
+    return RenderedCard(text, approve_keyboard("ДА", "НЕТ, начать сначала."))
+
+
+def admin_card(snapshot: ApplicationSnapshot) -> RenderedCard:
+    """Карточка заявки для администраторов с кнопками «Берем» и «Отказ»."""
+    text = f"Заявка № {snapshot.id}\n\n"
+    text += card_body(snapshot).rstrip("\n")
+    text += f"\n\n<b>{snapshot.phone_number}</b>"
+    text += "\n\nБерете заявку в работу?"
+    return RenderedCard(
+        text,
+        approve_admin_keyboard("Берем", "Отказ", snapshot.telegram_id, snapshot.id),
+    )
+
+
+@dataclass
+class CardCacheMetrics:
+    """
+    Метрики кэша карточек заявок.
+
+    Атрибуты:
+        hits (int): Сколько карточек взято из кэша.
+        misses (int): Сколько карточек отрисовано заново.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class CardRenderer:
+    """
+    Отрисовывает карточки заявок и кэширует их по `(вид, id заявки, updated_at,
+    telegram_id и телефон автора)`.
+
+    `updated_at` меняется при каждом UPDATE заявки, а данные автора, которые
+    показывает карточка, входят в ключ, поэтому после изменения заявки или
+    телефона пользователя устаревшая карточка из кэша не вернется. Если автор
+    заявки неизвестен (связь `user` не загружена и не передана), карточка не
+    кэшируется. При попадании в кэш задолженности не читаются вовсе, а
+    администраторам отправляются одни и те же объекты текста и клавиатуры.
+
+    Атрибуты:
+        metrics (CardCacheMetrics): Метрики попаданий в кэш.
+    """
+
+    def __init__(self, max_size: int = CARD_CACHE_SIZE) -> None:
+        """
+        Args:
+            max_size (int): Сколько карточек хранить (вытесняются самые старые).
+        """
+        self.max_size = max_size
+        self._cache: "OrderedDict[Hashable, RenderedCard]" = OrderedDict()
+        self.metrics = CardCacheMetrics()
+
+    def _key(
+        self, kind: str, application: Application, user: Optional[User]
+    ) -> Optional[Hashable]:
+        updated_at: Optional[datetime] = _loaded(application, "updated_at")
+        if user is None:
+            user = _loaded(application, "user")
+        if application.id is None or updated_at is None or user is None:
+            return None
+        if {"telegram_id", "phone_number"} & inspect(user).unloaded:
+            return None
+        return kind, application.id, updated_at, user.telegram_id, user.phone_number
+
+    def _render(
+        self,
+        kind: str,
+        application: Application,
+        build: Callable[[ApplicationSnapshot], RenderedCard],
+        debts: Optional[Iterable[Tuple[str, float]]] = None,
+        user: Optional[User] = None,
+    ) -> RenderedCard:
+        key = self._key(kind, application, user)
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            self.metrics.hits += 1
+            return self._cache[key]
+
+        self.metrics.misses += 1
+        card = build(ApplicationSnapshot.from_application(application, debts, user))
+        if key is not None:
+            self._cache[key] = card
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return card
+
+    def admin_card(
+        self,
+        application: Application,
+        debts: Optional[Iterable[Tuple[str, float]]] = None,
+        user: Optional[User] = None,
+    ) -> RenderedCard:
+        """
+        Возвращает карточку заявки для администраторов.
+
+        При промахе кэша у заявки должны быть загружены `user` и `debts` или
+        переданы `debts` и `user`.
+
+        Args:
+            application (Application): Заявка.
+            debts (Optional[Iterable[Tuple[str, float]]]): Задолженности, если связь
+                `debts` не загружена.
+            user (Optional[User]): Автор заявки, если связь `user` не загружена.
+        """
+        return self._render("admin", application, admin_card, debts, user)
+
+
+card_renderer = CardRenderer()
@@ -1,4 +1,3 @@
-import asyncio
 import re
 from typing import List, Optional
 
@@ -6,34 +5,36 @@ from aiogram import F
 from aiogram.dispatcher.router import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import (
-    CallbackQuery,
-    InputMedia,
-    InputMediaPhoto,
-    InputMediaVideo,
-    Message,
-    ReplyKeyboardRemove,
-)
+from aiogram.types import CallbackQuery, InputMedia, Message, ReplyKeyboardRemove
 from aiogram.utils.chat_action import ChatActionSender
 from loguru import logger
 
-from bot.admins.keyboards.inline_kb import approve_admin_keyboard
-from bot.application_form.dao import ApplicationDAO, BankDebtDAO, PhotoDAO, VideoDAO
-from bot.application_form.keyboards.inline_kb import owner_keyboard, can_contact_keyboard
+from bot.application_form.dao import ApplicationDAO
+from bot.application_form.keyboards.inline_kb import (
+    can_contact_keyboard,
+    owner_keyboard,
+)
 from bot.application_form.models import Application, ApplicationStatus
-from bot.application_form.schemas import (
-    BankDebtModelSchema,
-    PhotoModelSchema,
-    VideoModelSchema,
+from bot.application_form.render import (
+    ApplicationSnapshot,
+    card_renderer,
+    form_media,
+    user_card,
 )
-from bot.config import bot, settings
-from bot.database import connection
+from bot.application_form.utils import draft_metrics, form_debts
+from bot.config import bot, paced_delivery, redis_client, settings
+from bot.middlewares.db_session import commit_early
 from bot.other_handler.router import OtherHandler
 from bot.users.dao import UserDAO
 from bot.users.keyboards.inline_kb import approve_keyboard
 from bot.users.keyboards.markup_kb import main_kb, phone_kb
 from bot.users.schemas import TelegramIDModel, UpdateNumberSchema
 from bot.users.utils import normalize_phone_number
+from bot.utils.edit_digest import edit_digests
+from bot.utils.fan_out import fan_out
+from bot.utils.fsm_storage import append_fsm_list
+from bot.utils.idempotency import release_press
+from bot.utils.paced_delivery import PacedMessage
 
 application_form_router = Router()
 
@@ -55,9 +56,8 @@ class ApplicationForm(StatesGroup):
 
 # @application_form_router.message(Command('application_form'))
 @application_form_router.message(F.text.contains("Вывод заблокированных средств"))
-@connection()
 async def application_form_start(
-        message: Message, state: FSMContext, session, **kwargs
+    message: Message, state: FSMContext, session, **kwargs
 ) -> None:
     """
     Обработчик команды, запускающий процесс подачи заявки на вывод заблокированных средств.
@@ -139,41 +139,36 @@ async def approve_work_callback(call: CallbackQuery, state: FSMContext) -> None:
         # Обработка данных из callback_data
         approve_inf = call.data.replace("approve_", "")
         approve_inf = True if approve_inf == "True" else False
-        async with ChatActionSender.typing(bot=bot, chat_id=call.message.chat.id):
-            if approve_inf:
-                # Обновление данных в состоянии
-                await state.update_data(approve_work=approve_inf)
-                # Отправка серии сообщений с информацией
-                await asyncio.sleep(1)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="Мы заполняем заявку на списание заблокированных средств одного должника.",
-                    reply_markup=ReplyKeyboardRemove(),
-                )
-                await asyncio.sleep(1)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="❗️❗️❗️ Если у вас несколько должников, на каждого из них заполняется отдельная анкета.",
-                )
-                await asyncio.sleep(1)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="Не имеет значения, в каком количестве 🏦 банков и счетов заблокированы средства.",
-                )
-                await asyncio.sleep(1)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="В анкете необходимо будет указать, какие суммы в каких банках заблокированы.",
-                )
-                await asyncio.sleep(1)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="Вы хотите вывести средства с собственного счета или счета вашего клиента?",
-                    reply_markup=owner_keyboard(),
-                )
-                # Устанавливаем следующее состояние для обработки данных
-                await state.set_state(ApplicationForm.owner)
-            else:
+        if approve_inf:
+            # Обновление данных в состоянии
+            await state.update_data(approve_work=approve_inf)
+            # Устанавливаем следующее состояние для обработки данных
+            await state.set_state(ApplicationForm.owner)
+            # Серия сообщений с информацией уходит в фоне с имитацией набора текста
+            paced_delivery.enqueue(
+                call.message.chat.id,
+                [
+                    PacedMessage(
+                        "Мы заполняем заявку на списание заблокированных средств одного должника.",
+                        reply_markup=ReplyKeyboardRemove(),
+                    ),
+                    PacedMessage(
+                        "❗️❗️❗️ Если у вас несколько должников, на каждого из них заполняется отдельная анкета."
+                    ),
+                    PacedMessage(
+                        "Не имеет значения, в каком количестве 🏦 банков и счетов заблокированы средства."
+                    ),
+                    PacedMessage(
+                        "В анкете необходимо будет указать, какие суммы в каких банках заблокированы."
+                    ),
+                    PacedMessage(
+                        "Вы хотите вывести средства с собственного счета или счета вашего клиента?",
+                        reply_markup=owner_keyboard(),
+                    ),
+                ],
+            )
+        else:
+            async with ChatActionSender.typing(bot=bot, chat_id=call.message.chat.id):
                 # Если пользователь не подтвердил, предлагаем текстовую заявку
                 await state.set_state(OtherHandler.other_question)
                 await bot.send_message(
@@ -235,18 +230,17 @@ async def owner_callback(call: CallbackQuery, state: FSMContext) -> None:
                 # Переход к следующему состоянию для загрузки фото
                 await state.set_state(ApplicationForm.can_contact)
 
-            # Отправка сообщений с имитацией набора текста
-
-            for message in messages:
-                await asyncio.sleep(1)  # Имитация времени на ввод каждого сообщения
-                if owner_inf:
-                    await bot.send_message(chat_id=call.message.chat.id, text=message)
-                else:
-                    await bot.send_message(
-                        chat_id=call.message.chat.id,
-                        text=message,
-                        reply_markup=can_contact_keyboard(),
+            # Отправка сообщений в фоне с имитацией набора текста
+            paced_delivery.enqueue(
+                call.message.chat.id,
+                [
+                    PacedMessage(
+                        message,
+                        reply_markup=None if owner_inf else can_contact_keyboard(),
                     )
+                    for message in messages
+                ],
+            )
 
     except Exception as e:
         # Логируем ошибку
@@ -314,20 +308,83 @@ async def can_contact_callback(call: CallbackQuery, state: FSMContext) -> None:
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
 
 
-# 🔒 Словарь локальных блокировок (по user_id)
-user_locks = {}
+def extract_photo_ids(messages: List[Message]) -> List[str]:
+    """
+    Извлекает file_id фотографий из сообщений (одиночного фото или альбома).
+
+    Для сжатых фото берется самое большое разрешение, для несжатых — file_id документа.
+
+    Аргументы:
+    - messages (List[Message]): Сообщения с фотографиями.
+
+    Возвращаемое значение:
+    - List[str]: Список file_id в порядке сообщений.
+    """
+    photo_ids = []
+    for item in messages:
+        if item.photo:
+            photo_ids.append(item.photo[-1].file_id)  # 📸 Берем самое большое фото
+        elif item.document and (item.document.mime_type or "").startswith("image/"):
+            photo_ids.append(item.document.file_id)
+    return photo_ids
+
+
+async def save_photos(message: Message, state: FSMContext, new_photos: List[str]):
+    """
+    Добавляет пачку фотографий в FSM одним чтением и одной записью.
+
+    Дубликаты пропускаются. Если вопрос о досылке фото еще не задавался, флаг
+    `question_asked` записывается в том же обновлении и пользователю задается вопрос.
+
+    Аргументы:
+    - message (Message): Сообщение пользователя (для ответа).
+    - state (FSMContext): Контекст состояния, в котором хранится список фото.
+    - new_photos (List[str]): file_id новых фотографий.
+    """
+    # Апдейты одного чата выполняются по очереди (см. `ChatExecutorMiddleware`),
+    # поэтому чтение и запись списка фото не пересекаются с другими апдейтами.
+    # Получаем данные о текущем состоянии (например, фото, которые уже были отправлены)
+    state_data = await state.get_data()
+    existing_photos = state_data.get("photos", [])
+
+    # Если фото еще не было добавлено, добавляем его в список
+    added_photos = []
+    for new_photo in new_photos:
+        if new_photo not in existing_photos and new_photo not in added_photos:
+            added_photos.append(new_photo)
+        else:
+            logger.warning("Попытка добавить одинаковое фото")
+
+    # Проверяем, был ли уже задан вопрос о дальнейшем отправлении фото
+    question_asked = state_data.get("question_asked", False)
+
+    # В Redis дописываются только новые фото, весь список не пересылается
+    if added_photos:
+        existing_photos = await append_fsm_list(state, "photos", *added_photos)
+    if not question_asked:
+        await state.update_data(question_asked=True)
+    logger.debug(f"Добавил данные в FSM {existing_photos}")
+
+    if not question_asked:
+        await message.answer(
+            "Еще фото будете отправлять?",
+            reply_markup=approve_keyboard("Да", "Нет"),
+        )
 
 
 @application_form_router.message(ApplicationForm.photo, F.photo)
-async def photo_message(message: Message, state: FSMContext):
+async def photo_message(
+    message: Message, state: FSMContext, album: Optional[List[Message]] = None
+):
     """
     Обработчик для обработки фотографий, отправленных пользователем в чат. Если пользователь отправляет фото,
-    оно сохраняется в состоянии FSM, и если оно еще не было отправлено, то добавляется в список. Для предотвращения
-    гонки состояний используется локальная блокировка.
+    оно сохраняется в состоянии FSM, и если оно еще не было отправлено, то добавляется в список.
+    Альбом приходит целиком (см. `AlbumMiddleware`) и записывается в FSM за одно обновление.
 
     Аргументы:
     - message (Message): Объект сообщения от пользователя, содержащий фотографию.
     - state (FSMContext): Контекст состояния, используемый для сохранения данных о фотографиях.
+    - album (Optional[List[Message]]): Все сообщения альбома, если фото пришли альбомом.
 
     Типы данных:
     - message: Объект типа `aiogram.types.Message`, который содержит информацию о сообщении, включая отправленные файлы.
@@ -336,52 +393,16 @@ async def photo_message(message: Message, state: FSMContext):
     Возвращаемое значение:
     - Ответ пользователю о добавлении фото в FSM.
     """
-    user_id = message.from_user.id  # Получаем user_id
-
-    # Создаем локальную блокировку для каждого пользователя, если её ещё нет
-    if user_id not in user_locks:
-        user_locks[user_id] = asyncio.Lock()
-
-    async with user_locks[user_id]:  # 🔒 Блокируем только для этого пользователя
-        try:
-            await asyncio.sleep(0.5)  # ⏳ Ожидание загрузки фото
-
-            # Берем самое большое фото из отправленных
-            new_photo = message.photo[-1].file_id  # 📸 Берем самое большое фото
-            logger.debug(f"Извлек ID фотографии - {new_photo}")
-
-            # Получаем данные о текущем состоянии (например, фото, которые уже были отправлены)
-            state_data = await state.get_data()
-            existing_photos = state_data.get("photos", [])
-
-            # Если фото еще не было добавлено, добавляем его в список
-            if new_photo not in existing_photos:
-                existing_photos.append(new_photo)
-            else:
-                logger.warning("Попытка добавить одинаковое фото")
-
-            # Обновляем данные в FSM
-            await state.update_data(photos=existing_photos)
-            logger.debug(f"Добавил данные в FSM {(await state.get_data())['photos']}")
-
-            # Проверяем, был ли уже задан вопрос о дальнейшем отправлении фото
-            question_asked = state_data.get("question_asked", False)
-            if not question_asked:
-                await state.update_data(question_asked=True)
-                await message.answer(
-                    "Еще фото будете отправлять?",
-                    reply_markup=approve_keyboard("Да", "Нет"),
-                )
+    try:
+        new_photos = extract_photo_ids(album or [message])
+        logger.debug(f"Извлек ID фотографий - {new_photos}")
+        await save_photos(message, state, new_photos)
 
-        except Exception as e:
-            logger.error(f"Ошибка при обработке фото: {e}")
-            await message.answer(
-                "Произошла ошибка при обработке вашего фото. Попробуйте снова."
-            )
-        finally:
-            # Удаляем блокировку для этого пользователя после выполнения кода
-            if user_id in user_locks:
-                del user_locks[user_id]  # Удаляем блокировку из словаря
+    except Exception as e:
+        logger.error(f"Ошибка при обработке фото: {e}")
+        await message.answer(
+            "Произошла ошибка при обработке вашего фото. Попробуйте снова."
+        )
 
 
 # Обработчик для несжатых фото (если отправляются как документы)
@@ -392,7 +413,9 @@ async def photo_message(message: Message, state: FSMContext):
     F.document.mime_type.startswith("image/webp"), ApplicationForm.photo
 )
 # TODO некорректно сохраняет если фотка несжатая и отправлятся в формате webp
-async def photo_uncompressed_message(message: Message, state: FSMContext):
+async def photo_uncompressed_message(
+    message: Message, state: FSMContext, album: Optional[List[Message]] = None
+):
     """
     Обработчик для обработки несжатых фото, отправленных пользователем как документы (включая формат WebP).
     Фото сохраняется в состояние FSM, если оно еще не было добавлено.
@@ -400,6 +423,7 @@ async def photo_uncompressed_message(message: Message, state: FSMContext):
     Аргументы:
     - message (Message): Объект сообщения, содержащий документ с изображением.
     - state (FSMContext): Контекст состояния, используемый для сохранения данных о фотографиях.
+    - album (Optional[List[Message]]): Все сообщения альбома, если фото пришли альбомом.
 
     Типы данных:
     - message: Объект типа `aiogram.types.Message`, который содержит информацию о сообщении, включая отправленные файлы.
@@ -408,51 +432,17 @@ async def photo_uncompressed_message(message: Message, state: FSMContext):
     Возвращаемое значение:
     - Ответ пользователю о добавлении фото в FSM или об ошибке обработки.
     """
-    user_id = message.from_user.id  # Получаем user_id
-
-    # Создаем локальную блокировку для каждого пользователя, если её ещё нет
-    if user_id not in user_locks:
-        user_locks[user_id] = asyncio.Lock()
-
-    async with user_locks[user_id]:  # 🔒 Блокируем только для этого пользователя
-        try:
-            await asyncio.sleep(0.5)  # ⏳ Ожидание загрузки фото
-
-            # Получаем photo_id для несжатого изображения
-            new_photo = message.document.file_id
-            logger.debug(f"Извлек ID несжатого фото - {new_photo}")
-
-            # Получаем текущее состояние FSM
-            state_data = await state.get_data()
-            existing_photos = state_data.get("photos", [])
-
-            # Проверяем, не было ли уже такого фото
-            if new_photo not in existing_photos:
-                existing_photos.append(new_photo)
-            else:
-                logger.warning("Попытка добавить одинаковое несжатое фото")
-
-            # Обновляем состояние с фотографиями
-            await state.update_data(photos=existing_photos)
-
-            # Проверяем, был ли уже задан вопрос
-            question_asked = state_data.get("question_asked", False)
-            if not question_asked:
-                await state.update_data(question_asked=True)
-                await message.answer(
-                    "Еще фото будете отправлять?",
-                    reply_markup=approve_keyboard("Да", "Нет"),
-                )
+    try:
+        # Получаем photo_id для несжатых изображений
+        new_photos = extract_photo_ids(album or [message])
+        logger.debug(f"Извлек ID несжатых фото - {new_photos}")
+        await save_photos(message, state, new_photos)
 
-        except Exception as e:
-            logger.error(f"Ошибка при обработке несжатого фото: {e}")
-            await message.answer(
-                "Произошла ошибка при обработке вашего фото. Попробуйте снова."
-            )
-        finally:
-            # Удаляем блокировку для этого пользователя после выполнения
-            if user_id in user_locks:
-                del user_locks[user_id]  # Удаляем блокировку из словаря
+    except Exception as e:
+        logger.error(f"Ошибка при обработке несжатого фото: {e}")
+        await message.answer(
+            "Произошла ошибка при обработке вашего фото. Попробуйте снова."
+        )
 
 
 # Обработчик для случая, когда пользователь отправляет не фото (например, видео или документы)
@@ -581,17 +571,8 @@ async def bank_get_inf(message: Message, state: FSMContext):
     """
     try:
         async with ChatActionSender.typing(bot=bot, chat_id=message.chat.id):
-            # Получаем данные состояния
-            state_data = await state.get_data()
-
-            # Извлекаем текущий список банков из состояния (если он есть)
-            bank_list = state_data.get("bank_name", [])
-
-            # Добавляем новое название банка в список
-            bank_list.append(message.text)
-
-            # Обновляем состояние с новым списком банков
-            await state.update_data(bank_name=bank_list)
+            # Добавляем новое название банка в список банков из состояния
+            await append_fsm_list(state, "bank_name", message.text)
 
             # Запрашиваем общую сумму, заблокированную в этом банке
             await message.answer(
@@ -653,17 +634,8 @@ async def total_amount_get_inf(message: Message, state: FSMContext):
                     )
                     return
 
-                # Получаем данные состояния
-                state_data = await state.get_data()
-
-                # Извлекаем текущий список сумм из состояния (если он есть)
-                total_amount_list = state_data.get("total_amount", [])
-
-                # Добавляем новую сумму в список
-                total_amount_list.append(total_amount)
-
-                # Обновляем состояние с новым списком сумм
-                await state.update_data(total_amount=total_amount_list)
+                # Добавляем новую сумму в список сумм из состояния
+                await append_fsm_list(state, "total_amount", total_amount)
 
                 # Запрашиваем, имеются ли заблокированные средства в других банках
                 await message.answer(
@@ -686,10 +658,11 @@ async def total_amount_get_inf(message: Message, state: FSMContext):
 
 # TODO Слишком большая функция было бы не плохо оптимизировать
 @application_form_router.callback_query(
-    F.data.startswith("approve_"), ApplicationForm.new_bank
+    F.data.startswith("approve_"),
+    ApplicationForm.new_bank,
+    flags={"idempotent": True},
 )
-@connection()
-async def photo_callback_final(call: CallbackQuery, state: FSMContext, session) -> None:
+async def photo_callback_final(call: CallbackQuery, state: FSMContext) -> None:
     """
     Обработчик callback-запросов для вопроса о добавлении фото и подтверждения банка.
 
@@ -721,134 +694,41 @@ async def photo_callback_final(call: CallbackQuery, state: FSMContext, session)
             if new_bank_inf:
                 # Если пользователь хочет добавить еще банк, обновляем состояние и просим указать банк
                 await state.update_data(new_bank=True)
-
-                await asyncio.sleep(2)
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="Укажите один банк 🏦, с которого необходимо произвести списание.",
-                )
                 await state.set_state(ApplicationForm.bank_name)
-            else:
-                # Если пользователь не хочет добавлять банк, переходим к запросу видео
-                await state.update_data(new_bank=False)
-                await state.update_data(check_state=ApplicationStatus.PENDING.value)
 
-                # Получаем данные пользователя из FSM
-                user_data = await state.get_data()  # Тип данных: dict
-                user_id: int = call.from_user.id  # Тип данных: int
-
-                # Проверяем, существует ли уже пользователь в базе данных
-                user_info = await UserDAO.find_one_or_none(
-                    session=session, filters=TelegramIDModel(telegram_id=user_id)
+                paced_delivery.enqueue(
+                    call.message.chat.id,
+                    [
+                        PacedMessage(
+                            "Укажите один банк 🏦, с которого необходимо произвести списание.",
+                            delay=2,
+                        )
+                    ],
                 )
-                if not user_info:
-                    logger.error(
-                        f"Пользователь с telegram_id {user_id} не найден в базе данных."
-                    )
-                    await call.message.answer("Произошла ошибка. Попробуйте снова.")
-                    return
-
-                # Извлекаем данные из FSM состояния
-                status: ApplicationStatus = ApplicationStatus(
-                    user_data.get("check_state", "PENDING")
-                )
-                owner: Optional[bool] = user_data.get("owner", None)
-                can_contact: Optional[bool] = user_data.get("can_contact", None)
-                video_id: Optional[str] = user_data.get(
-                    "video", None
-                )  # Тип данных: Optional[str]
-                bank_name: Optional[List[str]] = user_data.get(
-                    "bank_name", None
-                )  # Тип данных: Optional[List[str]]
-                total_amount: Optional[List[float]] = user_data.get(
-                    "total_amount", None
-                )  # Тип данных: Optional[List[float]]
-                photos: List[str] = user_data.get("photos", [])  # Тип данных: List[str]
-
-                # Создаем заявку в БД
-                application_model = Application(
-                    user_id=user_info.id, status=status, owner=owner, can_contact=can_contact
-                )
-                application: Application = await ApplicationDAO.add(
-                    session=session, values=application_model.to_dict()
-                )
-                logger.debug(f"Создал заявку - {application.id}")
-
-                # Добавляем фотографии, если есть
-                for photo_id in photos:
-                    photo_model = PhotoModelSchema(
-                        file_id=photo_id, application_id=application.id
-                    )
-                    await PhotoDAO.add(session, photo_model)
-
-                # Добавляем видео в базу данных
-                if video_id:
-                    video_model = VideoModelSchema(
-                        file_id=video_id, application_id=application.id
-                    )
-                    await VideoDAO.add(session, video_model)
-
-                # Добавляем задолженности, если есть
-                if bank_name and total_amount:
-                    # Проверяем, что списки bank_name и total_amount имеют одинаковую длину
-                    if len(bank_name) == len(total_amount):
-                        for bank, amount in zip(bank_name, total_amount):
-                            bank_debt_model = BankDebtModelSchema(
-                                bank_name=bank,
-                                total_amount=amount,
-                                application_id=application.id,
-                            )
-                            await BankDebtDAO.add(session, bank_debt_model)
-
-                # Подготовка текста для сообщения
-                response_message: str = f"Спасибо! Ваша заявка № {application.id} успешно оформлена. \n\nСтатус заявки: 🟡 {application.status.value}\n\n"
-
-                if application.owner is not None:
-                    response_message += (
-                        "Собственные счета - ДА\n\n"
-                        if application.owner
-                        else "Собственные счета - Нет\n\n"
-                    )
-                if (application.owner is not None) and application.owner is not True:
-                    response_message += (
-                        "Может связаться с собственником счета - ДА\n\n"
-                        if application.can_contact
-                        else "Может связаться с собственником счета - Нет\n\n"
-                    )
-
-                # Если есть задолженности по банкам, добавляем информацию о них
-                if bank_name and total_amount:
-                    response_message += "Задолженности по банкам:\n"
-                    for bank, amount in zip(bank_name, total_amount):
-                        response_message += f"🔸 Банк: <b>{bank}</b>, Сумма задолженности: <b>{amount}</b> руб.\n"
-
-                response_message += "\n\nПроверьте верно ли указаны все данные?"
-
-                # Формирование медиа-аттачментов
-                media: List[InputMedia] = []  # Тип данных: List[InputMedia]
-
-                # Прикрепляем фото
-                for photo_id in photos:
-                    media.append(InputMediaPhoto(type="photo", media=photo_id))
+            else:
+                # Если пользователь не хочет добавлять банк, показываем черновик заявки.
+                # В БД заявка попадет только после подтверждения (approve_form_callback)
+                # update_data возвращает все данные пользователя из FSM
+                user_data = await state.update_data(
+                    new_bank=False, check_state=ApplicationStatus.PENDING.value
+                )  # Тип данных: dict
 
-                # Прикрепляем видео
-                if video_id:
-                    media.append(InputMediaVideo(type="video", media=video_id))
+                card = user_card(ApplicationSnapshot.from_form(user_data))
+                media: List[InputMedia] = form_media(user_data)
 
                 # Отправляем сообщение с фото, видео, задолженностями и банками
-                await call.message.answer_media_group(media=media)
-                await call.message.answer(
-                    response_message,
-                    reply_markup=approve_keyboard("ДА", "НЕТ, начать сначала."),
-                )
+                if media:
+                    await call.message.answer_media_group(media=media)
+                await call.message.answer(card.text, reply_markup=card.reply_markup)
 
                 await state.set_state(ApplicationForm.approve_form)
-
-                logger.info(f"Заявка {application.id} успешно добавлена в базу данных.")
+                draft_metrics.previews += 1
 
     except Exception as e:
         # Логируем ошибку
         logger.error(f"Ошибка при обработке запроса: {e}")
+        # Даем нажать кнопку снова
+        await release_press(redis_client, call)
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
 
 
@@ -958,15 +838,17 @@ async def photo_callback_final(call: CallbackQuery, state: FSMContext, session)
 
 
 @application_form_router.callback_query(
-    F.data.startswith("approve_"), ApplicationForm.approve_form
+    F.data.startswith("approve_"),
+    ApplicationForm.approve_form,
+    flags={"idempotent": True},
 )
-@connection()
 async def approve_form_callback(
-        call: CallbackQuery, state: FSMContext, session
+    call: CallbackQuery, state: FSMContext, session
 ) -> None:
     """
     Обрабатывает callback-запрос пользователя, одобряющего форму заявки.
-    В зависимости от решения пользователя, заявка будет либо одобрена, либо отклонена.
+    В зависимости от решения пользователя черновик заявки из FSM либо сохраняется
+    в базу данных и отправляется администраторам, либо отбрасывается.
 
     Параметры:
         call (CallbackQuery): Объект callback-запроса от Telegram.
@@ -977,7 +859,6 @@ async def approve_form_callback(
         Обрабатываются все исключения с выводом ошибки в лог.
     """
     try:
-        admin_message_ids = {}
         # Ответ на запрос для предотвращения уведомлений
         await call.answer(text="Проверяю ввод", show_alert=False)
 
@@ -985,118 +866,105 @@ async def approve_form_callback(
         approve_form_inf: bool = call.data.replace("approve_", "") == "True"
 
         # Удаляем клавиатуру из сообщения
-        await call.message.edit_reply_markup(reply_markup=None)
-
-        # Ищем пользователя и его последние заявки
-        user_id = TelegramIDModel(telegram_id=call.from_user.id)
-        user_applications = await UserDAO.find_one_or_none(
-            session=session, filters=user_id
+        await edit_digests.edit_reply_markup(
+            call.message.chat.id, call.message.message_id, reply_markup=None
         )
-        for el in user_applications.applications:
-            print(el)
-        if not user_applications or not user_applications.applications:
-            raise ValueError("Нет доступных заявок для пользователя.")
 
-        last_appl: Application = user_applications.applications[-1]
-        print(last_appl.id)
+        # Черновик заявки хранится в FSM: в БД он попадает только сейчас
+        user_data = await state.get_data()
+        photos: List[str] = user_data.get("photos", [])
+        video_id: Optional[str] = user_data.get("video", None)
+        debts = form_debts(user_data)
+
         if approve_form_inf:
-            # Если пользователь согласен с данными в форме
-            state_inf = await state.get_data()
-            if not state_inf.get("owner",None):
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="❗️Если у вас есть еще клиенты, то необходимо создать отдельные заявки на каждого.",
-                    reply_markup=ReplyKeyboardRemove(),
+            # Если пользователь согласен с данными в форме, сохраняем заявку
+            user_info = await UserDAO.find_one_or_none(
+                session=session, filters=TelegramIDModel(telegram_id=call.from_user.id)
+            )
+            if not user_info:
+                raise ValueError("Пользователь не найден в базе данных.")
+
+            # Создаем заявку вместе с фото, видео и задолженностями за несколько запросов
+            application: Application = await ApplicationDAO.create_with_children(
+                session=session,
+                values={
+                    "user_id": user_info.id,
+                    "status": ApplicationStatus(
+                        user_data.get("check_state", "PENDING")
+                    ),
+                    "owner": user_data.get("owner", None),
+                    "can_contact": user_data.get("can_contact", None),
+                },
+                photos=photos,
+                videos=[video_id] if video_id else [],
+                debts=debts,
+            )
+            # Фиксируем заявку до рассылки: администратор может нажать «Берем»
+            # раньше, чем завершится обработка этого апдейта
+            await commit_early(session)
+            logger.info(f"Заявка {application.id} успешно добавлена в базу данных.")
+            draft_metrics.confirmed += 1
+
+            messages: List[PacedMessage] = []
+            if not user_data.get("owner", None):
+                messages.append(
+                    PacedMessage(
+                        "❗️Если у вас есть еще клиенты, то необходимо создать отдельные заявки на каждого.",
+                        delay=0,
+                        reply_markup=ReplyKeyboardRemove(),
+                    )
                 )
             await state.clear()  # Очищаем состояние FSM
 
-            # Отправляем сообщение о том, что заявка принята
-            async with ChatActionSender.typing(bot=bot, chat_id=call.message.chat.id):
-                await asyncio.sleep(0.5)  # Имитируем набор текста
-                await bot.send_message(
-                    chat_id=call.message.chat.id,
-                    text="В ближайшее время с вами свяжется наш специалист для уточнения деталей.",
+            # Отправляем сообщение о том, что заявка принята (в фоне, с имитацией набора)
+            messages.append(
+                PacedMessage(
+                    f"Спасибо! Ваша заявка № {application.id} успешно оформлена. "
+                    "В ближайшее время с вами свяжется наш специалист для уточнения деталей.",
+                    delay=0.5,
                     reply_markup=ReplyKeyboardRemove(),
                 )
+            )
+            paced_delivery.enqueue(call.message.chat.id, messages)
 
-            # Отправляем информацию о заявке администратору
-            try:
-                for admin_id in settings.ADMIN_IDS:
-                    message = await bot.send_message(
-                        chat_id=admin_id,
-                        text=f"Была создана заявка {last_appl.id}, Это сообщение для админа",
-                        reply_markup=ReplyKeyboardRemove(),
-                    )
+            card = card_renderer.admin_card(application, debts=debts, user=user_info)
+            media: List[InputMedia] = form_media(user_data)
 
-            except Exception as e:
-                logger.error(
-                    f"Не удалось отправить сообщение админу {admin_id} об остановке бота: {e}"
+            async def notify_admin(admin_id: int) -> Message:
+                # Одному админу сообщения уходят по порядку, разным админам — параллельно
+                await bot.send_message(
+                    chat_id=admin_id,
+                    text=f"Была создана заявка {application.id}, Это сообщение для админа",
+                    reply_markup=ReplyKeyboardRemove(),
+                )
+                # Отправляем медиа группу (фото/видео) и информацию администратору
+                if media:
+                    await bot.send_media_group(chat_id=admin_id, media=media)
+                return await bot.send_message(
+                    chat_id=admin_id, text=card.text, reply_markup=card.reply_markup
                 )
-                pass
 
-            response_message: str = f"Заявка № {last_appl.id}\n\nСтатус заявки: 🟡 {last_appl.status.value}\n\n"
-            response_message += (
-                "Собственные счета - ДА\n\n"
-                if last_appl.owner
-                else "Собственные счета - Нет\n\n"
+            # Отправляем информацию о заявке всем администраторам одновременно
+            notified = await fan_out(
+                settings.ADMIN_IDS,
+                notify_admin,
+                concurrency=settings.FAN_OUT_CONCURRENCY,
             )
-            if not last_appl.owner and last_appl.can_contact is not None:
-                response_message += (
-                    "Может связаться с собственником счета - ДА\n\n"
-                    if last_appl.can_contact
-                    else "Может связаться с собственником счета - Нет\n\n"
-                )
-            # Добавляем задолженности по банкам, если они есть
-            if last_appl.debts:
-                response_message += "Задолженности по банкам:\n"
-                for debt in last_appl.debts:
-                    response_message += f"🔸 Банк: <b>{debt.bank_name}</b>, Сумма задолженности: <b>{debt.total_amount}</b> руб.\n"
-
-            response_message += f"\n\n <b>{user_applications.phone_number}</b> \n\n"
-            response_message += "\n\n Берете заявку в работу?"
-
-            media: List[InputMedia] = []  # Список для хранения медиа файлов
-
-            # Прикрепляем фотографии, если они есть
-            if last_appl.photos:
-                for photo in last_appl.photos:
-                    media.append(InputMediaPhoto(type="photo", media=photo.file_id))
-
-            # Прикрепляем видео, если они есть
-            if last_appl.videos:
-                for video in last_appl.videos:
-                    media.append(InputMediaVideo(type="video", media=video.file_id))
-
-            # Отправляем информацию о заявке администратору
-            try:
-                for admin_id in settings.ADMIN_IDS:
-                    # Отправляем медиа группу (фото/видео) и информацию администратору
-                    await bot.send_media_group(chat_id=admin_id, media=media)
-                    message = await bot.send_message(
-                        chat_id=admin_id,
-                        text=response_message,
-                        reply_markup=approve_admin_keyboard(
-                            "Берем", "Отказ", call.from_user.id, last_appl.id
-                        ),
-                    )
-                    admin_message_ids[admin_id] = (
-                        message.message_id
-                    )  # Сохраняем message_id
+            # Сохраняем message_id тех админов, кому карточка дошла
+            if notified.message_ids:
                 await ApplicationDAO.update(
                     session=session,
-                    filters={"id": last_appl.id},
-                    values={"admin_message_ids": admin_message_ids},
+                    filters={"id": application.id},
+                    values={"admin_message_ids": notified.message_ids},
                 )
-            except Exception as e:
-                logger.error(
-                    f"Не удалось отправить сообщение админу {admin_id} об остановке бота: {e}"
-                )
-                pass
 
         else:
-            # Если пользователь не согласен с данными, удаляем заявку и отправляем сообщение
+            # Если пользователь не согласен с данными, черновик просто забывается:
+            # в БД его нет, удалять нечего
             await state.clear()
-            await ApplicationDAO.delete(session=session, filters={"id": last_appl.id})
+            draft_metrics.record_rejected(
+                photos=len(photos), videos=1 if video_id else 0, debts=len(debts)
+            )
             await bot.send_message(
                 chat_id=call.message.chat.id,
                 text="Необходимо начать сначала создавать заявку",
@@ -1106,13 +974,14 @@ async def approve_form_callback(
     except Exception as e:
         # Логируем ошибку и отправляем пользователю сообщение о сбое
         logger.error(f"Ошибка при обработке запроса: {e}")
+        # Даем нажать кнопку снова
+        await release_press(redis_client, call)
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
 
 
 @application_form_router.message(
     lambda message: message.contact is not None or message.text is not None
 )
-@connection()
 async def handle_contact(message: Message, state: FSMContext, session) -> None:
     """
     Обрабатывает получение номера телефона пользователя.
@@ -1,5 +1,6 @@
 import re
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 
 def extract_number(text: str) -> Optional[int]:
@@ -24,3 +25,86 @@ def extract_number(text: str) -> Optional[int]:
         return int(match.group(1))
     else:
         return None
+
+
+def form_debts(user_data: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """
+    Возвращает задолженности из данных анкеты в FSM.
+
+    Задолженности учитываются, только если списки `bank_name` и `total_amount`
+    одинаковой длины.
+
+    Args:
+        user_data (Dict[str, Any]): Данные FSM пользователя.
+
+    Returns:
+        List[Tuple[str, float]]: Пары (название банка, сумма задолженности).
+    """
+    bank_name: Optional[List[str]] = user_data.get("bank_name")
+    total_amount: Optional[List[float]] = user_data.get("total_amount")
+    if bank_name and total_amount and len(bank_name) == len(total_amount):
+        return list(zip(bank_name, total_amount))
+    return []
+
+
+@dataclass
+class DraftMetrics:
+    """
+    Метрики черновиков заявок.
+
+    Заявка сохраняется в БД только после подтверждения пользователем, до этого
+    карточка строится из данных FSM. Метрики показывают, сколько запросов к БД
+    это экономит по сравнению с сохранением до подтверждения.
+
+    Атрибуты:
+        previews (int): Сколько черновиков показано пользователям.
+        confirmed (int): Сколько черновиков подтверждено и сохранено.
+        rejected (int): Сколько черновиков отклонено (в БД не попали).
+        inserts_avoided (int): Сколько INSERT не выполнено для отклоненных черновиков.
+        rows_avoided (int): Сколько строк (заявки, фото, видео, задолженности) не
+            записано и не удалено.
+        deletes_avoided (int): Сколько DELETE заявки с каскадом не выполнено.
+        selects_avoided (int): Сколько SELECT отклоненной заявки перед удалением не
+            выполнено.
+    """
+
+    previews: int = 0
+    confirmed: int = 0
+    rejected: int = 0
+    inserts_avoided: int = 0
+    rows_avoided: int = 0
+    deletes_avoided: int = 0
+    selects_avoided: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "previews": self.previews,
+            "confirmed": self.confirmed,
+            "rejected": self.rejected,
+            "inserts_avoided": self.inserts_avoided,
+            "rows_avoided": self.rows_avoided,
+            "deletes_avoided": self.deletes_avoided,
+            "selects_avoided": self.selects_avoided,
+        }
+
+    def record_rejected(self, photos: int = 0, videos: int = 0, debts: int = 0) -> None:
+        """
+        Учитывает отклоненный черновик.
+
+        Раньше такая заявка вставлялась (одним INSERT на заявку и по одному на
+        каждый непустой вид дочерних записей), перечитывалась и удалялась.
+
+        Args:
+            photos (int): Количество фото в черновике.
+            videos (int): Количество видео в черновике.
+            debts (int): Количество задолженностей в черновике.
+        """
+        self.rejected += 1
+        self.inserts_avoided += 1 + sum(1 for count in (photos, videos, debts) if count)
+        self.rows_avoided += 1 + photos + videos + debts
+        self.deletes_avoided += 1
+        self.selects_avoided += 1
+
+
+draft_metrics = DraftMetrics()
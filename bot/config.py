@@ -1,15 +1,18 @@
 import os
 import sys
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
 from loguru import logger
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from bot.utils.fsm_storage import CachedStorage, HashRedisStorage
+from bot.utils.paced_delivery import PacedDelivery
+from bot.utils.send_scheduler import SendScheduler
+
 
 class Settings(BaseSettings):
     """
@@ -26,6 +29,37 @@ class Settings(BaseSettings):
         BASE_DIR (Optional[str]): Базовая директория проекта (опционально).
         REDIS_LOGIN: str : Логин для Redis.
         REDIS_PASSWORD: SecretStr : Пароль для Redis.
+        SEND_GLOBAL_RATE (float): Лимит исходящих сообщений в секунду на бота.
+        SEND_CHAT_RATE (float): Лимит исходящих сообщений в секунду на один чат.
+        SEND_CHAT_BURST (int): Сколько сообщений подряд можно отправить в чат без ожидания.
+        SEND_MAX_RETRIES (int): Сколько раз повторять запрос после flood-wait (RetryAfter).
+        FAN_OUT_CONCURRENCY (int): Сколько администраторов оповещать одновременно.
+        ALBUM_LATENCY (float): Сколько секунд ждать следующую часть альбома.
+        CHAT_WORKERS (int): Количество воркеров, обрабатывающих апдейты чатов.
+        CHAT_QUEUE_SIZE (int): Максимальное количество ожидающих апдейтов одного чата.
+        BOT_MODE (str): Режим работы: "polling", "webhook", "ingest" (прием апдейтов в Redis Streams)
+            или "worker" (обработка апдейтов из Redis Streams).
+        WEBHOOK_BASE_URL (Optional[str]): Публичный адрес бота (https://...) для режима webhook.
+        WEBHOOK_PATH (str): Путь, на который Telegram отправляет апдейты.
+        WEBHOOK_SECRET (Optional[SecretStr]): Секретный токен webhook; если не задан, генерируется при запуске.
+        WEBHOOK_CONCURRENCY (int): Сколько апдейтов обрабатывать одновременно в режиме webhook.
+        WEBAPP_HOST (str): Адрес, на котором слушает webhook-сервер.
+        WEBAPP_PORT (int): Порт webhook-сервера.
+        STREAM_NAME (str): Префикс имен потоков Redis с апдейтами.
+        STREAM_PARTITIONS (int): Количество разделов (потоков), по которым распределяются чаты.
+        STREAM_WORKER_ID (int): Уникальный номер этого воркера (имя в consumer group).
+        STREAM_MAXLEN (int): Примерная максимальная длина одного потока.
+        STREAM_BATCH (int): Сколько апдейтов воркер читает и обрабатывает одновременно.
+        STREAM_CLAIM_IDLE_MS (int): Через сколько мс упавший или зависший апдейт обрабатывается повторно.
+        STREAM_LEASE_MS (int): Срок аренды раздела; если воркер не продлил её, раздел забирает другой воркер.
+        STREAM_MAX_DELIVERIES (int): После скольких попыток апдейт переносится в поток недоставленных.
+        FSM_CACHE_TTL (float): Сколько секунд хранить состояния и данные FSM в памяти процесса.
+        FSM_TTL (int): Через сколько секунд без активности удалять состояние и данные FSM пользователя.
+        FSM_STATE_TTLS (Dict[str, int]): TTL в секундах для отдельных состояний (например, "ApplicationForm:photo").
+        FAQ_DEFLECT_LIMIT (int): Сколько похожих ответов из базы знаний предлагать перед отправкой вопроса юристу.
+        FAQ_DEFLECT_MIN_SCORE (float): Минимальная похожесть (от 0 до 1) вопроса пользователя на вопрос из базы знаний.
+        CALLBACK_DEDUPE_TTL (int): Сколько секунд повторное нажатие той же кнопки считается дублем.
+        UPDATE_DEDUPE_TTL (int): Сколько секунд помнить update_id, принятые через webhook.
 
     Методы:
         get_db_url() -> str: Возвращает URL для подключения к базе данных.
@@ -46,6 +80,47 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: SecretStr
     REDIS_HOST: str
     NUM_DB: int
+
+    SEND_GLOBAL_RATE: float = 30.0
+    SEND_CHAT_RATE: float = 1.0
+    SEND_CHAT_BURST: int = 3
+    SEND_MAX_RETRIES: int = 5
+    FAN_OUT_CONCURRENCY: int = 10
+    ALBUM_LATENCY: float = 0.6
+    CHAT_WORKERS: int = 16
+    CHAT_QUEUE_SIZE: int = 20
+
+    BOT_MODE: Literal["polling", "webhook", "ingest", "worker"] = "polling"
+    WEBHOOK_BASE_URL: Optional[str] = None
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: Optional[SecretStr] = None
+    WEBHOOK_CONCURRENCY: int = 50
+    WEBAPP_HOST: str = "0.0.0.0"
+    WEBAPP_PORT: int = 8000
+
+    STREAM_NAME: str = "bot:updates"
+    STREAM_PARTITIONS: int = 16
+    STREAM_WORKER_ID: int = 0
+    STREAM_MAXLEN: int = 100000
+    STREAM_BATCH: int = 50
+    STREAM_CLAIM_IDLE_MS: int = 60000
+    STREAM_LEASE_MS: int = 30000
+    STREAM_MAX_DELIVERIES: int = 5
+
+    FSM_CACHE_TTL: float = 30.0
+    FSM_TTL: int = 3 * 24 * 3600
+    FSM_STATE_TTLS: Dict[str, int] = {
+        # Фото досылают долго, анкету с ними не теряем неделю
+        "ApplicationForm:photo": 7 * 24 * 3600,
+        # Выбор вопроса в базе знаний не нужен дольше часа
+        "Answering:check": 3600,
+    }
+
+    FAQ_DEFLECT_LIMIT: int = 3
+    FAQ_DEFLECT_MIN_SCORE: float = 0.45
+
+    CALLBACK_DEDUPE_TTL: int = 30
+    UPDATE_DEDUPE_TTL: int = 3600
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     )
@@ -72,13 +147,33 @@ class Settings(BaseSettings):
 
 # Получаем параметры для загрузки переменных среды
 settings = Settings()
-# Хранилище FSM
-storage = RedisStorage.from_url(settings.get_redis_url())
+# Хранилище FSM: кэш в памяти поверх хэшей Redis, записи апдейта уходят одной транзакцией
+storage = CachedStorage(
+    HashRedisStorage.from_url(
+        settings.get_redis_url(),
+        state_ttl=settings.FSM_TTL,
+        data_ttl=settings.FSM_TTL,
+        state_ttls=settings.FSM_STATE_TTLS,
+    ),
+    ttl=settings.FSM_CACHE_TTL,
+)
+# Общий клиент Redis (очередь апдейтов, кэши)
+redis_client = storage.redis
 
 # Инициализируем бота и диспетчер
 bot = Bot(
     token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
+# Все исходящие запросы проходят через планировщик с лимитами Telegram
+send_scheduler = SendScheduler(
+    global_rate=settings.SEND_GLOBAL_RATE,
+    chat_rate=settings.SEND_CHAT_RATE,
+    chat_burst=settings.SEND_CHAT_BURST,
+    max_retries=settings.SEND_MAX_RETRIES,
+)
+bot.session.middleware(send_scheduler)
+# Фоновая доставка сообщений с имитацией набора текста
+paced_delivery = PacedDelivery(bot)
 # Это если работать без Redis
 # dp = Dispatcher(storage=MemoryStorage())
 dp = Dispatcher(storage=storage)
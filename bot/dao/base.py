@@ -1,26 +1,92 @@
-from typing import Generic, List, Optional, Type, TypeVar
+import base64
+import json
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import case, func, literal, tuple_
 from sqlalchemy import delete as sqlalchemy_delete
-from sqlalchemy import func
 from sqlalchemy import update as sqlalchemy_update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.sql.base import ExecutableOption
 
 from bot.database import Base
 
 # Объявляем типовой параметр T с ограничением, что это наследник Base
 T = TypeVar("T", bound=Base)
 
+# Сколько записей обновлять одним запросом в bulk_update
+BULK_UPDATE_CHUNK = 500
+
+# Диалектные INSERT с поддержкой ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+class DictFilters(BaseModel):
+    """Фильтры, заданные словарем: поля — любые столбцы модели."""
+
+    model_config = ConfigDict(extra="allow")
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """
+    Кодирует позицию записи (created_at, id) в непрозрачный курсор пагинации.
+
+    Args:
+        created_at (datetime): Дата создания последней записи страницы.
+        record_id (int): ID последней записи страницы.
+
+    Returns:
+        str: Курсор в виде urlsafe base64-строки.
+    """
+    payload = json.dumps([created_at.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Декодирует курсор, полученный из `encode_cursor`.
+
+    Args:
+        cursor (str): Курсор пагинации.
+
+    Returns:
+        Tuple[datetime, int]: Позиция (created_at, id), после которой начинается страница.
+
+    Raises:
+        ValueError: Если курсор поврежден.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Некорректный курсор пагинации: {cursor}") from e
+
 
 class BaseDAO(Generic[T]):
     model: Type[T]  # Тип модели, которой управляет этот DAO
 
     @classmethod
     async def find_one_or_none_by_id(
-        cls, data_id: int, session: AsyncSession
+        cls,
+        data_id: int,
+        session: AsyncSession,
+        options: Sequence[ExecutableOption] = (),
     ) -> Optional[T]:
         """
         Находит запись по ID.
@@ -28,13 +94,14 @@ class BaseDAO(Generic[T]):
         Args:
             data_id (int): Идентификатор записи.
             session (AsyncSession): Сессия для взаимодействия с БД.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
 
         Returns:
             Optional[T]: Запись с указанным ID или None, если запись не найдена.
         """
         logger.info(f"Поиск {cls.model.__name__} с ID: {data_id}")
         try:
-            query = select(cls.model).filter_by(id=data_id)
+            query = select(cls.model).filter_by(id=data_id).options(*options)
             result = await session.execute(query)
             record = result.scalar_one_or_none()
             if record:
@@ -48,7 +115,10 @@ class BaseDAO(Generic[T]):
 
     @classmethod
     async def find_one_or_none(
-        cls, session: AsyncSession, filters: BaseModel
+        cls,
+        session: AsyncSession,
+        filters: BaseModel,
+        options: Sequence[ExecutableOption] = (),
     ) -> Optional[T]:
         """
         Находит одну запись по фильтрам.
@@ -56,6 +126,7 @@ class BaseDAO(Generic[T]):
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             filters (BaseModel): Фильтры для поиска.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
 
         Returns:
             Optional[T]: Найденная запись или None.
@@ -65,7 +136,7 @@ class BaseDAO(Generic[T]):
             f"Поиск одной записи {cls.model.__name__} по фильтрам: {filter_dict}"
         )
         try:
-            query = select(cls.model).filter_by(**filter_dict)
+            query = select(cls.model).filter_by(**filter_dict).options(*options)
             result = await session.execute(query)
             record = result.scalar_one_or_none()
             if record:
@@ -78,13 +149,19 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def find_all(cls, session: AsyncSession, filters: BaseModel) -> List[T]:
+    async def find_all(
+        cls,
+        session: AsyncSession,
+        filters: BaseModel,
+        options: Sequence[ExecutableOption] = (),
+    ) -> List[T]:
         """
         Находит все записи по фильтрам.
 
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             filters (BaseModel): Фильтры для поиска.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
 
         Returns:
             List[T]: Список найденных записей.
@@ -94,7 +171,7 @@ class BaseDAO(Generic[T]):
             f"Поиск всех записей {cls.model.__name__} по фильтрам: {filter_dict}"
         )
         try:
-            query = select(cls.model).filter_by(**filter_dict)
+            query = select(cls.model).filter_by(**filter_dict).options(*options)
             result = await session.execute(query)
             records = result.scalars().all()
             logger.info(f"Найдено {len(records)} записей.")
@@ -124,10 +201,9 @@ class BaseDAO(Generic[T]):
         new_instance = cls.model(**values_dict)
         session.add(new_instance)
         try:
-            await session.commit()
+            await session.flush()
             logger.info(f"Запись {cls.model.__name__} успешно добавлена.")
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при добавлении записи: {e}")
             raise e
         return new_instance
@@ -153,10 +229,9 @@ class BaseDAO(Generic[T]):
         new_instances = [cls.model(**values) for values in values_list]
         session.add_all(new_instances)
         try:
-            await session.commit()
+            await session.flush()
             logger.info(f"Успешно добавлено {len(new_instances)} записей.")
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при добавлении нескольких записей: {e}")
             raise e
         return new_instances
@@ -168,6 +243,10 @@ class BaseDAO(Generic[T]):
         """
         Обновляет записи по фильтрам.
 
+        Выполняется один `UPDATE` без синхронизации сессии: уже загруженные в
+        сессию записи не обновляются. Если новые значения нужны после обновления,
+        используйте `update_returning`.
+
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             filters (BaseModel): Фильтры для обновления.
@@ -185,15 +264,73 @@ class BaseDAO(Generic[T]):
             sqlalchemy_update(cls.model)
             .where(*[getattr(cls.model, k) == v for k, v in filter_dict.items()])
             .values(**values_dict)
-            .execution_options(synchronize_session="fetch")
+            .execution_options(synchronize_session=False)
         )
         try:
             result = await session.execute(query)
-            await session.commit()
             logger.info(f"Обновлено {result.rowcount} записей.")
             return result.rowcount
         except SQLAlchemyError as e:
-            await session.rollback()
+            logger.error(f"Ошибка при обновлении записей: {e}")
+            raise e
+
+    @classmethod
+    async def update_returning(
+        cls,
+        session: AsyncSession,
+        filters: BaseModel,
+        values: BaseModel,
+        options: Sequence[ExecutableOption] = (),
+    ) -> List[T]:
+        """
+        Обновляет записи по фильтрам и возвращает их обновленными.
+
+        Выполняется один `UPDATE ... RETURNING`: ни SELECT для синхронизации сессии,
+        ни повторного чтения записи после обновления не требуется.
+
+        Args:
+            session (AsyncSession): Сессия для взаимодействия с БД.
+            filters (BaseModel): Фильтры для обновления.
+            values (BaseModel): Новые значения для обновленных записей.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (selectinload).
+
+        Returns:
+            List[T]: Обновленные записи.
+        """
+        return await cls._update_returning(
+            session,
+            filters.model_dump(exclude_unset=True),
+            values.model_dump(exclude_unset=True),
+            options,
+        )
+
+    @classmethod
+    async def _update_returning(
+        cls,
+        session: AsyncSession,
+        filter_dict: dict,
+        values_dict: dict,
+        options: Sequence[ExecutableOption] = (),
+    ) -> List[T]:
+        """Общая реализация `update_returning` для словарей фильтров и значений."""
+        logger.info(
+            f"Обновление записей {cls.model.__name__} по фильтру: {filter_dict} с параметрами: {values_dict}"
+        )
+        statement = (
+            sqlalchemy_update(cls.model)
+            .where(*[getattr(cls.model, k) == v for k, v in filter_dict.items()])
+            .values(**values_dict)
+            .returning(cls.model)
+        )
+        query = select(cls.model).from_statement(statement).options(*options)
+        try:
+            result = await session.execute(
+                query, execution_options={"populate_existing": True}
+            )
+            records = list(result.scalars().all())
+            logger.info(f"Обновлено {len(records)} записей.")
+            return records
+        except SQLAlchemyError as e:
             logger.error(f"Ошибка при обновлении записей: {e}")
             raise e
 
@@ -218,11 +355,9 @@ class BaseDAO(Generic[T]):
         query = sqlalchemy_delete(cls.model).filter_by(**filter_dict)
         try:
             result = await session.execute(query)
-            await session.commit()
             logger.info(f"Удалено {result.rowcount} записей.")
             return result.rowcount
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при удалении записей: {e}")
             raise e
 
@@ -263,6 +398,9 @@ class BaseDAO(Generic[T]):
         """
         Пагинирует записи по фильтрам.
 
+        Использует OFFSET, поэтому глубокие страницы работают медленнее; для длинных
+        списков используйте `paginate_keyset`.
+
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             page (int): Номер страницы.
@@ -288,6 +426,105 @@ class BaseDAO(Generic[T]):
             logger.error(f"Ошибка при пагинации записей: {e}")
             raise
 
+    @classmethod
+    async def paginate_keyset(
+        cls,
+        session: AsyncSession,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        filters: BaseModel = None,
+        options: Sequence[ExecutableOption] = (),
+    ) -> Tuple[List[T], Optional[str]]:
+        """
+        Пагинирует записи по ключу (created_at, id) вместо OFFSET.
+
+        Страница выбирается условием `(created_at, id) > позиция курсора` по индексу,
+        поэтому скорость не зависит от номера страницы.
+
+        Args:
+            session (AsyncSession): Сессия для взаимодействия с БД.
+            page_size (int): Размер страницы.
+            cursor (Optional[str]): Курсор из предыдущего вызова (None — первая страница).
+            filters (Optional[BaseModel]): Фильтры для поиска (по умолчанию None).
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
+
+        Returns:
+            Tuple[List[T], Optional[str]]: Записи страницы и курсор следующей страницы
+            (None, если это последняя страница).
+        """
+        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+        logger.info(
+            f"Пагинация записей {cls.model.__name__} по фильтру: {filter_dict}, курсор: {cursor}, размер страницы: {page_size}"
+        )
+        query = (
+            select(cls.model)
+            .filter_by(**filter_dict)
+            .order_by(cls.model.created_at, cls.model.id)
+            .limit(page_size + 1)
+            .options(*options)
+        )
+        if cursor:
+            query = query.where(
+                tuple_(cls.model.created_at, cls.model.id) > decode_cursor(cursor)
+            )
+        try:
+            result = await session.execute(query)
+            records = list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при пагинации записей: {e}")
+            raise
+
+        # Лишняя запись показывает, что есть следующая страница
+        next_cursor = None
+        if len(records) > page_size:
+            records = records[:page_size]
+            last = records[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        logger.info(f"Найдено {len(records)} записей на странице.")
+        return records, next_cursor
+
+    @classmethod
+    async def stream(
+        cls,
+        session: AsyncSession,
+        filters: BaseModel = None,
+        batch_size: int = 500,
+        options: Sequence[ExecutableOption] = (),
+    ) -> AsyncIterator[T]:
+        """
+        Итерирует записи по фильтрам, не загружая весь результат в память.
+
+        Записи читаются через серверный курсор пачками по `batch_size`
+        (`stream_scalars` + `yield_per`), поэтому память не зависит от размера таблицы.
+
+        Args:
+            session (AsyncSession): Сессия для взаимодействия с БД.
+            filters (Optional[BaseModel]): Фильтры для поиска (по умолчанию None).
+            batch_size (int): Сколько записей читать из курсора за раз.
+            options (Sequence[ExecutableOption]): Опции загрузки связей (например, selectinload).
+
+        Yields:
+            T: Очередная запись.
+        """
+        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+        logger.info(
+            f"Потоковое чтение записей {cls.model.__name__} по фильтру: {filter_dict}, пачка: {batch_size}"
+        )
+        query = (
+            select(cls.model)
+            .filter_by(**filter_dict)
+            .order_by(cls.model.id)
+            .options(*options)
+            .execution_options(yield_per=batch_size)
+        )
+        try:
+            result = await session.stream_scalars(query)
+            async for record in result:
+                yield record
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при потоковом чтении записей: {e}")
+            raise
+
     @classmethod
     async def find_by_ids(cls, session: AsyncSession, ids: List[int]) -> List[T]:
         """
@@ -318,6 +555,12 @@ class BaseDAO(Generic[T]):
         """
         Создает запись или обновляет существующую.
 
+        На PostgreSQL и SQLite выполняется одним запросом
+        `INSERT ... ON CONFLICT (unique_fields) DO UPDATE ... RETURNING`, без
+        предварительного SELECT и без гонки между параллельными вызовами. Для
+        `unique_fields` в таблице должен быть уникальный индекс. На других СУБД
+        используется поиск записи и последующее обновление или вставка.
+
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             unique_fields (List[str]): Поля, которые определяют уникальность записи.
@@ -327,6 +570,36 @@ class BaseDAO(Generic[T]):
             T: Созданная или обновленная запись.
         """
         values_dict = values.model_dump(exclude_unset=True)
+        dialect = session.get_bind().dialect.name
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            return await cls._upsert_select_first(session, unique_fields, values_dict)
+
+        logger.info(f"Upsert для {cls.model.__name__} ({dialect})")
+        stmt = insert(cls.model).values(**values_dict)
+        update_values = {
+            key: stmt.excluded[key] for key in values_dict if key not in unique_fields
+        }
+        # onupdate не срабатывает для ON CONFLICT, поэтому updated_at выставляем явно
+        update_values["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=unique_fields, set_=update_values
+        ).returning(cls.model)
+        try:
+            record = await session.scalar(
+                stmt, execution_options={"populate_existing": True}
+            )
+            logger.info(f"Upsert записи {cls.model.__name__} выполнен.")
+            return record
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при upsert: {e}")
+            raise
+
+    @classmethod
+    async def _upsert_select_first(
+        cls, session: AsyncSession, unique_fields: List[str], values_dict: dict
+    ) -> T:
+        """Upsert через SELECT и последующее обновление или вставку (для прочих СУБД)."""
         filter_dict = {
             field: values_dict[field] for field in unique_fields if field in values_dict
         }
@@ -334,24 +607,23 @@ class BaseDAO(Generic[T]):
         logger.info(f"Upsert для {cls.model.__name__}")
         try:
             existing = await cls.find_one_or_none(
-                session, BaseModel.construct(**filter_dict)
+                session, DictFilters.model_construct(**filter_dict)
             )
             if existing:
                 # Обновляем существующую запись
                 for key, value in values_dict.items():
                     setattr(existing, key, value)
-                await session.commit()
+                await session.flush()
                 logger.info(f"Обновлена существующая запись {cls.model.__name__}")
                 return existing
             else:
                 # Создаем новую запись
                 new_instance = cls.model(**values_dict)
                 session.add(new_instance)
-                await session.commit()
+                await session.flush()
                 logger.info(f"Создана новая запись {cls.model.__name__}")
                 return new_instance
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при upsert: {e}")
             raise
 
@@ -360,34 +632,60 @@ class BaseDAO(Generic[T]):
         """
         Массовое обновление записей.
 
+        Записи обновляются одним запросом на каждые `BULK_UPDATE_CHUNK` записей:
+        `UPDATE ... SET col = CASE id WHEN ... END WHERE id IN (...)`. Столбцы, не
+        заданные в записи, сохраняют прежнее значение (`ELSE col`). В отличие от
+        executemany, у такого запроса драйвер (в том числе asyncpg) сообщает
+        настоящее количество измененных строк. Записи без `id` пропускаются.
+        Сессия не синхронизируется: уже загруженные в неё записи не обновляются.
+
         Args:
             session (AsyncSession): Сессия для взаимодействия с БД.
             records (List[BaseModel]): Список записей для обновления.
 
         Returns:
-            int: Количество обновленных записей.
+            int: Количество обновленных записей (rowcount запросов).
         """
         logger.info(f"Массовое обновление записей {cls.model.__name__}")
+        rows = [
+            record_dict
+            for record_dict in (
+                record.model_dump(exclude_unset=True) for record in records
+            )
+            if "id" in record_dict
+        ]
+        if not rows:
+            return 0
+        table = cls.model.__table__
         try:
             updated_count = 0
-            for record in records:
-                record_dict = record.model_dump(exclude_unset=True)
-                if "id" not in record_dict:
+            for start in range(0, len(rows), BULK_UPDATE_CHUNK):
+                chunk = rows[start : start + BULK_UPDATE_CHUNK]
+                columns = {key for row in chunk for key in row if key != "id"}
+                values = {
+                    name: case(
+                        {
+                            row["id"]: literal(row[name], table.c[name].type)
+                            for row in chunk
+                            if name in row
+                        },
+                        value=cls.model.id,
+                        else_=table.c[name],
+                    )
+                    for name in sorted(columns)
+                }
+                if not values:
                     continue
-
-                update_data = {k: v for k, v in record_dict.items() if k != "id"}
                 stmt = (
                     sqlalchemy_update(cls.model)
-                    .filter_by(id=record_dict["id"])
-                    .values(**update_data)
+                    .where(cls.model.id.in_([row["id"] for row in chunk]))
+                    .values(values)
+                    .execution_options(synchronize_session=False)
                 )
                 result = await session.execute(stmt)
                 updated_count += result.rowcount
-
-            await session.commit()
             logger.info(f"Обновлено {updated_count} записей")
             return updated_count
         except SQLAlchemyError as e:
-            await session.rollback()
             logger.error(f"Ошибка при массовом обновлении: {e}")
             raise e
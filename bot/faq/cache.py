@@ -0,0 +1,354 @@
+import asyncio
+import secrets
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from aiogram.types import (
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from loguru import logger
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.config import redis_client
+from bot.database import async_session
+from bot.faq.dao import QuestionsDAO
+from bot.faq.keyboards.inline_kb import faq_categories_keyboard, faq_page_keyboard
+from bot.faq.schemas import QuestionFilter
+from bot.faq.search import FAQSearchIndex
+
+VERSION_KEY = "faq:version"
+SNAPSHOT_KEY = "faq:snapshot"
+BUILD_LOCK_KEY = "faq:build"
+BUILD_LOCK_TTL = 10
+# Снимает блокировку, только если её значение — токен этого процесса
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+BUILD_WAIT_STEPS = 50
+CHANNEL = "faq:invalidate"
+# Снимок можно вытеснить при нехватке памяти: он восстанавливается из БД
+SNAPSHOT_TTL = 24 * 3600
+# Вопросов на одной странице клавиатуры
+PAGE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class FAQEntry:
+    """
+    Вопрос базы знаний в кэше.
+
+    Атрибуты:
+        id (int): ID вопроса в таблице `Questions`.
+        question (str): Текст вопроса.
+        answer (str): Текст ответа.
+        category (Optional[str]): Раздел базы знаний.
+    """
+
+    id: int
+    question: str
+    answer: str
+    category: Optional[str] = None
+
+
+def render_answer(entry: FAQEntry) -> str:
+    """Возвращает текст сообщения с ответом на вопрос."""
+    return (
+        f"Ответ на вопрос: {entry.question}\n\n"
+        f"<b>{entry.answer}</b>\n\n"
+        f"Выбери другой вопрос:"
+    )
+
+
+@dataclass
+class FAQSnapshot:
+    """
+    Версия базы знаний с заранее подготовленными сообщениями.
+
+    Вопросы разбиты на страницы по `PAGE_SIZE`: все вместе (ключ "a") и по каждому
+    разделу (ключ — номер раздела в `categories`). Клавиатуры всех страниц строятся
+    один раз на версию, поэтому листание не требует ни БД, ни отрисовки.
+
+    Атрибуты:
+        version (int): Версия базы знаний в Redis.
+        entries (Dict[int, FAQEntry]): Вопросы по ID.
+        categories (List[str]): Разделы базы знаний.
+        answers (Dict[int, str]): Готовые тексты ответов по ID вопроса.
+        pages (Dict[str, List[InlineKeyboardMarkup]]): Клавиатуры страниц по ключу раздела.
+        titles (Dict[str, str]): Заголовки сообщений по ключу раздела.
+        start_title (str): Заголовок первого сообщения `/faq`.
+        start_keyboard (InlineKeyboardMarkup): Первая клавиатура `/faq`: разделы
+            или первая страница вопросов, если разделов нет.
+        answer_keyboards (Dict[int, InlineKeyboardMarkup]): Клавиатура, которая
+            показывается под ответом (страница, на которой стоит вопрос).
+        inline_results (Dict[int, InlineQueryResultArticle]): Готовые результаты
+            inline-поиска по ID вопроса.
+    """
+
+    version: int
+    entries: Dict[int, FAQEntry]
+    categories: List[str] = field(init=False)
+    answers: Dict[int, str] = field(init=False)
+    pages: Dict[str, List[InlineKeyboardMarkup]] = field(init=False)
+    titles: Dict[str, str] = field(init=False)
+    start_title: str = field(init=False)
+    start_keyboard: InlineKeyboardMarkup = field(init=False)
+    answer_keyboards: Dict[int, InlineKeyboardMarkup] = field(init=False)
+    inline_results: Dict[int, InlineQueryResultArticle] = field(init=False)
+
+    def __post_init__(self) -> None:
+        entries = sorted(self.entries.values(), key=lambda entry: entry.id)
+        self.categories = sorted({e.category for e in entries if e.category})
+        self.answers = {entry.id: render_answer(entry) for entry in entries}
+        self.inline_results = {
+            entry.id: InlineQueryResultArticle(
+                id=str(entry.id),
+                title=entry.question,
+                description=entry.answer[:100],
+                input_message_content=InputTextMessageContent(
+                    message_text=f"<b>{entry.question}</b>\n\n{entry.answer}"
+                ),
+            )
+            for entry in entries
+        }
+        self.pages, self.titles, self.answer_keyboards = {}, {}, {}
+
+        self._add_pages("a", "Частые вопросы:", entries)
+        for index, category in enumerate(self.categories):
+            self._add_pages(
+                str(index),
+                f"Частые вопросы — {category}:",
+                [entry for entry in entries if entry.category == category],
+            )
+
+        self.start_title = (
+            "Разделы базы знаний:" if self.categories else "Частые вопросы:"
+        )
+        self.start_keyboard = (
+            faq_categories_keyboard(self.categories)
+            if self.categories
+            else self.pages["a"][0]
+        )
+
+    def _add_pages(self, key: str, title: str, entries: List[FAQEntry]) -> None:
+        chunks = [
+            entries[start : start + PAGE_SIZE]
+            for start in range(0, len(entries), PAGE_SIZE)
+        ] or [[]]
+        self.titles[key] = title
+        self.pages[key] = [
+            faq_page_keyboard(
+                chunk, page, len(chunks), key, with_categories=bool(self.categories)
+            )
+            for page, chunk in enumerate(chunks)
+        ]
+        # Под ответом показываем страницу раздела вопроса (разделы добавляются
+        # после общего списка), а для вопросов без раздела — страницу общего списка
+        for page, chunk in enumerate(chunks):
+            for entry in chunk:
+                self.answer_keyboards[entry.id] = self.pages[key][page]
+
+    def page(self, key: str, page: int) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+        """
+        Возвращает заголовок и клавиатуру страницы.
+
+        Номер страницы ограничивается числом страниц: кнопка могла остаться в
+        сообщении от прошлой версии базы знаний.
+
+        Args:
+            key (str): Ключ раздела ("a" — все вопросы).
+            page (int): Номер страницы (с нуля).
+
+        Returns:
+            Optional[Tuple[str, InlineKeyboardMarkup]]: Заголовок и клавиатура или
+                None, если раздела больше нет.
+        """
+        pages = self.pages.get(key)
+        if pages is None:
+            return None
+        return self.titles[key], pages[min(max(page, 0), len(pages) - 1)]
+
+
+class FAQCache:
+    """
+    Общий для всех процессов кэш базы знаний.
+
+    Вопросы хранятся в Redis одним снимком с номером версии, поэтому после
+    изменения базы знаний БД читает один процесс, а остальные берут снимок из
+    Redis. Каждый процесс держит в памяти готовые клавиатуры и тексты ответов и
+    перезагружает их, когда по pub/sub приходит новая версия (см. `invalidate`).
+
+    Атрибуты:
+        index (FAQSearchIndex): Поисковый индекс по вопросам и ответам; при каждой
+            загрузке переиндексируются только изменившиеся вопросы.
+    """
+
+    def __init__(
+        self, redis: Redis, session_pool: async_sessionmaker[AsyncSession]
+    ) -> None:
+        """
+        Args:
+            redis (Redis): Клиент Redis.
+            session_pool (async_sessionmaker[AsyncSession]): Фабрика сессий БД.
+        """
+        self.redis = redis
+        self.session_pool = session_pool
+        self._release_lock = redis.register_script(RELEASE_LOCK_SCRIPT)
+        self._snapshot: Optional[FAQSnapshot] = None
+        self.index = FAQSearchIndex()
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get(self) -> FAQSnapshot:
+        """Возвращает текущую версию базы знаний (при первом вызове загружает её)."""
+        if self._snapshot is None:
+            await self.reload()
+        return self._snapshot
+
+    async def reload(self, version: Optional[int] = None) -> None:
+        """
+        Загружает базу знаний из Redis, а если снимка актуальной версии там нет — из БД.
+
+        Args:
+            version (Optional[int]): Версия из уведомления; загрузка пропускается,
+                если в памяти уже она или более новая.
+        """
+        async with self._lock:
+            if (
+                version is not None
+                and self._snapshot is not None
+                and self._snapshot.version >= version
+            ):
+                return
+            current, entries = await self._read_snapshot()
+            if entries is None:
+                current, entries = await self._build_snapshot()
+            self._snapshot = FAQSnapshot(
+                version=current, entries={entry.id: entry for entry in entries}
+            )
+            reindexed = self.index.update(
+                {entry.id: (entry.question, entry.answer) for entry in entries}
+            )
+            logger.info(
+                f"База знаний загружена: версия {current}, {len(entries)} вопросов, "
+                f"переиндексировано {reindexed}"
+            )
+
+    async def _read_snapshot(self) -> Tuple[int, Optional[List[FAQEntry]]]:
+        """Возвращает текущую версию и снимок из Redis, если он этой версии."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(VERSION_KEY)
+            pipe.get(SNAPSHOT_KEY)
+            current, raw = await pipe.execute()
+        current = int(current or 0)
+        stored = orjson.loads(raw) if raw else None
+        if stored and stored["version"] == current:
+            return current, [FAQEntry(**item) for item in stored["entries"]]
+        return current, None
+
+    async def _build_snapshot(self) -> Tuple[int, List[FAQEntry]]:
+        """Читает вопросы из БД и сохраняет снимок в Redis."""
+        # Снимок строит один процесс, остальные ждут его появления в Redis.
+        # Значение блокировки — случайный токен: если сборка шла дольше
+        # BUILD_LOCK_TTL и блокировку уже взял другой процесс, чужую не снимаем
+        token = secrets.token_hex(16)
+        for _ in range(BUILD_WAIT_STEPS):
+            if await self.redis.set(BUILD_LOCK_KEY, token, nx=True, ex=BUILD_LOCK_TTL):
+                break
+            await asyncio.sleep(0.1)
+            current, entries = await self._read_snapshot()
+            if entries is not None:
+                return current, entries
+
+        try:
+            current, _ = await self._read_snapshot()
+            entries = await self._load_from_db()
+            # Снимок помечается версией, прочитанной до запроса к БД: если базу
+            # успели изменить, его версия устареет и его перечитают снова
+            await self.redis.set(
+                SNAPSHOT_KEY,
+                orjson.dumps(
+                    {
+                        "version": current,
+                        "entries": [asdict(entry) for entry in entries],
+                    }
+                ),
+                ex=SNAPSHOT_TTL,
+            )
+        finally:
+            await self._release_lock(keys=[BUILD_LOCK_KEY], args=[token])
+        return current, entries
+
+    async def _load_from_db(self) -> List[FAQEntry]:
+        async with self.session_pool() as session:
+            questions = await QuestionsDAO.find_all(
+                session=session, filters=QuestionFilter()
+            )
+        return [
+            FAQEntry(id=q.id, question=q.question, answer=q.answer, category=q.category)
+            for q in questions
+        ]
+
+    async def invalidate(self) -> int:
+        """
+        Сообщает всем процессам, что база знаний изменилась.
+
+        Вызывается `QuestionsDAO` после фиксации изменений таблицы `Questions`
+        и вручную (`python -m bot.faq.cache`) после правок в обход бота.
+
+        Returns:
+            int: Новая версия базы знаний.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(VERSION_KEY)
+            pipe.delete(SNAPSHOT_KEY)
+            version, _ = await pipe.execute()
+        await self.redis.publish(CHANNEL, version)
+        return version
+
+    async def _listen(self) -> None:
+        """Перезагружает кэш по уведомлениям об изменении базы знаний."""
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    # Уведомления, пришедшие до подписки, могли потеряться
+                    await self.reload()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            await self.reload(version=int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка подписки на изменения базы знаний: {e}")
+                await asyncio.sleep(5)
+
+    def start(self) -> None:
+        """Запускает фоновую подписку на изменения базы знаний."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        """Останавливает подписку."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+faq_cache = FAQCache(redis_client, async_session)
+
+
+if __name__ == "__main__":
+    # После изменения вопросов в БД: python -m bot.faq.cache
+    async def main() -> None:
+        version = await faq_cache.invalidate()
+        print(f"Версия базы знаний: {version}")
+
+    asyncio.run(main())
@@ -1,8 +1,47 @@
-from typing import Type
+import asyncio
+from typing import List, Sequence, Set, Type
+
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.base import ExecutableOption
 
 from bot.dao.base import BaseDAO
 from bot.faq.models import Questions
 
+# Флаг в session.info: после commit сессии нужно сбросить кэш базы знаний
+INVALIDATE_FLAG = "faq_invalidate"
+# Флаг в session.info: обработчики commit и rollback уже подключены к сессии
+LISTENERS_FLAG = "faq_listeners"
+# Запущенные сбросы кэша (ссылки не дают сборщику мусора отменить задачи)
+_invalidations: Set[asyncio.Task] = set()
+
+
+def _invalidated(task: asyncio.Task) -> None:
+    """Логирует ошибку сброса кэша базы знаний."""
+    _invalidations.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Ошибка при сбросе кэша базы знаний: {task.exception()}")
+
+
+def _after_commit(session: Session) -> None:
+    """Сбрасывает кэш базы знаний, если транзакция меняла вопросы."""
+    if not session.info.pop(INVALIDATE_FLAG, False):
+        return
+    # Импорт здесь: bot.faq.cache сам импортирует QuestionsDAO
+    from bot.faq.cache import faq_cache
+
+    task = asyncio.get_running_loop().create_task(faq_cache.invalidate())
+    _invalidations.add(task)
+    task.add_done_callback(_invalidated)
+
+
+def _after_rollback(session: Session) -> None:
+    """Изменения откатились: сбрасывать кэш не нужно."""
+    session.info.pop(INVALIDATE_FLAG, None)
+
 
 class QuestionsDAO(BaseDAO[Questions]):
     """
@@ -11,6 +50,11 @@ class QuestionsDAO(BaseDAO[Questions]):
     Этот класс наследует методы от `BaseDAO` и предоставляет дополнительные
     операции для работы с объектами модели `Questions`.
 
+    Все изменяющие методы (`add`, `add_many`, `update`, `update_returning`,
+    `delete`, `upsert`, `bulk_update`) после фиксации транзакции сессии вызывают
+    `faq_cache.invalidate()`, и все процессы перечитывают базу знаний. Если
+    транзакция откатилась, кэш не сбрасывается.
+
     Атрибуты:
         model (Type[Questions]): Модель, с которой работает данный DAO (в данном случае, таблица вопросов и ответов).
     """
@@ -18,3 +62,66 @@ class QuestionsDAO(BaseDAO[Questions]):
     model: Type[Questions] = (
         Questions  # Модель для работы с данными вопросов и ответов.
     )
+
+    @classmethod
+    def _invalidate_after_commit(cls, session: AsyncSession) -> None:
+        """Сбрасывает кэш базы знаний после ближайшего commit сессии."""
+        session.info[INVALIDATE_FLAG] = True
+        if not session.info.get(LISTENERS_FLAG):
+            session.info[LISTENERS_FLAG] = True
+            event.listen(session.sync_session, "after_commit", _after_commit)
+            event.listen(session.sync_session, "after_rollback", _after_rollback)
+
+    @classmethod
+    async def add(cls, session: AsyncSession, values: BaseModel) -> Questions:
+        record = await super().add(session, values)
+        cls._invalidate_after_commit(session)
+        return record
+
+    @classmethod
+    async def add_many(
+        cls, session: AsyncSession, instances: List[BaseModel]
+    ) -> List[Questions]:
+        records = await super().add_many(session, instances)
+        cls._invalidate_after_commit(session)
+        return records
+
+    @classmethod
+    async def update(
+        cls, session: AsyncSession, filters: BaseModel, values: BaseModel
+    ) -> int:
+        updated = await super().update(session, filters, values)
+        cls._invalidate_after_commit(session)
+        return updated
+
+    @classmethod
+    async def update_returning(
+        cls,
+        session: AsyncSession,
+        filters: BaseModel,
+        values: BaseModel,
+        options: Sequence[ExecutableOption] = (),
+    ) -> List[Questions]:
+        records = await super().update_returning(session, filters, values, options)
+        cls._invalidate_after_commit(session)
+        return records
+
+    @classmethod
+    async def delete(cls, session: AsyncSession, filters: BaseModel) -> int:
+        deleted = await super().delete(session, filters)
+        cls._invalidate_after_commit(session)
+        return deleted
+
+    @classmethod
+    async def upsert(
+        cls, session: AsyncSession, unique_fields: List[str], values: BaseModel
+    ) -> Questions:
+        record = await super().upsert(session, unique_fields, values)
+        cls._invalidate_after_commit(session)
+        return record
+
+    @classmethod
+    async def bulk_update(cls, session: AsyncSession, records: List[BaseModel]) -> int:
+        updated = await super().bulk_update(session, records)
+        cls._invalidate_after_commit(session)
+        return updated
@@ -1,7 +1,11 @@
+from typing import TYPE_CHECKING, Sequence
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from bot.faq.models import Questions
+if TYPE_CHECKING:
+    # bot.faq.cache сам импортирует клавиатуры
+    from bot.faq.cache import FAQEntry
 
 # def admin_keyboard() -> InlineKeyboardMarkup:
 #     kb = InlineKeyboardBuilder()
@@ -10,12 +14,22 @@ from bot.faq.models import Questions
 #     return kb.as_markup()
 
 
-def faq_inline_keyboard(questions: list[Questions]) -> InlineKeyboardMarkup:
+def faq_page_keyboard(
+    questions: Sequence["FAQEntry"],
+    page: int,
+    pages: int,
+    category_key: str,
+    with_categories: bool,
+) -> InlineKeyboardMarkup:
     """
-    Создает инлайн клавиатуру с вопросами и кнопкой "На главную".
+    Создает инлайн клавиатуру со страницей вопросов, кнопками листания и "На главную".
 
     Args:
-        questions (list[Questions]): Список объектов с вопросами и ответами.
+        questions (Sequence[FAQEntry]): Вопросы этой страницы из кэша базы знаний.
+        page (int): Номер страницы (с нуля).
+        pages (int): Всего страниц.
+        category_key (str): Ключ раздела в данных коллбека ("a" — все вопросы).
+        with_categories (bool): Добавить ли кнопку возврата к списку разделов.
 
     Returns:
         InlineKeyboardMarkup: Клавиатура с кнопками.
@@ -24,7 +38,29 @@ def faq_inline_keyboard(questions: list[Questions]) -> InlineKeyboardMarkup:
 
     # Добавляем кнопки для каждого вопроса
     for el in questions:
-        builder.button(text=el.question, callback_data=f"qst_{el.id}")
+        builder.row(
+            InlineKeyboardButton(text=el.question, callback_data=f"qst_{el.id}")
+        )
+
+    # Кнопки листания, если страниц несколько
+    if pages > 1:
+        builder.row(
+            InlineKeyboardButton(
+                text="◀️",
+                callback_data=f"faqp_{category_key}_{(page - 1) % pages}",
+            ),
+            InlineKeyboardButton(
+                text=f"{page + 1}/{pages}",
+                callback_data=f"faqp_{category_key}_{page}",
+            ),
+            InlineKeyboardButton(
+                text="▶️",
+                callback_data=f"faqp_{category_key}_{(page + 1) % pages}",
+            ),
+        )
+
+    if with_categories:
+        builder.row(InlineKeyboardButton(text="К разделам", callback_data="faqc"))
 
     # Добавляем кнопку "На главную" в конце
     builder.row(
@@ -33,16 +69,23 @@ def faq_inline_keyboard(questions: list[Questions]) -> InlineKeyboardMarkup:
             callback_data="back_home",
         )
     )
+    return builder.as_markup()
 
-    # Создаем правила распределения кнопок по строкам
-    # buttons_rule = [2 for _ in questions[::2]]  # Каждые две кнопки в строке
 
-    # Если количество кнопок нечетное, последняя строка будет с одной кнопкой
-    # if len(questions) % 2 != 0:
-    #     buttons_rule[-1] = 1
+def faq_categories_keyboard(categories: Sequence[str]) -> InlineKeyboardMarkup:
+    """
+    Создает инлайн клавиатуру с разделами базы знаний.
 
-    # Добавляем строку для кнопок
-    # buttons_rule.append(1)  # Для кнопки "На главную"
-    # builder.adjust(*buttons_rule)
+    Args:
+        categories (Sequence[str]): Названия разделов; в коллбеке передается их номер.
+
+    Returns:
+        InlineKeyboardMarkup: Клавиатура с кнопками.
+    """
+    builder = InlineKeyboardBuilder()
+    for index, category in enumerate(categories):
+        builder.button(text=category, callback_data=f"faqp_{index}_0")
+    builder.button(text="Все вопросы", callback_data="faqp_a_0")
+    builder.button(text="На главную", callback_data="back_home")
     builder.adjust(1)
     return builder.as_markup()
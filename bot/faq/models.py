@@ -1,7 +1,7 @@
 from sqlalchemy import String
 from sqlalchemy.orm import Mapped, mapped_column
 
-from bot.database import Base, int_pk
+from bot.database import Base, int_pk, str_null_true
 
 
 class Questions(Base):
@@ -17,6 +17,7 @@ class Questions(Base):
     - id (int): Уникальный идентификатор вопроса (первичный ключ).
     - question (str): Текст вопроса, который задается пользователем.
     - answer (str): Ответ на заданный вопрос.
+    - category (Optional[str]): Раздел базы знаний (необязательно).
     """
 
     id: Mapped[int_pk]
@@ -26,6 +27,7 @@ class Questions(Base):
     answer: Mapped[str] = mapped_column(
         String, nullable=False
     )  # Текст ответа (обязательное поле)
+    category: Mapped[str_null_true]  # Раздел базы знаний (необязательное поле)
 
     def __repr__(self):
         """
@@ -4,21 +4,19 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineQuery, Message
 from aiogram.utils.chat_action import ChatActionSender
 from loguru import logger
 
-from bot.database import connection
-from bot.faq.dao import QuestionsDAO
-from bot.faq.keyboards.inline_kb import faq_inline_keyboard
-from bot.faq.schemas import QuestionFilter
-from bot.faq.utils import update_cache
+from bot.faq.cache import faq_cache
 from bot.users.keyboards.markup_kb import main_kb
 from bot.users.router import CheckForm
+from bot.utils.edit_digest import edit_digests
 
 faq_router = Router()
-# Глобальный кэш для хранения вопросов и ответов
-questions_cache = {}
+# Сколько результатов показывать в inline-поиске и сколько секунд Telegram их кэширует
+INLINE_RESULTS = 20
+INLINE_CACHE_TIME = 300
 
 
 class Answering(StatesGroup):
@@ -28,17 +26,16 @@ class Answering(StatesGroup):
 # Обработчик команды '/faq' и текстового сообщения 'База знаний'
 @faq_router.message(Command("faq"))
 @faq_router.message(F.text.contains("База знаний"))
-@connection()
-async def faq_start(message: Message, session, state: FSMContext, **kwargs) -> None:
+async def faq_start(message: Message, state: FSMContext, **kwargs) -> None:
     """
     Обработчик команды '/faq' и текстового сообщения 'База знаний'. Отправляет пользователю список частых вопросов с кнопками.
 
-    Это действие извлекает вопросы из базы данных и кэширует их в память. Затем пользователю отправляется
-    сообщение с кнопками для выбора вопросов.
+    Вопросы и готовая клавиатура берутся из общего кэша базы знаний (`faq_cache`),
+    поэтому запроса к базе данных нет. Если у вопросов есть разделы, сначала
+    показывается список разделов, иначе — первая страница вопросов.
 
     Args:
         message (Message): Сообщение, отправленное пользователем.
-        session: Сессия для работы с базой данных.
         state (FSMContext): Контекст состояния машины состояний для пользователя.
         **kwargs: Дополнительные аргументы, передаваемые через декоратор.
 
@@ -53,20 +50,10 @@ async def faq_start(message: Message, session, state: FSMContext, **kwargs) -> N
 
         # Имитация набора текста
         async with ChatActionSender.typing(bot=message.bot, chat_id=message.chat.id):
-            # Получаем все вопросы из базы данных
-            questions_filter = QuestionFilter()
-            questions_answers = await QuestionsDAO.find_all(
-                session=session, filters=questions_filter
-            )
-
-            # Кэшируем вопросы в памяти для быстрого доступа
-            update_cache(questions_cache, {q.id: q for q in questions_answers})
+            faq = await faq_cache.get()
 
             # Отправляем пользователю сообщение с вопросами и кнопками
-            await message.answer(
-                "Частые вопросы:",
-                reply_markup=faq_inline_keyboard(list(questions_cache.values())),
-            )
+            await message.answer(faq.start_title, reply_markup=faq.start_keyboard)
             await state.set_state(Answering.check)
 
     except TelegramBadRequest as e:
@@ -89,8 +76,8 @@ async def faq_callback(call: CallbackQuery) -> None:
     """
     Обработчик коллбек-запроса для выбора ответа на вопрос из списка.
 
-    Получает ID вопроса из данных коллбека, извлекает его из кэша
-    и отправляет ответ в том виде, в котором он был сохранен в базе данных.
+    Получает ID вопроса из данных коллбека и берет готовый текст ответа
+    из кэша базы знаний (`faq_cache`).
 
     Если данных по данному вопросу нет в кэше, пользователю отправляется сообщение
     о том, что ответ не найден. В случае других ошибок пользователю отправляется
@@ -103,7 +90,7 @@ async def faq_callback(call: CallbackQuery) -> None:
         None: Функция не возвращает значений, но редактирует сообщение с ответом на вопрос.
 
     Raises:
-        TelegramBadRequest: Если сообщение не может быть изменено (например, текст не изменился).
+        TelegramBadRequest: Если сообщение не может быть изменено.
         Exception: В случае других ошибок при обработке запроса.
     """
     try:
@@ -113,26 +100,19 @@ async def faq_callback(call: CallbackQuery) -> None:
         # Извлекаем ID вопроса из данных коллбека
         qst_id: int = int(call.data.replace("qst_", ""))
 
-        # Получаем данные вопроса из кэша
-        qst_data: QuestionsDAO = questions_cache.get(qst_id)
-
-        if qst_data:
-            # Конвертируем данные вопроса в словарь
-            qst_data_dict = qst_data.to_dict()
-            msg_text = (
-                f"Ответ на вопрос: {qst_data_dict['question']}\n\n"
-                f"<b>{qst_data_dict['answer']}</b>\n\n"
-                f"Выбери другой вопрос:"
+        # Получаем готовый текст ответа из кэша
+        faq = await faq_cache.get()
+        msg_text = faq.answers.get(qst_id)
+
+        if msg_text:
+            # Запрос не отправляется, если этот ответ уже показан в сообщении
+            await edit_digests.edit_text(
+                call.message.chat.id,
+                call.message.message_id,
+                msg_text,
+                reply_markup=faq.answer_keyboards[qst_id],
             )
 
-            # Проверяем, совпадает ли новый текст с текущим
-            current_text: str = call.message.text
-            if current_text != msg_text:
-                await call.message.edit_text(
-                    msg_text,
-                    reply_markup=faq_inline_keyboard(list(questions_cache.values())),
-                )
-
         else:
             await call.message.answer("Ответ на данный вопрос не найден.")
 
@@ -145,6 +125,111 @@ async def faq_callback(call: CallbackQuery) -> None:
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
 
 
+# Обработчик листания страниц вопросов
+@faq_router.callback_query(F.data.startswith("faqp_"), Answering.check)
+async def faq_page_callback(call: CallbackQuery) -> None:
+    """
+    Обработчик коллбек-запроса для перехода на страницу вопросов.
+
+    Данные коллбека имеют вид `faqp_<раздел>_<страница>`, где раздел — номер раздела
+    или "a" для всех вопросов. Заголовок и клавиатура страницы берутся готовыми из
+    кэша базы знаний.
+
+    Args:
+        call (CallbackQuery): Коллбек-запрос, отправленный пользователем.
+
+    Returns:
+        None: Функция не возвращает значений, но редактирует сообщение со списком вопросов.
+    """
+    try:
+        await call.answer()
+
+        _, category_key, page = call.data.split("_")
+        faq = await faq_cache.get()
+        found = faq.page(category_key, int(page))
+        if found is None:
+            # Раздел исчез в новой версии базы знаний — показываем первый экран
+            found = (faq.start_title, faq.start_keyboard)
+
+        title, keyboard = found
+        await edit_digests.edit_text(
+            call.message.chat.id, call.message.message_id, title, reply_markup=keyboard
+        )
+
+    except TelegramBadRequest as e:
+        # Это срабатывает, если сообщение не было изменено (например, нажата текущая страница)
+        logger.warning(f"Ошибка при попытке редактировать сообщение: {e}")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке запроса: {e}")
+        await call.message.answer("Произошла ошибка. Попробуйте снова.")
+
+
+# Обработчик возврата к списку разделов
+@faq_router.callback_query(F.data == "faqc", Answering.check)
+async def faq_categories_callback(call: CallbackQuery) -> None:
+    """
+    Обработчик коллбек-запроса для возврата к списку разделов базы знаний.
+
+    Args:
+        call (CallbackQuery): Коллбек-запрос, отправленный пользователем.
+
+    Returns:
+        None: Функция не возвращает значений, но редактирует сообщение со списком разделов.
+    """
+    try:
+        await call.answer()
+
+        faq = await faq_cache.get()
+        await edit_digests.edit_text(
+            call.message.chat.id,
+            call.message.message_id,
+            faq.start_title,
+            reply_markup=faq.start_keyboard,
+        )
+
+    except TelegramBadRequest as e:
+        logger.warning(f"Ошибка при попытке редактировать сообщение: {e}")
+    except Exception as e:
+        logger.error(f"Ошибка при обработке запроса: {e}")
+        await call.message.answer("Произошла ошибка. Попробуйте снова.")
+
+
+# Inline-поиск по базе знаний: @бот <текст вопроса> в любом чате
+@faq_router.inline_query()
+async def faq_inline_search(inline_query: InlineQuery) -> None:
+    """
+    Обработчик inline-запроса: ищет вопросы базы знаний по тексту запроса.
+
+    Поиск идет по индексу триграмм в памяти (`faq_cache.index`), готовые результаты
+    берутся из кэша. Пустой запрос возвращает первые вопросы базы знаний. Ответ
+    кэшируется Telegram на `INLINE_CACHE_TIME` секунд, поэтому популярные запросы
+    до бота не доходят.
+
+    Args:
+        inline_query (InlineQuery): Inline-запрос пользователя.
+
+    Returns:
+        None: Функция не возвращает значений, но отвечает на inline-запрос.
+    """
+    try:
+        faq = await faq_cache.get()
+        query = inline_query.query.strip()
+        if query:
+            found = faq_cache.index.search(query, limit=INLINE_RESULTS, min_score=0.3)
+            ids = [question_id for question_id, _ in found]
+        else:
+            ids = list(faq.inline_results)[:INLINE_RESULTS]
+
+        await inline_query.answer(
+            [faq.inline_results[i] for i in ids if i in faq.inline_results],
+            cache_time=INLINE_CACHE_TIME,
+            is_personal=False,
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка при обработке inline-запроса: {e}")
+
+
 # Обработчик для перехода назад в основное меню
 @faq_router.callback_query(F.data.startswith("back_home"), Answering.check)
 async def faq_main_menu(call: CallbackQuery, state: FSMContext) -> None:
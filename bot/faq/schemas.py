@@ -11,6 +11,7 @@ class QuestionFilter(BaseModel):
     id: Optional[int] = None  # Фильтр по ID
     question: Optional[str] = None  # Фильтр по тексту вопроса
     answer: Optional[str] = None  # Фильтр по тексту ответа
+    category: Optional[str] = None  # Фильтр по разделу
 
     class Config:
         from_attributes = True  # Заменено orm_mode на from_attributes
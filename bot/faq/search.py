@@ -0,0 +1,136 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Вес триграммы из текста вопроса относительно триграммы из ответа
+QUESTION_WEIGHT = 2.0
+ANSWER_WEIGHT = 1.0
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре (ё приводится к е)."""
+    return _WORD.findall(text.lower().replace("ё", "е"))
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Возвращает множество триграмм слов текста.
+
+    Слова дополняются пробелом по краям, поэтому совпадение начала слова весит
+    больше, а разные окончания («кредит», «кредита», «кредиту») почти не мешают
+    совпадению — это заменяет стемминг для русского языка.
+    """
+    grams: Set[str] = set()
+    for word in normalize(text):
+        padded = f" {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FAQSearchIndex:
+    """
+    Инвертированный индекс базы знаний по триграммам.
+
+    Для каждой триграммы хранится, в каких вопросах она встречается и с каким
+    весом (в тексте вопроса — `QUESTION_WEIGHT`, только в ответе — `ANSWER_WEIGHT`).
+    Оценка документа — сумма весов совпавших триграмм запроса с учетом их редкости
+    (IDF), деленная на максимально возможную сумму, т.е. число от 0 до 1.
+
+    Индекс обновляется инкрементально: `update` переиндексирует только добавленные,
+    измененные и удаленные вопросы.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._documents: Dict[int, Tuple[str, str]] = {}
+        self._grams: Dict[int, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _add(self, doc_id: int, question: str, answer: str) -> None:
+        weights = {gram: ANSWER_WEIGHT for gram in trigrams(answer)}
+        weights.update({gram: QUESTION_WEIGHT for gram in trigrams(question)})
+        for gram, weight in weights.items():
+            self._postings[gram][doc_id] = weight
+        self._documents[doc_id] = (question, answer)
+        self._grams[doc_id] = weights
+
+    def _remove(self, doc_id: int) -> None:
+        for gram in self._grams.pop(doc_id, {}):
+            postings = self._postings[gram]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[gram]
+        self._documents.pop(doc_id, None)
+
+    def update(self, documents: Dict[int, Tuple[str, str]]) -> int:
+        """
+        Приводит индекс к новому набору документов.
+
+        Args:
+            documents (Dict[int, Tuple[str, str]]): ID вопроса → (вопрос, ответ).
+
+        Returns:
+            int: Сколько документов переиндексировано (добавлено, изменено или удалено).
+        """
+        changed = 0
+        for doc_id in set(self._documents) - set(documents):
+            self._remove(doc_id)
+            changed += 1
+        for doc_id, (question, answer) in documents.items():
+            if self._documents.get(doc_id) == (question, answer):
+                continue
+            self._remove(doc_id)
+            self._add(doc_id, question, answer)
+            changed += 1
+        return changed
+
+    def search(
+        self, query: str, limit: int = 10, min_score: float = 0.0
+    ) -> List[Tuple[int, float]]:
+        """
+        Ищет вопросы, похожие на запрос.
+
+        Args:
+            query (str): Текст запроса.
+            limit (int): Максимальное количество результатов.
+            min_score (float): Минимальная оценка (от 0 до 1) для попадания в результаты.
+
+        Returns:
+            List[Tuple[int, float]]: Пары (ID вопроса, оценка) по убыванию оценки.
+        """
+        query_grams = trigrams(query)
+        grams = [gram for gram in query_grams if gram in self._postings]
+        if not grams:
+            return []
+        total = self._max_score(query_grams)
+
+        scores: Dict[int, float] = defaultdict(float)
+        count = len(self._documents)
+        for gram in grams:
+            postings = self._postings[gram]
+            idf = math.log(1 + count / len(postings))
+            for doc_id, weight in postings.items():
+                scores[doc_id] += weight * idf
+
+        ranked = heapq.nlargest(
+            limit,
+            ((doc_id, score / total) for doc_id, score in scores.items()),
+            key=lambda item: item[1],
+        )
+        return [item for item in ranked if item[1] >= min_score]
+
+    def _max_score(self, grams: Iterable[str]) -> float:
+        """Оценка документа, в вопросе которого есть все триграммы запроса."""
+        count = len(self._documents)
+        # Триграммы, которых нет в индексе, считаются самыми редкими
+        return sum(
+            QUESTION_WEIGHT
+            * math.log(1 + count / max(len(self._postings.get(gram, ())), 1))
+            for gram in grams
+        )
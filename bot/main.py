@@ -3,15 +3,59 @@ import asyncio
 from loguru import logger
 
 from bot.admins.router import admin_router
+from bot.application_form.render import card_renderer
 from bot.application_form.router import application_form_router
-from bot.config import admins, bot, dp
+from bot.application_form.utils import draft_metrics
+from bot.config import (
+    admins,
+    bot,
+    dp,
+    paced_delivery,
+    redis_client,
+    send_scheduler,
+    settings,
+    storage,
+)
+from bot.database import async_session
 from bot.echo.router import echo_router
+from bot.faq.cache import faq_cache
 from bot.faq.router import faq_router
 from bot.help.router import help_router
-from bot.other_handler.router import other_router
+from bot.middlewares.album import AlbumMiddleware
+from bot.middlewares.chat_executor import ChatExecutorMiddleware
+from bot.middlewares.db_session import DbSessionMiddleware
+from bot.middlewares.fsm_flush import FSMFlushMiddleware
+from bot.middlewares.idempotency import CallbackIdempotencyMiddleware
+from bot.other_handler.router import deflection_metrics, other_router
+from bot.stream import run_ingest, run_worker
 from bot.users.router import user_router
 from bot.utils.commands import set_bot_commands
+from bot.utils.edit_digest import edit_digests
+from bot.utils.fan_out import fan_out
 from bot.utils.set_description_file import set_description
+from bot.webhook import run_webhook
+
+# Сборка альбомов в один апдейт
+album_middleware = AlbumMiddleware(latency=settings.ALBUM_LATENCY)
+# Упорядоченная обработка апдейтов по чатам
+chat_executor = ChatExecutorMiddleware(
+    workers=settings.CHAT_WORKERS, queue_size=settings.CHAT_QUEUE_SIZE
+)
+# Отсечение повторных нажатий кнопок
+callback_idempotency = CallbackIdempotencyMiddleware(
+    redis_client, ttl=settings.CALLBACK_DEDUPE_TTL
+)
+
+
+# Функция, которая выполнится в каждом процессе бота при запуске
+async def start_process():
+    """
+    Подготовка процесса к обработке апдейтов.
+
+    Запускает подписку на изменения базы знаний: она загружается один раз и
+    обновляется по уведомлениям из Redis.
+    """
+    faq_cache.start()
 
 
 # Функция, которая выполнится, когда бот запустится
@@ -22,19 +66,13 @@ async def start_bot():
     Эта функция устанавливает команды для бота с помощью `set_commands()`,
     устанавливает описание с помощью `set_description()`,
     а также отправляет сообщение администраторам, информируя их о запуске бота.
+    Выполняется один раз на развертывание (в режимах ingest/worker — только в ingest).
     """
     # await set_commands(commands_list=commands)
     await set_bot_commands()
     #
     await set_description(bot=bot)
-    for admin_id in admins:
-        try:
-            await bot.send_message(admin_id, "Я запущен🥳.")
-        except Exception as e:
-            logger.bind(user=admin_id).error(
-                f"Не удалось отправить сообщение админу {admin_id}: {e}"
-            )
-            pass
+    await fan_out(admins, lambda admin_id: bot.send_message(admin_id, "Я запущен🥳."))
     logger.info("Бот успешно запущен.")
 
 
@@ -45,24 +83,37 @@ async def stop_bot():
 
     Эта функция отправляет сообщение администраторам, уведомляя их о том,
     что бот был остановлен, и логирует это событие.
+    Выполняется один раз на развертывание (в режимах ingest/worker — только в ingest).
     """
-    try:
-        for admin_id in admins:
-            await bot.send_message(admin_id, "Бот остановлен. За что?😔")
-    except Exception as e:
-        logger.bind(user=admin_id).error(
-            f"Не удалось отправить сообщение админу {admin_id} об остановке бота: {e}"
-        )
-        pass
+    await fan_out(
+        admins, lambda admin_id: bot.send_message(admin_id, "Бот остановлен. За что?😔")
+    )
     logger.error("Бот остановлен!")
 
 
+# Функция, которая выполнится в каждом процессе бота при остановке
+async def stop_process():
+    """Остановка фоновых задач процесса и вывод его метрик."""
+    await chat_executor.close()
+    await faq_cache.close()
+    await paced_delivery.close()
+    logger.info(f"Метрики планировщика отправки: {send_scheduler.metrics.as_dict()}")
+    logger.info(f"Метрики очередей чатов: {chat_executor.metrics.as_dict()}")
+    logger.info(f"Метрики FSM-хранилища: {storage.metrics.as_dict()}")
+    logger.info(f"Метрики подсказок базы знаний: {deflection_metrics.as_dict()}")
+    logger.info(f"Метрики кэша карточек заявок: {card_renderer.metrics.as_dict()}")
+    logger.info(f"Метрики черновиков заявок: {draft_metrics.as_dict()}")
+    logger.info(f"Метрики редактирования сообщений: {edit_digests.metrics.as_dict()}")
+    logger.info(f"Метрики повторных нажатий: {callback_idempotency.metrics.as_dict()}")
+
+
 async def main():
     """
     Основная функция запуска бота.
 
     Эта функция регистрирует роутеры, функции старта и остановки бота, а также
-    запускает бота с использованием long polling для получения обновлений.
+    запускает бота с использованием long polling, webhook или очереди Redis Streams
+    (см. `BOT_MODE`) для получения обновлений.
     """
     # регистрация роутеров
     dp.include_router(help_router)
@@ -73,14 +124,48 @@ async def main():
     dp.include_router(admin_router)
     dp.include_router(echo_router)
 
-    # регистрация функций
-    dp.startup.register(start_bot)
-    dp.shutdown.register(stop_bot)
+    # номер прихода апдейта в его чате выдается раньше встроенных middleware
+    # aiogram: FSMContextMiddleware ждет Redis и мог бы переставить апдейты чата
+    builtin_middlewares = list(dp.update.outer_middleware)
+    for middleware in builtin_middlewares:
+        dp.update.outer_middleware.unregister(middleware)
+    dp.update.outer_middleware(chat_executor.arrival)
+    for middleware in builtin_middlewares:
+        dp.update.outer_middleware(middleware)
+    # регистрация middleware: альбом собирается до остальной обработки апдейта,
+    # затем апдейт встает в очередь своего чата, копит записи FSM до конца обработки
+    # и получает одну сессию БД
+    dp.update.outer_middleware(album_middleware)
+    dp.update.outer_middleware(chat_executor)
+    dp.update.outer_middleware(FSMFlushMiddleware(storage=storage))
+    dp.update.outer_middleware(DbSessionMiddleware(session_pool=async_session))
+    # альбом сворачивается, только если обработчик принимает параметр album
+    dp.message.middleware(album_middleware.mark_consumed)
+    # повторные нажатия отбрасываются после фильтров: нужны флаги обработчика
+    dp.callback_query.middleware(callback_idempotency)
+
+    # регистрация функций: оповещения администраторов отправляются один раз на
+    # развертывание, поэтому воркеры Redis Streams только готовят свой процесс
+    dp.startup.register(start_process)
+    dp.shutdown.register(stop_process)
+    if settings.BOT_MODE != "worker":
+        dp.startup.register(start_bot)
+        dp.shutdown.register(stop_bot)
 
-    # запуск бота в режиме long polling при запуске бот очищает все обновления, которые были за его моменты бездействия
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if settings.BOT_MODE == "webhook":
+            # запуск бота в режиме webhook: апдейты за время простоя не сбрасываются
+            await run_webhook()
+        elif settings.BOT_MODE == "ingest":
+            # прием апдейтов в Redis Streams без обработки
+            await run_ingest()
+        elif settings.BOT_MODE == "worker":
+            # обработка апдейтов из Redis Streams
+            await run_worker()
+        else:
+            # запуск бота в режиме long polling при запуске бот очищает все обновления, которые были за его моменты бездействия
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         await bot.session.close()
 
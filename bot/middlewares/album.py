@@ -0,0 +1,115 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import Message, TelegramObject, Update
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class _PendingAlbum:
+    """
+    Альбом, который сейчас собирается или обрабатывается.
+
+    Атрибуты:
+        messages (List[Message]): Собранные части альбома.
+        done (asyncio.Future): Результат обработки первого апдейта: True, если
+            обработчик принял весь альбом.
+        collecting (bool): Принимает ли альбом новые части.
+    """
+
+    messages: List[Message]
+    done: asyncio.Future
+    collecting: bool = True
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Собирает сообщения одного альбома (общий `media_group_id`) в один пакет.
+
+    Telegram присылает альбом отдельными апдейтами почти одновременно. Первый апдейт
+    альбома ждет, пока в течение `latency` секунд не перестанут приходить новые части,
+    и передает обработчику весь альбом в `data["album"]` (отсортированным по
+    message_id). Остальные апдейты альбома ждут, пока первый будет обработан.
+
+    Альбом сворачивается в один вызов, только если у выбранного обработчика есть
+    параметр `album`: тогда остальные части дальше не идут. Иначе они обрабатываются
+    по порядку, как обычные сообщения, и ни одна часть не теряется. Обработчик
+    известен только после проверки фильтров, поэтому это отмечает `mark_consumed`,
+    зарегистрированный как inner-middleware сообщений.
+
+    Регистрируется как outer-middleware апдейтов диспетчера, поэтому альбом
+    собирается до того, как апдейт попадет в очередь чата.
+    """
+
+    def __init__(self, latency: float = 0.6) -> None:
+        """
+        Args:
+            latency (float): Сколько секунд ждать следующую часть альбома.
+        """
+        self.latency = latency
+        self._albums: Dict[str, _PendingAlbum] = {}
+        self._consumed: Set[str] = set()
+
+    @staticmethod
+    def _group_key(message: Message) -> str:
+        return f"{message.chat.id}:{message.media_group_id}"
+
+    async def __call__(
+        self,
+        handler: Handler,
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        message = event.message
+        if message is None or message.media_group_id is None:
+            return await handler(event, data)
+
+        group_key = self._group_key(message)
+        pending = self._albums.get(group_key)
+        if pending is not None:
+            # Часть уже собираемого альбома: ждем обработки первого апдейта
+            included = pending.collecting
+            if included:
+                pending.messages.append(message)
+            consumed = await asyncio.shield(pending.done)
+            if consumed and included:
+                return None
+            return await handler(event, data)
+
+        pending = self._albums[group_key] = _PendingAlbum(
+            [message], asyncio.get_running_loop().create_future()
+        )
+        try:
+            # Ждем, пока части альбома не перестанут приходить
+            received = 0
+            while received != len(pending.messages):
+                received = len(pending.messages)
+                await asyncio.sleep(self.latency)
+            pending.collecting = False
+
+            data["album"] = sorted(pending.messages, key=lambda m: m.message_id)
+            return await handler(event, data)
+        finally:
+            pending.collecting = False
+            del self._albums[group_key]
+            pending.done.set_result(group_key in self._consumed)
+            self._consumed.discard(group_key)
+
+    async def mark_consumed(
+        self,
+        handler: Handler,
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        """
+        Inner-middleware сообщений: отмечает альбом принятым, если у обработчика
+        есть параметр `album`.
+        """
+        handler_object: HandlerObject = data["handler"]
+        if "album" in data and "album" in handler_object.params:
+            self._consumed.add(self._group_key(event))
+        return await handler(event, data)
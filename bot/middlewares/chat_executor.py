@@ -0,0 +1,296 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Chat, TelegramObject, Update, User
+from loguru import logger
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class ChatExecutorMetrics:
+    """
+    Метрики очередей чатов.
+
+    Атрибуты:
+        queue_depth (int): Сколько апдейтов сейчас ждут обработки во всех чатах.
+        max_queue_depth (int): Максимальная суммарная глубина очередей за время работы.
+        max_chat_depth (int): Максимальная глубина очереди одного чата.
+        active_chats (int): Сколько чатов сейчас имеют необработанные апдейты.
+        processed (int): Сколько апдейтов обработано.
+        waited (int): Сколько апдейтов ждали места в переполненной очереди чата.
+    """
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    max_chat_depth: int = 0
+    active_chats: int = 0
+    processed: int = 0
+    waited: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "max_chat_depth": self.max_chat_depth,
+            "active_chats": self.active_chats,
+            "processed": self.processed,
+            "waited": self.waited,
+        }
+
+
+class ChatExecutorMiddleware(BaseMiddleware):
+    """
+    Упорядоченная обработка апдейтов по чатам на фиксированном пуле воркеров.
+
+    Апдейты одного чата выполняются строго по очереди, апдейты разных чатов —
+    параллельно. У каждого чата своя ограниченная очередь (`queue_size`): если
+    пользователь присылает апдейты быстрее, чем они обрабатываются, новые апдейты
+    ждут места в очереди (по порядку поступления) и ни один не теряется. Чаты, у которых есть работа, попадают в общую
+    очередь готовности, откуда их по одному апдейту забирают `workers` воркеров,
+    поэтому занятый чат не задерживает остальные.
+
+    Регистрируется как outer-middleware апдейтов диспетчера после `AlbumMiddleware`.
+    Чат определяется по `event_chat` (его выставляет `UserContextMiddleware`
+    aiogram), а если чата нет — по пользователю. Апдейты без чата и пользователя
+    выполняются сразу.
+
+    `FSMContextMiddleware` aiogram читает состояние (`raw_state`) до того, как
+    апдейт попадет в очередь, поэтому перед обработкой воркер читает его заново:
+    иначе апдейт, пришедший во время обработки предыдущего, был бы направлен
+    в хэндлер по устаревшему состоянию.
+
+    Middleware перед очередью ждут (`FSMContextMiddleware` — Redis при промахе
+    кэша, `AlbumMiddleware` — остальные части альбома), поэтому апдейты чата могут
+    дойти до очереди не в том порядке, в каком пришли. Порядок прихода фиксирует
+    `arrival`, зарегистрированный самым первым outer-middleware апдейтов: апдейт
+    встает в очередь только после всех пришедших раньше апдейтов своего чата
+    (или после того, как они завершились, не дойдя до очереди, например части
+    альбома, который обработчик принял целиком).
+
+    Атрибуты:
+        metrics (ChatExecutorMetrics): Метрики глубины очередей.
+    """
+
+    def __init__(self, workers: int = 16, queue_size: int = 20) -> None:
+        """
+        Args:
+            workers (int): Количество воркеров в пуле.
+            queue_size (int): Максимальное количество ожидающих апдейтов одного чата.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.metrics = ChatExecutorMetrics()
+        self._queues: Dict[int, asyncio.Queue] = {}
+        # Апдейты, ждущие места в переполненной очереди чата, и их общий замок,
+        # сохраняющий порядок поступления
+        self._waiting: Dict[int, int] = {}
+        self._put_locks: Dict[int, asyncio.Lock] = {}
+        self._scheduled: Set[int] = set()
+        # Порядок прихода: последний выданный номер апдейта чата, номер, до которого
+        # включительно все апдейты прошли (встали в очередь или завершились),
+        # прошедшие не по порядку номера и апдейты, ждущие своей очереди
+        self._arrived: Dict[int, int] = {}
+        self._passed: Dict[int, int] = {}
+        self._passed_ahead: Dict[int, Set[int]] = {}
+        self._turns: Dict[tuple, asyncio.Future] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def _chat_key(data: Dict[str, Any]) -> Optional[int]:
+        """Возвращает ключ очереди: ID чата или, если чата нет, ID пользователя."""
+        chat: Optional[Chat] = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user: Optional[User] = data.get("event_from_user")
+        if user is not None:
+            return user.id
+        return None
+
+    async def arrival(
+        self,
+        handler: Handler,
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        """
+        Outer-middleware апдейтов: выдает апдейту номер прихода в его чате.
+
+        Должен выполняться раньше всех middleware, которые ждут (в том числе
+        встроенных в aiogram), поэтому номер выдается до первого `await`.
+        """
+        context = UserContextMiddleware.resolve_event_context(event)
+        chat_id = context.chat_id or context.user_id
+        if chat_id is None:
+            return await handler(event, data)
+        number = self._arrived.get(chat_id, 0) + 1
+        self._arrived[chat_id] = number
+        data["chat_arrival"] = number
+        try:
+            return await handler(event, data)
+        finally:
+            # Номер остается в data, если апдейт завершился, не дойдя до очереди
+            if data.pop("chat_arrival", None) is not None:
+                self._pass(chat_id, number)
+
+    async def _wait_turn(self, chat_id: int, number: int) -> None:
+        """Ждет, пока пройдут все апдейты чата, пришедшие раньше апдейта `number`."""
+        if self._passed.get(chat_id, 0) >= number - 1:
+            return
+        turn = asyncio.get_running_loop().create_future()
+        self._turns[(chat_id, number)] = turn
+        try:
+            await turn
+        finally:
+            self._turns.pop((chat_id, number), None)
+
+    def _pass(self, chat_id: int, number: int) -> None:
+        """Отмечает, что апдейт `number` прошел, и пропускает следующий по порядку."""
+        passed = self._passed.get(chat_id, 0)
+        ahead = self._passed_ahead.setdefault(chat_id, set())
+        if number <= passed or number in ahead:
+            return
+        ahead.add(number)
+        while passed + 1 in ahead:
+            passed += 1
+            ahead.discard(passed)
+        self._passed[chat_id] = passed
+        if passed >= self._arrived.get(chat_id, 0):
+            # Все пришедшие апдейты чата прошли — счетчики больше не нужны
+            del self._arrived[chat_id], self._passed[chat_id]
+            del self._passed_ahead[chat_id]
+            return
+        turn = self._turns.get((chat_id, passed + 1))
+        if turn is not None and not turn.done():
+            turn.set_result(None)
+
+    def _start(self) -> None:
+        """Запускает пул воркеров (при первом апдейте, внутри event loop)."""
+        self._ready = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"chat-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def __call__(
+        self,
+        handler: Handler,
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        chat_id = self._chat_key(data)
+        if chat_id is None:
+            return await handler(event, data)
+        if self._ready is None:
+            self._start()
+        number = data.get("chat_arrival")
+        if number is not None:
+            await self._wait_turn(chat_id, number)
+
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue(maxsize=self.queue_size)
+        future = asyncio.get_running_loop().create_future()
+        item = (handler, event, data, future)
+        if queue.full() or self._waiting.get(chat_id):
+            await self._put_waiting(chat_id, queue, item)
+        else:
+            queue.put_nowait(item)
+        self.metrics.queue_depth += 1
+        self.metrics.max_queue_depth = max(
+            self.metrics.max_queue_depth, self.metrics.queue_depth
+        )
+        self.metrics.max_chat_depth = max(self.metrics.max_chat_depth, queue.qsize())
+        if chat_id not in self._scheduled:
+            self._scheduled.add(chat_id)
+            self.metrics.active_chats = len(self._scheduled)
+            self._ready.put_nowait(chat_id)
+        if number is not None:
+            # Апдейт в очереди: следующий апдейт чата может вставать за ним
+            del data["chat_arrival"]
+            self._pass(chat_id, number)
+        return await future
+
+    async def _put_waiting(
+        self, chat_id: int, queue: asyncio.Queue, item: tuple
+    ) -> None:
+        """Ждет места в очереди чата и ставит в нее апдейт после уже ожидающих."""
+        self.metrics.waited += 1
+        if not self._waiting.get(chat_id):
+            logger.bind(user=chat_id).warning(
+                f"Очередь чата {chat_id} переполнена ({self.queue_size}), апдейты ждут"
+            )
+        self._waiting[chat_id] = self._waiting.get(chat_id, 0) + 1
+        lock = self._put_locks.setdefault(chat_id, asyncio.Lock())
+        try:
+            async with lock:
+                await queue.put(item)
+        finally:
+            self._waiting[chat_id] -= 1
+            if not self._waiting[chat_id]:
+                del self._waiting[chat_id]
+                del self._put_locks[chat_id]
+                if queue.empty() and chat_id not in self._scheduled:
+                    # Ожидание отменено, а чат уже обработан
+                    self._queues.pop(chat_id, None)
+
+    async def _worker(self) -> None:
+        """Берет готовый чат, выполняет один его апдейт и возвращает чат в очередь."""
+        while True:
+            chat_id = await self._ready.get()
+            queue = self._queues[chat_id]
+            handler, event, data, future = queue.get_nowait()
+            self.metrics.queue_depth -= 1
+            try:
+                if not future.done():
+                    state: Optional[FSMContext] = data.get("state")
+                    if state is not None:
+                        # Состояние могли изменить апдейты, обработанные раньше
+                        data["raw_state"] = await state.get_state()
+                    result = await handler(event, data)
+                    if not future.done():
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.metrics.processed += 1
+                if queue.empty():
+                    # Чат обработан полностью: освобождаем его очередь, если
+                    # в нее никто не ждет места (ожидающий сам вернет чат в работу)
+                    if not self._waiting.get(chat_id):
+                        del self._queues[chat_id]
+                    self._scheduled.discard(chat_id)
+                    self.metrics.active_chats = len(self._scheduled)
+                else:
+                    # Остальные апдейты чата — после уже ожидающих чатов
+                    self._ready.put_nowait(chat_id)
+
+    async def close(self) -> None:
+        """Останавливает пул воркеров при остановке бота."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Отменяем апдейты, которые так и не дождались обработки
+        for queue in self._queues.values():
+            while not queue.empty():
+                *_, future = queue.get_nowait()
+                future.cancel()
+        self._queues.clear()
+        self._waiting.clear()
+        self._put_locks.clear()
+        self._scheduled.clear()
+        for turn in self._turns.values():
+            turn.cancel()
+        self._tasks = []
+        self._ready = None
@@ -0,0 +1,69 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+async def commit_early(session: AsyncSession) -> None:
+    """
+    Фиксирует изменения апдейта, не дожидаясь завершения обработчика.
+
+    Нужна, когда результат должен быть виден другим апдейтам еще во время
+    обработки: карточка новой заявки уходит администраторам, и нажатие «Берем»
+    может прийти раньше, чем `DbSessionMiddleware` зафиксирует транзакцию.
+    Изменения после вызова попадают в новую транзакцию, которую фиксирует
+    middleware. Во всех остальных случаях обработчики `commit` не вызывают.
+
+    Args:
+        session (AsyncSession): Сессия апдейта из `data["session"]`.
+    """
+    await session.commit()
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Единица работы (unit of work) с базой данных на один апдейт.
+
+    Передает обработчику сессию в `data["session"]`. Сессия ленивая: соединение
+    берется из пула и транзакция открывается только при первом запросе. Методы DAO
+    выполняют только `flush`, а фиксирует все изменения апдейта один `commit` после
+    успешного завершения обработчика. Если обработчик упал, транзакция откатывается.
+
+    Единственное исключение — `commit_early`: обработчик фиксирует созданную заявку
+    до рассылки её карточки администраторам, а остальные изменения апдейта
+    (например, `admin_message_ids`) фиксирует middleware как обычно.
+
+    Регистрируется как outer-middleware апдейтов диспетчера после
+    `ChatExecutorMiddleware`, поэтому апдейты одного чата не пересекаются по транзакциям.
+    """
+
+    def __init__(self, session_pool: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Args:
+            session_pool (async_sessionmaker[AsyncSession]): Фабрика сессий БД.
+        """
+        self.session_pool = session_pool
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_pool() as session:
+            data["session"] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await session.rollback()
+                raise
+            if session.in_transaction():
+                try:
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Ошибка при фиксации транзакции: {e}")
+                    raise
+            return result
@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.utils.fsm_storage import CachedStorage
+
+
+class FSMFlushMiddleware(BaseMiddleware):
+    """
+    Объединяет записи FSM одного апдейта в одну транзакцию Redis.
+
+    Пока выполняется обработчик, `set_state`, `set_data` и `update_data` копятся в
+    буфере `CachedStorage`, а после успешного завершения апдейта отправляются в
+    Redis одним pipeline. Если обработчик упал или `DbSessionMiddleware` не смог
+    зафиксировать транзакцию, буфер отбрасывается: анкета не переходит на шаг,
+    данные предыдущего шага которого не сохранены в БД.
+
+    Регистрируется как outer-middleware апдейтов диспетчера после
+    `ChatExecutorMiddleware`, поэтому апдейты одного чата не читают чужой буфер,
+    и перед `DbSessionMiddleware`, поэтому видит ошибки фиксации транзакции.
+    """
+
+    def __init__(self, storage: CachedStorage) -> None:
+        """
+        Args:
+            storage (CachedStorage): FSM-хранилище диспетчера.
+        """
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.storage.batch():
+            return await handler(event, data)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, TelegramObject
+from loguru import logger
+from redis.asyncio import Redis
+
+from bot.utils.idempotency import claim, idempotency_key, press_key, release
+
+
+@dataclass
+class CallbackIdempotencyMetrics:
+    """
+    Метрики отсечения повторных нажатий.
+
+    Атрибуты:
+        checked (int): Сколько callback-запросов проверено.
+        duplicates (int): Сколько повторов отброшено до вызова обработчика.
+    """
+
+    checked: int = 0
+    duplicates: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {"checked": self.checked, "duplicates": self.duplicates}
+
+
+class CallbackIdempotencyMiddleware(BaseMiddleware):
+    """
+    Не дает одному нажатию кнопки обработаться дважды.
+
+    Каждый `callback_query.id` обрабатывается один раз (повторная доставка того же
+    апдейта). Для обработчиков с флагом `idempotent` дополнительно отсекается
+    повторное нажатие той же кнопки того же сообщения тем же пользователем в
+    течение `ttl` секунд — двойной тап по «ДА» больше не создает вторую заявку и не
+    рассылает карточку администраторам дважды. Если обработчик упал, отметка о
+    нажатии снимается, и кнопку можно нажать снова. Обработчики, которые сами
+    перехватывают ошибки, снимают отметку через `release_press`.
+
+    Регистрируется как inner-middleware `dp.callback_query`: флаги обработчика
+    известны только после проверки фильтров.
+
+    Атрибуты:
+        metrics (CallbackIdempotencyMetrics): Метрики отброшенных повторов.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 30) -> None:
+        """
+        Args:
+            redis (Redis): Клиент Redis.
+            ttl (int): Сколько секунд помнить нажатие.
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.metrics = CallbackIdempotencyMetrics()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+    ) -> Any:
+        keys: List[str] = [idempotency_key("cb", event.id)]
+        if get_flag(data, "idempotent") and event.message is not None:
+            keys.append(press_key(event))
+
+        self.metrics.checked += 1
+        if not await claim(self.redis, keys, self.ttl):
+            self.metrics.duplicates += 1
+            logger.debug(
+                f"Повторное нажатие {event.data!r} пользователем {event.from_user.id} отброшено"
+            )
+            # Убираем индикатор загрузки на кнопке
+            await event.answer()
+            return None
+
+        try:
+            return await handler(event, data)
+        except Exception:
+            await release(self.redis, keys[1:])
+            raise
@@ -0,0 +1,28 @@
+"""add question category
+
+Revision ID: 3c9a1f0d7b42
+Revises: e51a37518a27
+Create Date: 2026-10-17 22:10:41.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9a1f0d7b42"
+down_revision: Union[str, None] = "e51a37518a27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("questionss", sa.Column("category", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("questionss", "category")
@@ -0,0 +1,61 @@
+"""add application indexes
+
+Revision ID: e51a37518a27
+Revises: 9f312837f148
+Create Date: 2026-10-17 21:45:12.104512
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e51a37518a27"
+down_revision: Union[str, None] = "9f312837f148"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя индекса, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    ("ix_applications_user_id_id", "applications", ["user_id", "id"], None),
+    ("ix_applications_status", "applications", ["status"], None),
+    ("ix_applications_created_at", "applications", ["created_at"], None),
+    (
+        "ix_applications_pending",
+        "applications",
+        ["created_at"],
+        sa.text("status = 'PENDING'"),
+    ),
+    ("ix_photos_application_id", "photos", ["application_id"], None),
+    ("ix_videos_application_id", "videos", ["application_id"], None),
+    ("ix_bankdebts_application_id", "bankdebts", ["application_id"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции и не блокирует запись в таблицы
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                postgresql_where=where,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -1,3 +1,23 @@
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+
+def deflect_keyboard() -> InlineKeyboardMarkup:
+    """
+    Создает inline-клавиатуру под подсказками из базы знаний.
+
+    Возвращает:
+        InlineKeyboardMarkup: Объект клавиатуры с двумя кнопками:
+            - ✅ Ответ помог (callback_data='deflect_True')
+            - 📨 Всё равно отправить юристу (callback_data='deflect_False')
+    """
+    builder: InlineKeyboardBuilder = InlineKeyboardBuilder()
+    builder.button(text="✅ Ответ помог", callback_data="deflect_True")
+    builder.button(text="📨 Всё равно отправить юристу", callback_data="deflect_False")
+    builder.adjust(1)
+    return builder.as_markup()
+
+
 # from aiogram.types import InlineKeyboardMarkup
 # from aiogram.utils.keyboard import InlineKeyboardBuilder
 #
@@ -1,5 +1,10 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
 from aiogram import F
 from aiogram.dispatcher.router import Router
+from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery, Message, ReplyKeyboardRemove
@@ -7,40 +12,141 @@ from aiogram.utils.chat_action import ChatActionSender
 from loguru import logger
 
 import bot.application_form.dao
-from bot.admins.keyboards.inline_kb import approve_admin_keyboard
 from bot.application_form.dao import ApplicationDAO
 from bot.application_form.models import Application
-from bot.config import bot, settings
-from bot.database import connection
+from bot.application_form.render import ApplicationSnapshot, card_renderer, user_card
+from bot.application_form.utils import draft_metrics
+from bot.config import bot, redis_client, settings
+from bot.faq.cache import faq_cache
+from bot.middlewares.db_session import commit_early
+from bot.other_handler.keyboards.inline_kb import deflect_keyboard
 from bot.users.dao import UserDAO
-from bot.users.keyboards.inline_kb import approve_keyboard
 from bot.users.keyboards.markup_kb import main_kb
 from bot.users.schemas import TelegramIDModel
+from bot.utils.edit_digest import edit_digests
+from bot.utils.fan_out import fan_out
+from bot.utils.idempotency import release_press
 
 other_router = Router()
 
+# Сколько символов ответа показывать в подсказке (сообщение не длиннее 4096)
+DEFLECT_ANSWER_CHARS = 800
+
 
 class OtherHandler(StatesGroup):
     other_question = State()
+    deflect = State()
     approve_form = State()
 
 
+@dataclass
+class DeflectionMetrics:
+    """
+    Метрики подсказок из базы знаний для свободных вопросов.
+
+    Атрибуты:
+        checked (int): Сколько вопросов сверено с базой знаний.
+        suggested (int): Сколько раз вместо заявки предложены ответы из базы знаний.
+        deflected (int): Сколько раз ответ помог и заявка не создавалась.
+        declined (int): Сколько раз после подсказки вопрос всё равно отправлен юристу.
+        max_match_ms (float): Максимальное время поиска похожих вопросов, мс.
+    """
+
+    checked: int = 0
+    suggested: int = 0
+    deflected: int = 0
+    declined: int = 0
+    max_match_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "checked": self.checked,
+            "suggested": self.suggested,
+            "deflected": self.deflected,
+            "declined": self.declined,
+            "max_match_ms": round(self.max_match_ms, 3),
+        }
+
+
+deflection_metrics = DeflectionMetrics()
+
+
+async def suggest_answers(text: str) -> Optional[str]:
+    """
+    Ищет в базе знаний вопросы, похожие на вопрос пользователя.
+
+    Поиск идет по индексу триграмм в памяти процесса (см. `FAQSearchIndex`),
+    поэтому не обращается ни к БД, ни к Redis.
+
+    Args:
+        text (str): Вопрос пользователя.
+
+    Returns:
+        Optional[str]: Текст сообщения с подходящими ответами или None, если
+            похожих вопросов нет.
+    """
+    faq = await faq_cache.get()
+    started = time.perf_counter()
+    matches = faq_cache.index.search(
+        text,
+        limit=settings.FAQ_DEFLECT_LIMIT,
+        min_score=settings.FAQ_DEFLECT_MIN_SCORE,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    deflection_metrics.checked += 1
+    deflection_metrics.max_match_ms = max(deflection_metrics.max_match_ms, elapsed)
+
+    entries = [faq.entries[qst_id] for qst_id, _ in matches if qst_id in faq.entries]
+    if not entries:
+        return None
+
+    response_message = "Возможно, ответ на ваш вопрос уже есть в нашей базе знаний:"
+    for entry in entries:
+        answer = entry.answer
+        if len(answer) > DEFLECT_ANSWER_CHARS:
+            answer = answer[:DEFLECT_ANSWER_CHARS].rstrip() + "…"
+        response_message += f"\n\n<b>{entry.question}</b>\n{answer}"
+    response_message += "\n\nПомог ли ответ?"
+    return response_message
+
+
+async def show_draft(message: Message, state: FSMContext, text: str) -> None:
+    """
+    Показывает черновик заявки с текстовым вопросом и просит пользователя подтвердить его.
+
+    Вопрос хранится в FSM, а заявка создается в БД только после подтверждения
+    (см. `approve_form_callback`).
+
+    Args:
+        message (Message): Сообщение в чате пользователя, в который отправляется черновик.
+        state (FSMContext): Контекст состояния машины состояний для пользователя.
+        text (str): Текст вопроса.
+    """
+    await state.update_data(question=text)
+    card = user_card(ApplicationSnapshot.from_form({}, text_application=text))
+    await message.answer(card.text, reply_markup=card.reply_markup)
+
+    # Устанавливаем состояние для следующего шага
+    await state.set_state(OtherHandler.approve_form)
+    draft_metrics.previews += 1
+
+
 # Обработчик для обработки сообщения с заявкой пользователя
-@other_router.message(F.text, OtherHandler.other_question)
-@connection()
-async def other_question_message(
-        message: Message, session, state: FSMContext, **kwargs
-) -> None:
+@other_router.message(
+    F.text, StateFilter(OtherHandler.other_question, OtherHandler.deflect)
+)
+async def other_question_message(message: Message, state: FSMContext, **kwargs) -> None:
     """
     Обработчик для получения текстового сообщения от пользователя, оформления заявки и отправки подтверждения.
 
-    Этот обработчик извлекает текст заявки, создает новую запись в базе данных,
-    а затем отправляет пользователю сообщение с подтверждением оформления заявки.
-    В процессе работы с базой данных показывается индикатор набора текста.
+    Сначала вопрос сверяется с базой знаний: если там есть похожие вопросы,
+    пользователю предлагаются ответы на них, а заявка создается, только если
+    ответ не помог (см. `deflect_callback`). Иначе пользователю показывается
+    черновик заявки: в базу данных она попадет после подтверждения.
 
     Args:
         message (Message): Сообщение от пользователя, содержащее текст заявки.
-        session: Сессия для работы с базой данных.
         state (FSMContext): Контекст состояния машины состояний для пользователя.
         **kwargs: Дополнительные аргументы, передаваемые через декоратор.
 
@@ -48,65 +154,88 @@ async def other_question_message(
         None: Функция не возвращает значений, но отправляет сообщение пользователю с подтверждением заявки.
 
     Raises:
-        Exception: В случае ошибки при работе с базой данных или отправке сообщения.
+        Exception: В случае ошибки при отправке сообщения.
     """
     try:
-        user_id: int = message.from_user.id
+        suggestion = await suggest_answers(message.text)
+        if suggestion is not None:
+            # Вопрос сохраняем в FSM: заявка создается, только если ответ не помог
+            deflection_metrics.suggested += 1
+            await state.update_data(question=message.text)
+            await state.set_state(OtherHandler.deflect)
+            await message.answer(suggestion, reply_markup=deflect_keyboard())
+            return
 
-        # Показываем индикатор набора текста
-        async with ChatActionSender.typing(bot=bot, chat_id=message.chat.id):
-            # await asyncio.sleep(2)  # Симуляция времени для обработки данных
+        await show_draft(message, state, message.text)
 
-            # Проверяем, существует ли уже пользователь в базе данных
-            user_info = await UserDAO.find_one_or_none(
-                session=session, filters=TelegramIDModel(telegram_id=user_id)
-            )
+    except Exception as e:
+        # Логируем ошибку
+        logger.error(
+            f"Ошибка при обработке заявки для пользователя {message.from_user.id}: {e}"
+        )
+        await message.answer(
+            "Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже."
+        )
 
-            if user_info is None:
-                raise ValueError("Пользователь не найден в базе данных.")
 
-            # Создаем заявку
-            application_model = Application(
-                user_id=user_info.id, text_application=message.text
-            )
-            application: Application = await ApplicationDAO.add(
-                session=session, values=application_model.to_dict()
-            )
+# Обработчик ответа на подсказку из базы знаний
+@other_router.callback_query(
+    F.data.startswith("deflect_"), OtherHandler.deflect, flags={"idempotent": True}
+)
+async def deflect_callback(call: CallbackQuery, state: FSMContext) -> None:
+    """
+    Обрабатывает ответ пользователя на подсказку из базы знаний.
 
-            logger.debug(f"Создана заявка - {application.id}")
+    Если ответ помог, состояние очищается и заявка не создается. Иначе пользователю
+    показывается черновик заявки с сохраненным вопросом, как если бы подсказки не было.
 
-            # Подготовка текста для сообщения
-            response_message: str = f"Спасибо! Ваша заявка № {application.id} успешно оформлена. \n\nСтатус заявки: 🟡 {application.status.value}\n\n"
-            response_message += f"Ваш вопрос:\n{application.text_application}"
+    Args:
+        call (CallbackQuery): Коллбек-запрос от пользователя.
+        state (FSMContext): Контекст состояния Finite State Machine (FSM) для текущего пользователя.
 
-            response_message += "\n\nПроверьте верно ли указаны все данные?"
+    Returns:
+        None: Функция не возвращает значений, но изменяет состояние машины и отправляет сообщения.
+    """
+    try:
+        await call.answer()
+        helped: bool = call.data.replace("deflect_", "") == "True"
+        # Удаляем клавиатуру из сообщения
+        await edit_digests.edit_reply_markup(
+            call.message.chat.id, call.message.message_id, reply_markup=None
+        )
 
-            # Отправляем сообщение с подтверждением
-            await message.answer(
-                response_message,
-                reply_markup=approve_keyboard("ДА", "НЕТ, начать сначала."),
+        if helped:
+            deflection_metrics.deflected += 1
+            await state.clear()
+            await call.message.answer(
+                "Рады, что смогли помочь! Если появятся другие вопросы — пишите.",
+                reply_markup=main_kb(),
             )
+            return
 
-            # Устанавливаем состояние для следующего шага
-            await state.set_state(OtherHandler.approve_form)
-
-            logger.info(f"Заявка {application.id} успешно добавлена в базу данных.")
+        deflection_metrics.declined += 1
+        user_data = await state.get_data()
+        question: Optional[str] = user_data.get("question")
+        if not question:
+            raise ValueError("Вопрос пользователя не найден в состоянии.")
+        await show_draft(call.message, state, question)
 
     except Exception as e:
-        # Логируем ошибку
-        logger.error(
-            f"Ошибка при обработке заявки для пользователя {message.from_user.id}: {e}"
-        )
-        await message.answer(
-            "Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже."
-        )
+        # Логируем ошибку и отправляем пользователю сообщение о сбое
+        logger.error(f"Ошибка при обработке ответа на подсказку: {e}")
+        # Даем нажать кнопку снова
+        await release_press(redis_client, call)
+        await call.message.answer("Произошла ошибка. Попробуйте снова.")
 
 
 # Обработчик для одобрения или отклонения заявки
-@other_router.callback_query(F.data.startswith("approve_"), OtherHandler.approve_form)
-@connection()
+@other_router.callback_query(
+    F.data.startswith("approve_"),
+    OtherHandler.approve_form,
+    flags={"idempotent": True},
+)
 async def approve_form_callback(
-        call: CallbackQuery, state: FSMContext, session
+    call: CallbackQuery, state: FSMContext, session
 ) -> None:
     """
     Обрабатывает callback-запрос пользователя, одобряющего форму заявки.
@@ -126,8 +255,6 @@ async def approve_form_callback(
         Exception: В случае ошибки при обработке данных или отправке сообщений.
     """
     try:
-        admin_message_ids = {}
-
         # Ответ на запрос для предотвращения уведомлений
         await call.answer(text="Проверяю ввод", show_alert=False)
 
@@ -135,82 +262,80 @@ async def approve_form_callback(
         approve_form_inf: str = call.data.replace("approve_", "")
         approve_form_inf = True if approve_form_inf == "True" else False
         # Удаляем клавиатуру из сообщения
-        await call.message.edit_reply_markup(reply_markup=None)
-
-        # Ищем пользователя и его заявки
-        user_id = TelegramIDModel(telegram_id=call.from_user.id)
-        user_applications = await UserDAO.find_one_or_none(
-            session=session, filters=user_id
+        await edit_digests.edit_reply_markup(
+            call.message.chat.id, call.message.message_id, reply_markup=None
         )
-        if not user_applications or not user_applications.applications:
-            raise ValueError("Нет доступных заявок для пользователя.")
 
-        last_appl: Application = user_applications.applications[-1]
+        # Черновик заявки хранится в FSM: в БД он попадает только сейчас
+        user_data = await state.get_data()
+        question: Optional[str] = user_data.get("question")
+        if not question:
+            raise ValueError("Вопрос пользователя не найден в состоянии.")
 
         if approve_form_inf:
-            # Если пользователь согласен с данными в заявке, очищаем состояние и отправляем сообщение
+            # Если пользователь согласен с данными в заявке, сохраняем её
+            user_info = await UserDAO.find_one_or_none(
+                session=session, filters=TelegramIDModel(telegram_id=call.from_user.id)
+            )
+            if user_info is None:
+                raise ValueError("Пользователь не найден в базе данных.")
+
+            application: Application = await ApplicationDAO.add(
+                session=session,
+                values=Application(
+                    user_id=user_info.id, text_application=question
+                ).to_dict(),
+            )
+            # Фиксируем заявку до рассылки: администратор может нажать «Берем»
+            # раньше, чем завершится обработка этого апдейта
+            await commit_early(session)
+            logger.info(f"Заявка {application.id} успешно добавлена в базу данных.")
+            draft_metrics.confirmed += 1
             await state.clear()
 
             # Имитируем набор текста перед отправкой сообщения пользователю
             async with ChatActionSender.typing(bot=bot, chat_id=call.message.chat.id):
                 await bot.send_message(
                     chat_id=call.message.chat.id,
-                    text="В ближайшее время с вами свяжется наш специалист для уточнения деталей.",
+                    text=f"Спасибо! Ваша заявка № {application.id} успешно оформлена. "
+                    "В ближайшее время с вами свяжется наш специалист для уточнения деталей.",
                     reply_markup=ReplyKeyboardRemove(),
                 )
 
-            # Отправляем информацию о заявке администратору
-            try:
-                for admin_id in settings.ADMIN_IDS:
-                    await bot.send_message(
-                        chat_id=admin_id,
-                        text=f"Была создана заявка {last_appl.id}. Пожалуйста, рассмотрите заявку.",
-                        reply_markup=ReplyKeyboardRemove(),
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Не удалось отправить сообщение админу {admin_id} об созадании заявки ботом администратору: {e}"
+            # Карточка заявки для администраторов (задолженностей у текстовой заявки нет)
+            card = card_renderer.admin_card(application, debts=(), user=user_info)
+
+            async def notify_admin(admin_id: int) -> Message:
+                # Одному админу сообщения уходят по порядку, разным админам — параллельно
+                await bot.send_message(
+                    chat_id=admin_id,
+                    text=f"Была создана заявка {application.id}. Пожалуйста, рассмотрите заявку.",
+                    reply_markup=ReplyKeyboardRemove(),
                 )
-                pass
-
-            # Подготовка сообщения для пользователя с деталями заявки
-            response_message: str = f"Заявка № {last_appl.id}\n\nСтатус заявки: 🟡 {last_appl.status.value}\n\n"
-
-            response_message += f"Ваш вопрос:\n{last_appl.text_application}"
-            response_message += f"\n\n <b>{user_applications.phone_number}</b> \n\n"
-            response_message += "\n\n Берете заявку в работу?"
-
-            # Отправка сообщения администраторам
-            try:
-                for admin_id in settings.ADMIN_IDS:
-                    message = await bot.send_message(
-                        chat_id=admin_id,
-                        text=response_message,
-                        reply_markup=approve_admin_keyboard(
-                            "Берем", "Отказ", call.from_user.id, last_appl.id
-                        ),
-                    )
-                    admin_message_ids[admin_id] = (
-                        message.message_id
-                    )  # Сохраняем message_id
-
-                # Обновляем заявку с id сообщений для администраторов
-                await ApplicationDAO.update(
-                    session=session,
-                    filters={"id": last_appl.id},
-                    values={"admin_message_ids": admin_message_ids},
+                return await bot.send_message(
+                    chat_id=admin_id, text=card.text, reply_markup=card.reply_markup
                 )
 
-            except Exception as e:
-                logger.error(
-                    f"Не удалось отправить сообщение админу {admin_id} об остановке бота: {e}"
+            # Отправка сообщения всем администраторам одновременно
+            notified = await fan_out(
+                settings.ADMIN_IDS,
+                notify_admin,
+                concurrency=settings.FAN_OUT_CONCURRENCY,
+            )
+
+            # Обновляем заявку с id сообщений для администраторов
+            if notified.message_ids:
+                await ApplicationDAO.update(
+                    session=session,
+                    filters={"id": application.id},
+                    values={"admin_message_ids": notified.message_ids},
                 )
-                pass
 
         else:
-            # Если пользователь не согласен с данными, удаляем заявку и отправляем сообщение
+            # Если пользователь не согласен с данными, черновик просто забывается:
+            # в БД его нет, удалять нечего
             await state.clear()
-            await ApplicationDAO.delete(session=session, filters={"id":last_appl.id})
+            draft_metrics.record_rejected()
             await bot.send_message(
                 chat_id=call.message.chat.id,
                 text="Необходимо начать сначала создавать заявку",
@@ -220,4 +345,6 @@ async def approve_form_callback(
     except Exception as e:
         # Логируем ошибку и отправляем пользователю сообщение о сбое
         logger.error(f"Ошибка при обработке запроса: {e}")
+        # Даем нажать кнопку снова
+        await release_press(redis_client, call)
         await call.message.answer("Произошла ошибка. Попробуйте снова.")
@@ -0,0 +1,445 @@
+import asyncio
+import json
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.types import Update
+from loguru import logger
+from redis.exceptions import ResponseError
+
+from bot.config import bot, dp, redis_client, settings
+
+GROUP_NAME = "workers"
+# Продлевает аренду раздела, только если её держит этот воркер
+RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+# Снимает аренду раздела, только если её держит этот воркер
+RELEASE_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Запись потока: ID записи и её поля
+StreamEntry = Tuple[bytes, Dict[bytes, bytes]]
+
+
+def partition_stream(partition: int) -> str:
+    """Возвращает имя потока Redis для раздела `partition`."""
+    return f"{settings.STREAM_NAME}:{partition}"
+
+
+def lease_key(partition: int) -> str:
+    """Возвращает ключ аренды раздела `partition`."""
+    return f"{settings.STREAM_NAME}:lease:{partition}"
+
+
+def workers_key() -> str:
+    """Возвращает ключ множества живых воркеров (значение — срок их отметки)."""
+    return f"{settings.STREAM_NAME}:workers"
+
+
+def dead_letter_stream() -> str:
+    """Возвращает имя потока апдейтов, которые не удалось обработать."""
+    return f"{settings.STREAM_NAME}:dead"
+
+
+def update_partition(update: Update) -> int:
+    """
+    Определяет раздел потока для апдейта.
+
+    Все апдейты одного чата (или пользователя, если чата нет) попадают в один
+    раздел, поэтому обрабатываются по порядку воркером, который его арендует.
+    """
+    context = UserContextMiddleware.resolve_event_context(update)
+    key = context.chat_id or context.user_id or 0
+    return key % settings.STREAM_PARTITIONS
+
+
+@dataclass
+class StreamMetrics:
+    """
+    Метрики очереди апдейтов в Redis Streams.
+
+    Атрибуты:
+        enqueued (int): Сколько апдейтов записано в поток (ingest).
+        processed (int): Сколько апдейтов обработано и подтверждено (worker).
+        recovered (int): Сколько неподтвержденных апдейтов забрано вместе с разделом
+            (после рестарта или у воркера, который перестал работать).
+        retried (int): Сколько упавших или зависших апдейтов обработано повторно.
+        failed (int): Сколько раз обработка апдейта завершилась ошибкой.
+        dead_lettered (int): Сколько апдейтов перенесено в поток недоставленных.
+    """
+
+    enqueued: int = 0
+    processed: int = 0
+    recovered: int = 0
+    retried: int = 0
+    failed: int = 0
+    dead_lettered: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "recovered": self.recovered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+metrics = StreamMetrics()
+
+
+async def run_ingest() -> None:
+    """
+    Принимает апдейты от Telegram через long polling и записывает их в Redis Streams.
+
+    Апдейты не обрабатываются здесь, а только раскладываются по разделам потока.
+    Отложенные за время простоя апдейты не сбрасываются: `getUpdates` подтверждает
+    апдейт только после того, как он записан в поток, поэтому после рестарта
+    бот продолжает с места остановки.
+
+    Процесс ingest в развертывании один, поэтому он выполняет все обработчики
+    `startup` и `shutdown` диспетчера, в том числе оповещения администраторов.
+    """
+    await bot.delete_webhook(drop_pending_updates=False)
+    await dp.emit_startup(bot=bot)
+    allowed_updates = dp.resolve_used_update_types()
+    offset: Optional[int] = None
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=30, allowed_updates=allowed_updates
+                )
+            except TelegramNetworkError as e:
+                logger.warning(f"Ошибка получения апдейтов: {e}, повтор через 5 c.")
+                await asyncio.sleep(5)
+                continue
+            if not updates:
+                continue
+
+            # Все апдейты пачки записываем одним pipeline
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for update in updates:
+                    pipe.xadd(
+                        partition_stream(update_partition(update)),
+                        {"update": update.model_dump_json(exclude_unset=True)},
+                        maxlen=settings.STREAM_MAXLEN,
+                        approximate=True,
+                    )
+                await pipe.execute()
+            metrics.enqueued += len(updates)
+            offset = updates[-1].update_id + 1
+    finally:
+        logger.info(f"Метрики потока апдейтов: {metrics.as_dict()}")
+        await dp.emit_shutdown(bot=bot)
+
+
+class StreamWorker:
+    """
+    Воркер, обрабатывающий апдейты из Redis Streams через consumer group.
+
+    Разделы не закреплены за воркерами: воркер берет раздел в аренду (ключ
+    `lease:<раздел>` с TTL `STREAM_LEASE_MS`) и продлевает её, пока работает.
+    Раздел читает только его арендатор, поэтому апдейты одного чата по-прежнему
+    обрабатывает один процесс, а внутри процесса порядок по чату соблюдает
+    `ChatExecutorMiddleware`. Если воркер перестал работать, его аренды истекают и
+    разделы забирает любой живой воркер. Каждый воркер держит не больше своей доли
+    разделов (по числу живых воркеров) и отдает лишние, когда их записи обработаны.
+
+    Взяв раздел, воркер сначала забирает (XCLAIM) все его неподтвержденные
+    записи — апдейты, которые прежний арендатор не успел обработать, — и только
+    потом читает новые. Апдейт подтверждается (XACK) только после успешной
+    обработки. Запись, обработчик которой упал, остается в списке ожидающих и
+    через `STREAM_CLAIM_IDLE_MS` обрабатывается снова; после
+    `STREAM_MAX_DELIVERIES` попыток она переносится в поток недоставленных
+    апдейтов (`STREAM_NAME:dead`) и подтверждается.
+    """
+
+    def __init__(self, worker_id: int) -> None:
+        """
+        Args:
+            worker_id (int): Уникальный номер воркера (имя в consumer group).
+        """
+        self.consumer = f"worker-{worker_id}"
+        # Токен аренды: после рестарта воркер не считает своими прежние аренды
+        self._token = f"{self.consumer}:{secrets.token_hex(8)}"
+        self._renew_lease = redis_client.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = redis_client.register_script(RELEASE_LEASE_SCRIPT)
+        # Арендованные разделы (поток -> номер) и разделы, которые воркер отдает
+        self._leases: Dict[str, int] = {}
+        self._draining: Set[str] = set()
+        self._semaphore = asyncio.Semaphore(settings.STREAM_BATCH)
+        self._tasks: set = set()
+        # Записи (поток, ID), которые сейчас обрабатываются этим воркером
+        self._in_flight: Set[Tuple[str, bytes]] = set()
+
+    @property
+    def streams(self) -> List[str]:
+        """Разделы, из которых воркер читает новые апдейты."""
+        return [stream for stream in self._leases if stream not in self._draining]
+
+    async def _create_group(self, stream: str) -> None:
+        """Создает consumer group раздела, если её еще нет."""
+        try:
+            await redis_client.xgroup_create(stream, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _handle(self, stream: str, entry_id: bytes, fields: dict) -> None:
+        """
+        Передает апдейт диспетчеру и подтверждает запись.
+
+        Если обработка упала, запись не подтверждается и будет обработана снова
+        (см. `_take_pending`).
+        """
+        try:
+            update = json.loads(fields[b"update"])
+            await dp.feed_raw_update(bot=bot, update=update)
+            await redis_client.xack(stream, GROUP_NAME, entry_id)
+            metrics.processed += 1
+        except Exception as e:
+            metrics.failed += 1
+            logger.error(f"Ошибка обработки записи {entry_id!r} из {stream}: {e}")
+        finally:
+            self._in_flight.discard((stream, entry_id))
+            self._semaphore.release()
+
+    async def _dispatch(self, stream: str, entries: List[StreamEntry]) -> None:
+        """Запускает обработку записей в порядке потока."""
+        for entry_id, fields in entries:
+            if (stream, entry_id) in self._in_flight:
+                continue
+            if not fields:
+                # Запись уже удалена из потока (MAXLEN) — просто подтверждаем
+                await redis_client.xack(stream, GROUP_NAME, entry_id)
+                continue
+            await self._semaphore.acquire()
+            self._in_flight.add((stream, entry_id))
+            task = asyncio.create_task(self._handle(stream, entry_id, fields))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dead_letter(
+        self, stream: str, entries: List[StreamEntry], deliveries: Dict[bytes, int]
+    ) -> None:
+        """Переносит записи в поток недоставленных апдейтов и подтверждает их."""
+        async with redis_client.pipeline(transaction=True) as pipe:
+            for entry_id, fields in entries:
+                pipe.xadd(
+                    dead_letter_stream(),
+                    {
+                        "update": fields.get(b"update", b""),
+                        "stream": stream,
+                        "entry_id": entry_id,
+                        "deliveries": deliveries[entry_id],
+                    },
+                    maxlen=settings.STREAM_MAXLEN,
+                    approximate=True,
+                )
+                pipe.xack(stream, GROUP_NAME, entry_id)
+            await pipe.execute()
+        metrics.dead_lettered += len(entries)
+        logger.error(
+            f"{len(entries)} апдейтов из {stream} не обработаны после "
+            f"{settings.STREAM_MAX_DELIVERIES} попыток и перенесены в {dead_letter_stream()}"
+        )
+
+    async def _take_pending(self, stream: str, idle: int) -> int:
+        """
+        Забирает неподтвержденные записи раздела и запускает их обработку.
+
+        Просматривается весь список ожидающих записей группы (PEL) по разделу.
+        Записи, которые этот воркер обрабатывает сейчас, пропускаются: иначе
+        долгий апдейт был бы обработан второй раз. Записи, исчерпавшие
+        `STREAM_MAX_DELIVERIES` попыток, переносятся в поток недоставленных.
+
+        Args:
+            stream (str): Раздел.
+            idle (int): Сколько мс запись должна быть не подтверждена.
+
+        Returns:
+            int: Сколько записей забрано на обработку.
+        """
+        taken = 0
+        start = "-"
+        while True:
+            pending = await redis_client.xpending_range(
+                stream,
+                GROUP_NAME,
+                min=start,
+                max="+",
+                count=settings.STREAM_BATCH,
+                idle=idle,
+            )
+            if not pending:
+                break
+            deliveries = {
+                item["message_id"]: item["times_delivered"]
+                for item in pending
+                if (stream, item["message_id"]) not in self._in_flight
+            }
+            if deliveries:
+                entries = await redis_client.xclaim(
+                    stream,
+                    GROUP_NAME,
+                    self.consumer,
+                    min_idle_time=idle,
+                    message_ids=list(deliveries),
+                )
+                dead = [
+                    entry
+                    for entry in entries
+                    if deliveries[entry[0]] >= settings.STREAM_MAX_DELIVERIES
+                ]
+                if dead:
+                    await self._dead_letter(stream, dead, deliveries)
+                entries = [entry for entry in entries if entry not in dead]
+                taken += len(entries)
+                await self._dispatch(stream, entries)
+            if len(pending) < settings.STREAM_BATCH:
+                break
+            # Следующая страница — после последней просмотренной записи
+            start = "(" + pending[-1]["message_id"].decode()
+        return taken
+
+    async def _acquire(self, partition: int) -> None:
+        """Берет раздел в аренду, если он свободен, и дообрабатывает его записи."""
+        stream = partition_stream(partition)
+        acquired = await redis_client.set(
+            lease_key(partition), self._token, nx=True, px=settings.STREAM_LEASE_MS
+        )
+        if not acquired:
+            return
+        self._leases[stream] = partition
+        await self._create_group(stream)
+        # Апдейты прежнего арендатора обрабатываются раньше новых
+        recovered = await self._take_pending(stream, idle=0)
+        metrics.recovered += recovered
+        logger.info(
+            f"Воркер {self.consumer} взял раздел {stream}, "
+            f"дообрабатывается {recovered} апдейтов"
+        )
+
+    async def _release(self, stream: str) -> None:
+        """Снимает аренду раздела."""
+        partition = self._leases.pop(stream)
+        self._draining.discard(stream)
+        await self._release_lease(keys=[lease_key(partition)], args=[self._token])
+        logger.info(f"Воркер {self.consumer} отдал раздел {stream}")
+
+    async def _balance(self) -> None:
+        """
+        Продлевает аренды, отдает лишние разделы и берет свободные.
+
+        Воркер держит не больше `ceil(STREAM_PARTITIONS / живых воркеров)`
+        разделов. Лишний раздел сначала перестает читаться и отдается, только
+        когда все его записи у этого воркера обработаны, чтобы новый арендатор
+        не обработал их второй раз.
+        """
+        now = int(time.time() * 1000)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(workers_key(), {self._token: now + settings.STREAM_LEASE_MS})
+            pipe.zremrangebyscore(workers_key(), "-inf", now)
+            pipe.zcard(workers_key())
+            *_, alive = await pipe.execute()
+        share = -(-settings.STREAM_PARTITIONS // max(alive, 1))
+
+        for stream, partition in list(self._leases.items()):
+            renewed = await self._renew_lease(
+                keys=[lease_key(partition)],
+                args=[self._token, settings.STREAM_LEASE_MS],
+            )
+            if not renewed:
+                # Аренда истекла (например, воркер долго не отвечал) — раздел
+                # уже может читать другой воркер
+                self._leases.pop(stream)
+                self._draining.discard(stream)
+                logger.warning(f"Воркер {self.consumer} потерял аренду {stream}")
+
+        excess = len(self._leases) - share
+        for stream in self.streams[: max(excess, 0)]:
+            self._draining.add(stream)
+        for stream in list(self._draining):
+            if not any(key[0] == stream for key in self._in_flight):
+                await self._release(stream)
+
+        for partition in range(settings.STREAM_PARTITIONS):
+            if len(self._leases) >= share:
+                break
+            if partition_stream(partition) not in self._leases:
+                await self._acquire(partition)
+
+    async def _retry(self) -> None:
+        """Повторно обрабатывает записи своих разделов, упавшие или зависшие."""
+        for stream in self.streams:
+            retried = await self._take_pending(
+                stream, idle=settings.STREAM_CLAIM_IDLE_MS
+            )
+            if retried:
+                metrics.retried += retried
+                logger.warning(
+                    f"Повторно обрабатывается {retried} апдейтов из {stream}"
+                )
+
+    async def run(self) -> None:
+        """
+        Читает новые апдейты арендованных разделов, пока задача не будет отменена.
+
+        Обработчики `startup` и `shutdown` диспетчера выполняются до начала и после
+        окончания обработки. В режиме worker в них регистрируется только
+        подготовка процесса: оповещения администраторов отправляет ingest.
+        """
+        await dp.emit_startup(bot=bot)
+        interval = settings.STREAM_LEASE_MS / 3000
+        last_balance = last_retry = time.monotonic()
+        await self._balance()
+        try:
+            while True:
+                streams = self.streams
+                if streams:
+                    response = await redis_client.xreadgroup(
+                        GROUP_NAME,
+                        self.consumer,
+                        {stream: ">" for stream in streams},
+                        count=settings.STREAM_BATCH,
+                        block=int(interval * 1000),
+                    )
+                    for stream, entries in response or []:
+                        await self._dispatch(stream.decode(), entries)
+                else:
+                    await asyncio.sleep(interval)
+                if time.monotonic() - last_balance > interval:
+                    await self._balance()
+                    last_balance = time.monotonic()
+                if time.monotonic() - last_retry > settings.STREAM_CLAIM_IDLE_MS / 1000:
+                    await self._retry()
+                    last_retry = time.monotonic()
+        finally:
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=10)
+            for stream in list(self._leases):
+                await self._release(stream)
+            await redis_client.zrem(workers_key(), self._token)
+            logger.info(f"Метрики потока апдейтов: {metrics.as_dict()}")
+            await dp.emit_shutdown(bot=bot)
+
+
+async def run_worker() -> None:
+    """Запускает воркер обработки апдейтов из Redis Streams."""
+    worker = StreamWorker(worker_id=settings.STREAM_WORKER_ID)
+    await worker.run()
@@ -65,10 +65,11 @@ class User(Base):
     Тип: bool, по умолчанию True.
     """
 
-    # Двусторонняя связь с Application
+    # Двусторонняя связь с Application. Заявки не загружаются вместе с пользователем:
+    # последнюю заявку возвращает ApplicationDAO.last_for_user
     applications = relationship(
         "Application",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise",
     )
@@ -1,4 +1,3 @@
-import asyncio
 from typing import Any, Optional
 
 from aiogram import F
@@ -11,13 +10,13 @@ from aiogram.utils.chat_action import ChatActionSender
 from loguru import logger
 
 import bot.application_form.dao
-from bot.config import bot
-from bot.database import connection
+from bot.config import bot, paced_delivery
 from bot.users.dao import UserDAO
 from bot.users.keyboards.inline_kb import approve_keyboard
 from bot.users.keyboards.markup_kb import main_kb
 from bot.users.schemas import TelegramIDModel, UserModel
 from bot.users.utils import get_refer_id_or_none
+from bot.utils.paced_delivery import PacedMessage
 
 user_router = Router()
 
@@ -62,7 +61,6 @@ async def admin_start(message: Message, state: FSMContext, **kwargs: Any) -> Non
 
 
 @user_router.message(CommandStart())
-@connection()
 async def cmd_start(
     message: Message, command: CommandObject, session, state: FSMContext, **kwargs
 ) -> None:
@@ -142,16 +140,22 @@ async def cmd_start(
                 reply_markup = approve_keyboard("Да", "Нет")
                 await state.set_state(CheckForm.age)
 
-                # Отправляем все сообщения
-                await message.answer(
-                    response_message, reply_markup=ReplyKeyboardRemove()
+                # Отправляем все сообщения в фоне с имитацией набора текста
+                paced_delivery.enqueue(
+                    message.chat.id,
+                    [
+                        PacedMessage(
+                            response_message,
+                            delay=0,
+                            reply_markup=ReplyKeyboardRemove(),
+                        ),
+                        PacedMessage(follow_up_message[0], delay=0.5),
+                        PacedMessage(follow_up_message[1], delay=0.5),
+                        PacedMessage(
+                            follow_up_message[2], delay=0.5, reply_markup=reply_markup
+                        ),
+                    ],
                 )
-                await asyncio.sleep(0.5)
-                await message.answer(follow_up_message[0])
-                await asyncio.sleep(0.5)
-                await message.answer(follow_up_message[1])
-                await asyncio.sleep(0.5)
-                await message.answer(follow_up_message[2], reply_markup=reply_markup)
 
     except Exception as e:
         # Логируем ошибку
@@ -281,16 +285,17 @@ async def mistakes_handler(message: Message, state: FSMContext) -> None:
         None: Функция не возвращает значений, но отправляет сообщение пользователю о том, что нужно выбрать кнопку.
     """
     try:
-        # Включаем индикатор набора текста
-        async with ChatActionSender.typing(bot=bot, chat_id=message.chat.id):
-            await asyncio.sleep(
-                2
-            )  # Немного подождем, чтобы пользователь видел индикатор
-
-            # Отправляем сообщение с просьбой выбрать кнопку
-            await message.answer(
-                "Пожалуйста, выберите один из вариантов, нажав на кнопку 👆"
-            )
+        # Отправляем сообщение с просьбой выбрать кнопку в фоне, чтобы пользователь
+        # успел увидеть индикатор набора текста
+        paced_delivery.enqueue(
+            message.chat.id,
+            [
+                PacedMessage(
+                    "Пожалуйста, выберите один из вариантов, нажав на кнопку 👆",
+                    delay=2,
+                )
+            ],
+        )
 
     except Exception as e:
         # Логируем ошибку
@@ -18,6 +18,7 @@ user_commands: list[BotCommand] = [
 admin_commands: list[BotCommand] = [
     BotCommand(command="start", description="🏎  Старт работы с приложением"),
     BotCommand(command="admin", description="👀  Админ, жду заявки"),
+    BotCommand(command="fsm_report", description="📊  Память FSM в Redis"),
     BotCommand(command="faq", description="🗂  Ответы на часто задаваемые вопросы!"),
     BotCommand(command="help", description="⁉️  Описание функций"),
 ]
@@ -0,0 +1,202 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+from redis.asyncio import Redis
+
+from bot.config import bot, redis_client
+
+DIGEST_PREFIX = "edit"
+# Повторные нажатия приходят в течение секунд; через двое суток ключи можно забыть
+DIGEST_TTL = 2 * 24 * 3600
+
+
+def digest(value: Union[str, InlineKeyboardMarkup, None]) -> str:
+    """
+    Возвращает короткий хэш текста или клавиатуры сообщения.
+
+    Args:
+        value (Union[str, InlineKeyboardMarkup, None]): Текст, клавиатура или None
+            (клавиатуры нет).
+
+    Returns:
+        str: 16 байт BLAKE2b в hex.
+    """
+    if value is None:
+        raw = b""
+    elif isinstance(value, str):
+        raw = value.encode()
+    else:
+        raw = value.model_dump_json(exclude_none=True).encode()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+@dataclass
+class EditDigestMetrics:
+    """
+    Метрики редактирования сообщений.
+
+    Атрибуты:
+        edits (int): Сколько запросов на редактирование отправлено в Telegram.
+        skipped (int): Сколько запросов не отправлено: содержимое не изменилось.
+        not_modified (int): Сколько запросов Telegram отклонил как «message is not
+            modified» (содержимое совпало, но хэша в Redis не было).
+        failed (int): Сколько запросов завершились другой ошибкой.
+    """
+
+    edits: int = 0
+    skipped: int = 0
+    not_modified: int = 0
+    failed: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "edits": self.edits,
+            "skipped": self.skipped,
+            "not_modified": self.not_modified,
+            "failed": self.failed,
+        }
+
+
+class EditDigestStore:
+    """
+    Редактирует сообщения, пропуская запросы, которые ничего не изменят.
+
+    Для каждого сообщения в Redis хранятся хэши последних отправленных текста и
+    клавиатуры (`edit:<chat_id>:<message_id>:text` и `...:markup`). Новый хэш
+    записывается одной транзакцией `SET ... GET` вместе с чтением старого, поэтому
+    из двух одновременных нажатий в Telegram уйдет только одно. Если Telegram
+    вернул ошибку, прежние хэши восстанавливаются.
+
+    Атрибуты:
+        metrics (EditDigestMetrics): Метрики сэкономленных запросов.
+    """
+
+    def __init__(self, bot: Bot, redis: Redis, ttl: int = DIGEST_TTL) -> None:
+        """
+        Args:
+            bot (Bot): Экземпляр бота.
+            redis (Redis): Клиент Redis.
+            ttl (int): Сколько секунд хранить хэши сообщения.
+        """
+        self.bot = bot
+        self.redis = redis
+        self.ttl = ttl
+        self.metrics = EditDigestMetrics()
+
+    def _key(self, chat_id: Union[int, str], message_id: int, part: str) -> str:
+        return f"{DIGEST_PREFIX}:{int(chat_id)}:{message_id}:{part}"
+
+    async def _swap(
+        self, parts: Tuple[Tuple[str, str], ...]
+    ) -> Tuple[Optional[str], ...]:
+        """Записывает новые хэши и возвращает прежние."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, value in parts:
+                pipe.set(key, value, ex=self.ttl, get=True)
+            old = await pipe.execute()
+        return tuple(
+            value.decode() if isinstance(value, bytes) else value for value in old
+        )
+
+    async def _restore(self, parts: Tuple[Tuple[str, Optional[str]], ...]) -> None:
+        """Возвращает хэши, которые были до неудачного редактирования."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, value in parts:
+                if value is None:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, value, ex=self.ttl)
+            await pipe.execute()
+
+    async def _edit(
+        self,
+        parts: Tuple[Tuple[str, str], ...],
+        request: Callable[[], Awaitable[Any]],
+    ) -> bool:
+        """Отправляет запрос `request`, если хотя бы один хэш из `parts` изменился."""
+        old = await self._swap(parts)
+        if all(value == new for value, (_, new) in zip(old, parts)):
+            self.metrics.skipped += 1
+            return False
+
+        self.metrics.edits += 1
+        try:
+            await request()
+        except Exception as e:
+            not_modified = "message is not modified" in str(e)
+            if isinstance(e, TelegramBadRequest) and not_modified:
+                # Содержимое уже такое, новые хэши верны
+                self.metrics.not_modified += 1
+                return False
+            self.metrics.failed += 1
+            await self._restore(
+                tuple((key, value) for (key, _), value in zip(parts, old))
+            )
+            raise
+        return True
+
+    async def edit_text(
+        self,
+        chat_id: Union[int, str],
+        message_id: int,
+        text: str,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ) -> bool:
+        """
+        Меняет текст и клавиатуру сообщения, если они отличаются от последних отправленных.
+
+        Args:
+            chat_id (Union[int, str]): ID чата.
+            message_id (int): ID сообщения.
+            text (str): Новый текст.
+            reply_markup (Optional[InlineKeyboardMarkup]): Новая клавиатура.
+
+        Returns:
+            bool: True, если сообщение отредактировано; False, если запрос не понадобился.
+        """
+        parts = (
+            (self._key(chat_id, message_id, "text"), digest(text)),
+            (self._key(chat_id, message_id, "markup"), digest(reply_markup)),
+        )
+        return await self._edit(
+            parts,
+            lambda: self.bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=message_id,
+                text=text,
+                reply_markup=reply_markup,
+            ),
+        )
+
+    async def edit_reply_markup(
+        self,
+        chat_id: Union[int, str],
+        message_id: int,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ) -> bool:
+        """
+        Меняет (или убирает) клавиатуру сообщения, если она отличается от последней отправленной.
+
+        Args:
+            chat_id (Union[int, str]): ID чата.
+            message_id (int): ID сообщения.
+            reply_markup (Optional[InlineKeyboardMarkup]): Новая клавиатура; None убирает её.
+
+        Returns:
+            bool: True, если сообщение отредактировано; False, если запрос не понадобился.
+        """
+        parts = ((self._key(chat_id, message_id, "markup"), digest(reply_markup)),)
+        return await self._edit(
+            parts,
+            lambda: self.bot.edit_message_reply_markup(
+                chat_id=chat_id, message_id=message_id, reply_markup=reply_markup
+            ),
+        )
+
+
+edit_digests = EditDigestStore(bot, redis_client)
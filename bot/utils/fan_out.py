@@ -0,0 +1,73 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Generic, Iterable, TypeVar
+
+from aiogram.types import Message
+from loguru import logger
+
+T = TypeVar("T")
+K = TypeVar("K")
+
+
+@dataclass
+class FanOutResult(Generic[K, T]):
+    """
+    Результат рассылки по нескольким получателям.
+
+    Атрибуты:
+        results (Dict[K, T]): Успешные результаты по каждому получателю.
+        errors (Dict[K, Exception]): Ошибки по получателям, у которых отправка не удалась.
+    """
+
+    results: Dict[K, T] = field(default_factory=dict)
+    errors: Dict[K, Exception] = field(default_factory=dict)
+
+    @property
+    def message_ids(self) -> Dict[K, int]:
+        """Словарь получатель → message_id для результатов типа `Message`."""
+        return {
+            target: result.message_id
+            for target, result in self.results.items()
+            if isinstance(result, Message)
+        }
+
+    @property
+    def ok(self) -> bool:
+        """True, если отправка прошла у всех получателей."""
+        return not self.errors
+
+
+async def fan_out(
+    targets: Iterable[K],
+    action: Callable[[K], Awaitable[T]],
+    concurrency: int = 10,
+) -> FanOutResult[K, T]:
+    """
+    Выполняет `action` для всех получателей одновременно с ограничением параллелизма.
+
+    Ошибка у одного получателя не останавливает остальных: она логируется и
+    попадает в `FanOutResult.errors`.
+
+    Args:
+        targets (Iterable[K]): Получатели (например, ID администраторов).
+        action (Callable[[K], Awaitable[T]]): Корутина отправки/редактирования для одного получателя.
+        concurrency (int): Максимальное количество одновременных вызовов.
+
+    Returns:
+        FanOutResult[K, T]: Результаты и ошибки по каждому получателю.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    outcome: FanOutResult[K, T] = FanOutResult()
+
+    async def run(target: K) -> None:
+        async with semaphore:
+            try:
+                outcome.results[target] = await action(target)
+            except Exception as e:
+                logger.bind(user=target).error(
+                    f"Не удалось выполнить рассылку для {target}: {e}"
+                )
+                outcome.errors[target] = e
+
+    await asyncio.gather(*(run(target) for target in targets))
+    return outcome
@@ -0,0 +1,650 @@
+import copy
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, cast
+
+import orjson
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from loguru import logger
+from redis.asyncio.client import Pipeline
+from redis.exceptions import NoScriptError
+from redis.typing import ExpiryT
+
+# Дописывает в поле хэша элементы JSON-массива без разбора всего списка:
+# ARGV[2] — уже сериализованные элементы через запятую, ARGV[3] — TTL ключа (0 — без TTL)
+APPEND_LIST_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if (not current) or current == '[]' then
+    current = '[' .. ARGV[2] .. ']'
+else
+    current = string.sub(current, 1, -2) .. ',' .. ARGV[2] .. ']'
+end
+redis.call('HSET', KEYS[1], ARGV[1], current)
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return string.len(current)
+"""
+
+
+def state_name(state: StateType) -> Optional[str]:
+    """Приводит состояние FSM (State или строку) к строке."""
+    return cast(Optional[str], state.state if isinstance(state, State) else state)
+
+
+def ttl_seconds(ttl: Optional[ExpiryT]) -> int:
+    """Приводит TTL (секунды или timedelta) к целым секундам (0 — без TTL)."""
+    if isinstance(ttl, timedelta):
+        return int(ttl.total_seconds())
+    return int(ttl or 0)
+
+
+@dataclass
+class FSMWriteBatch:
+    """
+    Отложенные записи FSM в рамках одного апдейта.
+
+    Атрибуты:
+        states (Dict[StorageKey, Optional[str]]): Новые состояния (None — удалить).
+        datas (Dict[StorageKey, Dict[str, Any]]): Итоговые данные всех измененных ключей.
+        replaced (Set[StorageKey]): Ключи, данные которых заменены целиком (`set_data`).
+        patches (Dict[StorageKey, Dict[str, Any]]): Измененные поля остальных ключей (`update_data`).
+        appends (Dict[StorageKey, Dict[str, List[Any]]]): Элементы, дописанные в списки.
+        touched (Set[StorageKey]): Ключи, TTL которых нужно продлить.
+        ttls (Dict[StorageKey, Optional[ExpiryT]]): TTL ключей пачки (заполняется при отправке).
+    """
+
+    states: Dict[StorageKey, Optional[str]] = field(default_factory=dict)
+    datas: Dict[StorageKey, Dict[str, Any]] = field(default_factory=dict)
+    replaced: Set[StorageKey] = field(default_factory=set)
+    patches: Dict[StorageKey, Dict[str, Any]] = field(default_factory=dict)
+    appends: Dict[StorageKey, Dict[str, List[Any]]] = field(default_factory=dict)
+    touched: Set[StorageKey] = field(default_factory=set)
+    ttls: Dict[StorageKey, Optional[ExpiryT]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.states or self.datas or self.touched)
+
+    def keys(self) -> Set[StorageKey]:
+        """Возвращает все ключи, которые затрагивает пачка."""
+        return set(self.states) | set(self.datas) | self.touched
+
+    def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """Заменяет данные ключа целиком."""
+        self.datas[key] = data
+        self.replaced.add(key)
+        self.patches.pop(key, None)
+        self.appends.pop(key, None)
+
+    def update_data(
+        self, key: StorageKey, data: Dict[str, Any], changes: Dict[str, Any]
+    ) -> None:
+        """Запоминает измененные поля ключа и его итоговые данные."""
+        self.datas[key] = data
+        if key in self.replaced:
+            return
+        self.patches.setdefault(key, {}).update(changes)
+        appends = self.appends.get(key, {})
+        for name in changes:
+            appends.pop(name, None)
+
+    def append(
+        self, key: StorageKey, data: Dict[str, Any], name: str, values: List[Any]
+    ) -> None:
+        """Запоминает элементы, дописанные в список `name`, и итоговые данные ключа."""
+        self.datas[key] = data
+        if key in self.replaced:
+            return
+        patch = self.patches.get(key, {})
+        if name in patch:
+            # Поле уже перезаписывается целиком — достаточно обновить его значение
+            patch[name] = data[name]
+        else:
+            self.appends.setdefault(key, {}).setdefault(name, []).extend(values)
+
+
+class PipelinedRedisStorage(RedisStorage):
+    """
+    `RedisStorage`, который умеет записывать состояния и данные нескольких ключей
+    одной транзакцией (MULTI/EXEC в одном pipeline).
+
+    Формат ключей и значений совпадает с `RedisStorage`, поэтому хранилище можно
+    включить без миграции данных.
+
+    TTL ключей состояния и данных зависит от текущего состояния (`state_ttls`), для
+    остальных состояний действуют `state_ttl` и `data_ttl`. При записи пачки TTL
+    продлевается у обоих ключей пользователя.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        state_ttls: Optional[Dict[str, ExpiryT]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            state_ttls (Optional[Dict[str, ExpiryT]]): TTL по именам состояний
+                (например, `ApplicationForm:photo`). Остальные аргументы — как у `RedisStorage`.
+        """
+        super().__init__(*args, **kwargs)
+        self.state_ttls = state_ttls or {}
+
+    def data_key(self, key: StorageKey) -> str:
+        """Возвращает ключ Redis с данными FSM."""
+        return self.key_builder.build(key, "data")
+
+    def ttl_for(self, state: Optional[str]) -> Optional[ExpiryT]:
+        """Возвращает TTL ключей пользователя, находящегося в состоянии `state`."""
+        if state is None:
+            return self.data_ttl
+        return self.state_ttls.get(state, self.state_ttl)
+
+    def write_state(
+        self, pipe: Pipeline, key: StorageKey, state: StateType, ttl: Optional[ExpiryT]
+    ) -> None:
+        """Добавляет в pipeline запись состояния."""
+        redis_key = self.key_builder.build(key, "state")
+        name = state_name(state)
+        if name is None:
+            pipe.delete(redis_key)
+        else:
+            pipe.set(redis_key, name, ex=ttl)
+
+    def write_data(
+        self,
+        pipe: Pipeline,
+        key: StorageKey,
+        data: Dict[str, Any],
+        ttl: Optional[ExpiryT],
+    ) -> None:
+        """Добавляет в pipeline запись данных."""
+        redis_key = self.data_key(key)
+        if not data:
+            pipe.delete(redis_key)
+        else:
+            pipe.set(redis_key, self.json_dumps(data), ex=ttl)
+
+    def write_expire(
+        self, pipe: Pipeline, key: StorageKey, ttl: Optional[ExpiryT]
+    ) -> None:
+        """Добавляет в pipeline продление TTL ключей состояния и данных."""
+        if ttl:
+            pipe.expire(self.key_builder.build(key, "state"), ttl)
+            pipe.expire(self.data_key(key), ttl)
+
+    def write_batch_data(self, pipe: Pipeline, batch: FSMWriteBatch) -> None:
+        """Добавляет в pipeline запись данных пачки (каждый ключ целиком)."""
+        for key, data in batch.datas.items():
+            self.write_data(pipe, key, data, batch.ttls.get(key, self.data_ttl))
+
+    async def write_many(self, batch: FSMWriteBatch) -> None:
+        """
+        Записывает состояния и данные пачки одной транзакцией.
+
+        Args:
+            batch (FSMWriteBatch): Накопленные за апдейт записи.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, state in batch.states.items():
+                self.write_state(pipe, key, state, batch.ttls.get(key, self.state_ttl))
+            self.write_batch_data(pipe, batch)
+            for key in batch.keys():
+                self.write_expire(pipe, key, batch.ttls.get(key))
+            await pipe.execute()
+
+    async def memory_report(self) -> Dict[Optional[str], Tuple[int, int]]:
+        """
+        Считает записи FSM в Redis по состояниям.
+
+        Перебирает ключи хранилища через SCAN и запрашивает их размер (MEMORY USAGE)
+        пачками в одном pipeline.
+
+        Returns:
+            Dict[Optional[str], Tuple[int, int]]: Состояние (None — без состояния) →
+                (количество пользователей, суммарный размер ключей в байтах).
+        """
+        prefix = getattr(self.key_builder, "prefix", "fsm")
+        separator = getattr(self.key_builder, "separator", ":")
+        owners: Dict[str, List[Any]] = {}  # пользователь → [состояние, размер]
+
+        async def measure(keys: List[bytes]) -> None:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for redis_key in keys:
+                    pipe.memory_usage(redis_key)
+                    if redis_key.endswith(f"{separator}state".encode()):
+                        pipe.get(redis_key)
+                results = iter(await pipe.execute())
+            for redis_key in keys:
+                owner, _, part = redis_key.decode().rpartition(separator)
+                entry = owners.setdefault(owner, [None, 0])
+                entry[1] += next(results) or 0
+                if part == "state":
+                    state = next(results)
+                    entry[0] = state.decode() if state else None
+
+        page: List[bytes] = []
+        async for redis_key in self.redis.scan_iter(
+            match=f"{prefix}{separator}*", count=500
+        ):
+            page.append(redis_key)
+            if len(page) >= 500:
+                await measure(page)
+                page = []
+        if page:
+            await measure(page)
+
+        report: Dict[Optional[str], Tuple[int, int]] = {}
+        for state, size in owners.values():
+            count, total = report.get(state, (0, 0))
+            report[state] = (count + 1, total + size)
+        return report
+
+
+class HashRedisStorage(PipelinedRedisStorage):
+    """
+    FSM-хранилище, которое держит данные в хэше Redis: одно поле на ключ данных,
+    значения сериализуются orjson.
+
+    `update_data` перезаписывает только измененные поля, а `append_list` дописывает
+    элементы в список на стороне Redis (Lua-скрипт), не пересылая весь список.
+    Состояние хранится так же, как в `RedisStorage`.
+
+    Данные, сохраненные `RedisStorage` одной JSON-строкой, переносятся в хэш при
+    первом чтении.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._append_script = self.redis.register_script(APPEND_LIST_SCRIPT)
+        self._script_loaded = False
+
+    def data_key(self, key: StorageKey) -> str:
+        """Возвращает ключ хэша с данными FSM."""
+        return self.key_builder.build(key, "fields")  # type: ignore[arg-type]
+
+    def write_data(
+        self,
+        pipe: Pipeline,
+        key: StorageKey,
+        data: Dict[str, Any],
+        ttl: Optional[ExpiryT],
+    ) -> None:
+        """Добавляет в pipeline полную замену данных."""
+        redis_key = self.data_key(key)
+        pipe.delete(redis_key, self.key_builder.build(key, "data"))
+        if data:
+            pipe.hset(
+                redis_key,
+                mapping={name: orjson.dumps(value) for name, value in data.items()},
+            )
+            if ttl:
+                pipe.expire(redis_key, ttl)
+
+    def write_fields(
+        self,
+        pipe: Pipeline,
+        key: StorageKey,
+        fields: Dict[str, Any],
+        ttl: Optional[ExpiryT],
+    ) -> None:
+        """Добавляет в pipeline перезапись отдельных полей."""
+        redis_key = self.data_key(key)
+        pipe.hset(
+            redis_key,
+            mapping={name: orjson.dumps(value) for name, value in fields.items()},
+        )
+        if ttl:
+            pipe.expire(redis_key, ttl)
+
+    def write_append(
+        self,
+        pipe: Pipeline,
+        key: StorageKey,
+        name: str,
+        values: List[Any],
+        ttl: Optional[ExpiryT],
+    ) -> None:
+        """Добавляет в pipeline дописывание элементов в список `name`."""
+        items = b",".join(orjson.dumps(value) for value in values)
+        pipe.evalsha(
+            self._append_script.sha,
+            1,
+            self.data_key(key),
+            name,
+            items,
+            ttl_seconds(ttl),
+        )
+
+    def write_batch_data(self, pipe: Pipeline, batch: FSMWriteBatch) -> None:
+        """Добавляет в pipeline запись данных пачки: только то, что изменилось."""
+        for key, data in batch.datas.items():
+            ttl = batch.ttls.get(key, self.data_ttl)
+            if key in batch.replaced:
+                self.write_data(pipe, key, data, ttl)
+                continue
+            if batch.patches.get(key):
+                self.write_fields(pipe, key, batch.patches[key], ttl)
+            for name, values in batch.appends.get(key, {}).items():
+                self.write_append(pipe, key, name, values, ttl)
+
+    async def write_many(self, batch: FSMWriteBatch) -> None:
+        # Скрипт загружается один раз, а не проверяется (SCRIPT EXISTS) перед каждым pipeline
+        if batch.appends and not self._script_loaded:
+            await self.redis.script_load(APPEND_LIST_SCRIPT)
+            self._script_loaded = True
+        try:
+            await super().write_many(batch)
+        except NoScriptError:
+            # Redis перезапущен без скрипта; повтор безопасен, т.к. ни один EVALSHA не выполнился
+            await self.redis.script_load(APPEND_LIST_SCRIPT)
+            await super().write_many(batch)
+
+    def _read_data(self, pipe: Pipeline, key: StorageKey) -> None:
+        pipe.get(self.key_builder.build(key, "data"))
+        pipe.hgetall(self.data_key(key))
+
+    async def _decode_data(
+        self, key: StorageKey, legacy: Optional[bytes], fields: Dict[bytes, bytes]
+    ) -> Dict[str, Any]:
+        data: Dict[str, Any] = self.json_loads(legacy) if legacy else {}
+        for name, value in fields.items():
+            data[name.decode()] = orjson.loads(value)
+        if legacy:
+            # Переносим данные из JSON-строки в хэш, чтобы дальше менять их по полям
+            await self.set_data(key, data)
+        return data
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._read_data(pipe, key)
+            legacy, fields = await pipe.execute()
+        return await self._decode_data(key, legacy, fields)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            self.write_data(pipe, key, data, self.data_ttl)
+            await pipe.execute()
+
+    async def update_data(
+        self, key: StorageKey, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if data:
+                self.write_fields(pipe, key, data, self.data_ttl)
+            self._read_data(pipe, key)
+            *_, legacy, fields = await pipe.execute()
+        return await self._decode_data(key, legacy, fields)
+
+
+@dataclass
+class FSMStorageMetrics:
+    """
+    Метрики кэширующего FSM-хранилища.
+
+    Атрибуты:
+        reads (int): Сколько раз обработчики читали состояние или данные.
+        cache_hits (int): Сколько чтений обслужено из памяти без обращения к Redis.
+        writes (int): Сколько раз обработчики записывали состояние или данные.
+        flushes (int): Сколько транзакций записи отправлено в Redis.
+    """
+
+    reads: int = 0
+    cache_hits: int = 0
+    writes: int = 0
+    flushes: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "reads": self.reads,
+            "cache_hits": self.cache_hits,
+            "writes": self.writes,
+            "flushes": self.flushes,
+        }
+
+
+class CachedStorage(BaseStorage):
+    """
+    Двухуровневое FSM-хранилище: кэш в памяти процесса поверх Redis.
+
+    Чтения обслуживаются из локального кэша с коротким TTL, а при промахе — из
+    Redis. Внутри `batch()` (его открывает `FSMFlushMiddleware` на каждый апдейт)
+    все `set_state`, `set_data`, `update_data` и `append_list` копятся в буфере, а в
+    конце апдейта отправляются в Redis одной транзакцией; если обработка апдейта
+    упала, буфер отбрасывается. Вне `batch()` запись идет сразу.
+
+    Кэш согласован, пока апдейты одного чата обрабатывает один процесс (polling,
+    webhook или воркер Redis Streams со своими разделами); TTL ограничивает
+    устаревание на случай, если данные изменил другой процесс.
+
+    Каждый апдейт, который читает или пишет FSM пользователя, продлевает TTL его
+    ключей в Redis (не чаще раза за `ttl` секунд, если апдейт только читал).
+
+    Атрибуты:
+        backend (PipelinedRedisStorage): Хранилище в Redis.
+        metrics (FSMStorageMetrics): Метрики чтений, попаданий в кэш и записей.
+    """
+
+    def __init__(
+        self,
+        backend: PipelinedRedisStorage,
+        ttl: float = 30.0,
+        max_size: int = 10000,
+    ) -> None:
+        """
+        Args:
+            backend (PipelinedRedisStorage): Хранилище в Redis.
+            ttl (float): Сколько секунд хранить прочитанные значения в памяти.
+            max_size (int): Максимальное количество значений в кэше.
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.max_size = max_size
+        self.metrics = FSMStorageMetrics()
+        self._cache: Dict[Tuple[str, StorageKey], Tuple[float, Any]] = {}
+        self._batch: ContextVar[Optional[FSMWriteBatch]] = ContextVar(
+            "fsm_write_batch", default=None
+        )
+
+    @property
+    def redis(self):
+        """Клиент Redis, которым пользуется хранилище."""
+        return self.backend.redis
+
+    def _cache_get(self, part: str, key: StorageKey) -> Tuple[bool, Any]:
+        entry = self._cache.get((part, key))
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._cache[(part, key)]
+            return False, None
+        return True, value
+
+    def _cache_set(self, part: str, key: StorageKey, value: Any) -> None:
+        if len(self._cache) >= self.max_size:
+            # Удаляем самые старые записи (словарь хранит порядок вставки)
+            for stale in list(self._cache)[: self.max_size // 10 or 1]:
+                del self._cache[stale]
+        self._cache.pop((part, key), None)
+        self._cache[(part, key)] = (time.monotonic() + self.ttl, value)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """
+        Накапливает записи FSM и отправляет их одной транзакцией при выходе.
+
+        Если блок завершился исключением, накопленные записи отбрасываются: ни
+        Redis, ни кэш процесса их не увидят.
+        """
+        batch = FSMWriteBatch()
+        token = self._batch.set(batch)
+        try:
+            yield
+        finally:
+            self._batch.reset(token)
+        await self.flush(batch)
+
+    def _touch(self, key: StorageKey) -> None:
+        """Отмечает, что TTL ключей пользователя нужно продлить в конце апдейта."""
+        batch = self._batch.get()
+        if batch is not None and not self._cache_get("refresh", key)[0]:
+            batch.touched.add(key)
+
+    async def flush(self, batch: FSMWriteBatch) -> None:
+        """Отправляет накопленные записи в Redis и обновляет кэш."""
+        if not batch:
+            return
+        for key in batch.keys():
+            state = (
+                batch.states[key]
+                if key in batch.states
+                else await self._load_state(key)
+            )
+            batch.ttls[key] = self.backend.ttl_for(state)
+        try:
+            await self.backend.write_many(batch)
+        except Exception as e:
+            # Кэшу нельзя доверять, если запись не дошла до Redis
+            for key in batch.states:
+                self._cache.pop(("state", key), None)
+            for key in batch.datas:
+                self._cache.pop(("data", key), None)
+            logger.error(f"Ошибка записи FSM в Redis: {e}")
+            raise
+        self.metrics.flushes += 1
+        for key in batch.keys():
+            self._cache_set("refresh", key, True)
+        for key, state in batch.states.items():
+            self._cache_set("state", key, state)
+        for key, data in batch.datas.items():
+            self._cache_set("data", key, data)
+
+    async def _write(self, batch: FSMWriteBatch) -> None:
+        """Записывает изменения сразу, если они сделаны вне `batch()`."""
+        if self._batch.get() is not batch:
+            await self.flush(batch)
+
+    def _current_batch(self) -> FSMWriteBatch:
+        batch = self._batch.get()
+        return batch if batch is not None else FSMWriteBatch()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.metrics.writes += 1
+        batch = self._current_batch()
+        batch.states[key] = state_name(state)
+        await self._write(batch)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        self.metrics.reads += 1
+        self._touch(key)
+        return await self._load_state(key)
+
+    async def _load_state(self, key: StorageKey) -> Optional[str]:
+        """Возвращает текущее состояние ключа."""
+        batch = self._batch.get()
+        if batch is not None and key in batch.states:
+            self.metrics.cache_hits += 1
+            return batch.states[key]
+        hit, value = self._cache_get("state", key)
+        if hit:
+            self.metrics.cache_hits += 1
+            return value
+        value = await self.backend.get_state(key)
+        self._cache_set("state", key, value)
+        return value
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self.metrics.writes += 1
+        batch = self._current_batch()
+        batch.set_data(key, copy.deepcopy(data))
+        await self._write(batch)
+
+    async def _load_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Возвращает текущие данные ключа (без копирования)."""
+        batch = self._batch.get()
+        if batch is not None and key in batch.datas:
+            self.metrics.cache_hits += 1
+            return batch.datas[key]
+        hit, value = self._cache_get("data", key)
+        if hit:
+            self.metrics.cache_hits += 1
+            return value
+        value = await self.backend.get_data(key)
+        self._cache_set("data", key, value)
+        return value
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        self.metrics.reads += 1
+        self._touch(key)
+        return copy.deepcopy(await self._load_data(key))
+
+    async def update_data(
+        self, key: StorageKey, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        self.metrics.reads += 1
+        self.metrics.writes += 1
+        changes = copy.deepcopy(data)
+        current = copy.deepcopy(await self._load_data(key))
+        current.update(changes)
+        batch = self._current_batch()
+        batch.update_data(key, current, changes)
+        await self._write(batch)
+        return copy.deepcopy(current)
+
+    async def append_list(
+        self, key: StorageKey, name: str, values: List[Any]
+    ) -> List[Any]:
+        """
+        Дописывает элементы в список `name` данных FSM.
+
+        Args:
+            key (StorageKey): Ключ FSM.
+            name (str): Имя поля со списком.
+            values (List[Any]): Новые элементы.
+
+        Returns:
+            List[Any]: Список после добавления.
+        """
+        self.metrics.reads += 1
+        self.metrics.writes += 1
+        values = copy.deepcopy(values)
+        current = copy.deepcopy(await self._load_data(key))
+        current[name] = list(current.get(name, [])) + values
+        batch = self._current_batch()
+        batch.append(key, current, name, values)
+        await self._write(batch)
+        return copy.deepcopy(current[name])
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+async def append_fsm_list(state: FSMContext, name: str, *values: Any) -> List[Any]:
+    """
+    Дописывает элементы в список `name` данных FSM пользователя.
+
+    С `CachedStorage` в Redis уходят только новые элементы, с другими
+    хранилищами список читается и записывается целиком.
+
+    Args:
+        state (FSMContext): Контекст FSM пользователя.
+        name (str): Имя поля со списком.
+        *values (Any): Новые элементы.
+
+    Returns:
+        List[Any]: Список после добавления.
+    """
+    if isinstance(state.storage, CachedStorage):
+        return await state.storage.append_list(state.key, name, list(values))
+    data = await state.get_data()
+    items = list(data.get(name, [])) + list(values)
+    await state.update_data({name: items})
+    return items
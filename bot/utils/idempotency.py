@@ -0,0 +1,75 @@
+from typing import Sequence
+
+from aiogram.types import CallbackQuery
+from redis.asyncio import Redis
+
+IDEMPOTENCY_PREFIX = "idem"
+
+
+def idempotency_key(kind: str, *parts: object) -> str:
+    """
+    Возвращает ключ Redis для отметки об обработке.
+
+    Args:
+        kind (str): Вид события ("update", "cb", "cbm").
+        *parts (object): Части идентификатора события.
+
+    Returns:
+        str: Ключ вида `idem:<kind>:<part>:<part>...`.
+    """
+    return ":".join([IDEMPOTENCY_PREFIX, kind, *map(str, parts)])
+
+
+async def claim(redis: Redis, keys: Sequence[str], ttl: int) -> bool:
+    """
+    Отмечает событие как обрабатываемое (`SET NX EX` для каждого ключа).
+
+    Все ключи записываются одним pipeline. Событие считается новым, только если
+    ни одного ключа еще не было: так повтор отсекается по любому из признаков
+    (например, по `callback_query.id` или по паре сообщение + данные кнопки).
+
+    Args:
+        redis (Redis): Клиент Redis.
+        keys (Sequence[str]): Ключи события.
+        ttl (int): Сколько секунд помнить событие.
+
+    Returns:
+        bool: True, если событие новое и его нужно обработать.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.set(key, 1, nx=True, ex=ttl)
+        results = await pipe.execute()
+    return all(results)
+
+
+async def release(redis: Redis, keys: Sequence[str]) -> None:
+    """
+    Снимает отметки, чтобы событие можно было повторить (например, после ошибки).
+
+    Args:
+        redis (Redis): Клиент Redis.
+        keys (Sequence[str]): Ключи события.
+    """
+    if keys:
+        await redis.delete(*keys)
+
+
+def press_key(call: CallbackQuery) -> str:
+    """Возвращает ключ нажатия кнопки: пользователь, сообщение и данные кнопки."""
+    return idempotency_key("cbm", call.from_user.id, call.message.message_id, call.data)
+
+
+async def release_press(redis: Redis, call: CallbackQuery) -> None:
+    """
+    Снимает отметку о нажатии кнопки, чтобы пользователь мог нажать её снова.
+
+    Вызывается обработчиками с флагом `idempotent`, которые сами перехватывают
+    ошибку и не пробрасывают её в `CallbackIdempotencyMiddleware`.
+
+    Args:
+        redis (Redis): Клиент Redis.
+        call (CallbackQuery): Нажатие, завершившееся ошибкой.
+    """
+    if call.message is not None:
+        await release(redis, [press_key(call)])
@@ -0,0 +1,109 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+from aiogram import Bot
+from aiogram.types import (
+    ForceReply,
+    InlineKeyboardMarkup,
+    ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
+)
+from aiogram.utils.chat_action import ChatActionSender
+from loguru import logger
+
+ReplyMarkup = Union[
+    InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove, ForceReply
+]
+
+
+@dataclass
+class PacedMessage:
+    """
+    Одно сообщение из последовательности с имитацией набора текста.
+
+    Атрибуты:
+        text (str): Текст сообщения.
+        delay (float): Сколько секунд показывать «печатает...» перед отправкой.
+        reply_markup (Optional[ReplyMarkup]): Клавиатура сообщения.
+    """
+
+    text: str
+    delay: float = 1.0
+    reply_markup: Optional[ReplyMarkup] = None
+
+
+class PacedDelivery:
+    """
+    Фоновая доставка последовательностей сообщений с паузами между ними.
+
+    Обработчик кладет упорядоченный список сообщений в очередь чата через
+    `enqueue` и сразу завершается, не удерживая сессию БД и FSM-контекст на время
+    пауз. Для каждого чата работает своя фоновая задача: она отправляет
+    последовательности строго по порядку и во время пауз показывает «печатает...».
+    Задача завершается сама, когда очередь чата опустела.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    def enqueue(self, chat_id: int, messages: Iterable[PacedMessage]) -> None:
+        """
+        Ставит последовательность сообщений в очередь доставки чата.
+
+        Args:
+            chat_id (int): ID чата-получателя.
+            messages (Iterable[PacedMessage]): Сообщения в порядке отправки.
+        """
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        queue.put_nowait(list(messages))
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._deliver(chat_id))
+
+    async def _deliver(self, chat_id: int) -> None:
+        """Отправляет последовательности сообщений чата, пока очередь не опустеет."""
+        queue = self._queues[chat_id]
+        try:
+            while not queue.empty():
+                sequence: List[PacedMessage] = queue.get_nowait()
+                for paced in sequence:
+                    try:
+                        if paced.delay > 0:
+                            async with ChatActionSender.typing(
+                                bot=self.bot, chat_id=chat_id
+                            ):
+                                await asyncio.sleep(paced.delay)
+                        await self.bot.send_message(
+                            chat_id=chat_id,
+                            text=paced.text,
+                            reply_markup=paced.reply_markup,
+                        )
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.bind(user=chat_id).error(
+                            f"Не удалось доставить сообщение в чат {chat_id}: {e}"
+                        )
+        finally:
+            del self._workers[chat_id]
+            del self._queues[chat_id]
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Дожидается доставки поставленных в очередь сообщений при остановке бота.
+
+        Args:
+            timeout (float): Сколько секунд ждать, прежде чем отменить доставку.
+        """
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Отменена доставка сообщений в {len(pending)} чатов")
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, SendChatAction, TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+
+# Префиксы методов Bot API, которые Telegram считает исходящими сообщениями
+LIMITED_METHOD_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket.
+
+    Корзина пополняется со скоростью `rate` токенов в секунду и вмещает не более
+    `capacity` токенов. Ожидающие корутины обслуживаются строго по очереди (FIFO),
+    так как `asyncio.Lock` справедлив.
+
+    Атрибуты:
+        rate (float): Скорость пополнения, токенов в секунду.
+        capacity (float): Максимальное количество накопленных токенов (размер всплеска).
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        """Корзина полна и никто не ждет токен — её можно удалить."""
+        self._refill()
+        return not self._lock.locked() and self._tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        """Ждет, пока в корзине появится токен, и забирает его."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class SendSchedulerMetrics:
+    """
+    Метрики планировщика отправки.
+
+    Атрибуты:
+        queue_depth (int): Сколько запросов сейчас ждут своей очереди.
+        max_queue_depth (int): Максимальная глубина очереди за время работы.
+        sent (int): Сколько лимитируемых запросов выполнено.
+        retry_after (int): Сколько раз Telegram ответил flood-wait (RetryAfter).
+        failed (int): Сколько запросов не удалось выполнить после всех повторов.
+        total_wait (float): Суммарное время ожидания в очереди, секунды.
+        max_wait (float): Максимальное время ожидания одного запроса, секунды.
+    """
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    sent: int = 0
+    retry_after: int = 0
+    failed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def avg_wait(self) -> float:
+        """Среднее время ожидания одного запроса, секунды."""
+        return self.total_wait / self.sent if self.sent else 0.0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "sent": self.sent,
+            "retry_after": self.retry_after,
+            "failed": self.failed,
+            "avg_wait": round(self.avg_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+        }
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """
+    Центральный планировщик исходящих запросов к Telegram.
+
+    Регистрируется как middleware сессии бота (`bot.session.middleware(...)`), поэтому
+    через него проходят все вызовы `bot.send_*`, `bot.edit_*`, `message.answer` и т.д.
+    Вместо того чтобы падать на flood-wait, запрос ждет токен сначала в корзине
+    своего чата, затем в общей корзине бота. Ответ `RetryAfter` приостанавливает
+    все отправки на указанное Telegram время, после чего запрос повторяется.
+
+    Атрибуты:
+        metrics (SendSchedulerMetrics): Метрики глубины очереди и времени ожидания.
+    """
+
+    # Сколько корзин чатов держим, прежде чем удалять простаивающие
+    _PRUNE_THRESHOLD = 1000
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_retries: int = 5,
+    ) -> None:
+        """
+        Args:
+            global_rate (float): Лимит сообщений в секунду на бота.
+            chat_rate (float): Лимит сообщений в секунду на один чат.
+            chat_burst (int): Сколько сообщений подряд можно отправить в чат без ожидания.
+            max_retries (int): Сколько раз повторять запрос после RetryAfter.
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.metrics = SendSchedulerMetrics()
+        self._global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self._chat_buckets: Dict[int | str, TokenBucket] = {}
+        self._paused_until = 0.0
+
+    @staticmethod
+    def _is_limited(method: TelegramMethod) -> bool:
+        """Проверяет, относится ли метод к исходящим сообщениям."""
+        if isinstance(method, SendChatAction):
+            return False
+        return type(method).__name__.startswith(LIMITED_METHOD_PREFIXES)
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self._PRUNE_THRESHOLD:
+                self._prune()
+            bucket = TokenBucket(rate=self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune(self) -> None:
+        """Удаляет корзины чатов, которые полны и никем не используются."""
+        for chat_id in [k for k, v in self._chat_buckets.items() if v.idle]:
+            del self._chat_buckets[chat_id]
+
+    async def _wait_turn(self, chat_id: Optional[int | str]) -> None:
+        """Ожидает паузу после RetryAfter и токены корзины чата и бота."""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if chat_id is not None:
+            await self._chat_bucket(chat_id).acquire()
+        await self._global_bucket.acquire()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not self._is_limited(method):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            self.metrics.queue_depth += 1
+            self.metrics.max_queue_depth = max(
+                self.metrics.max_queue_depth, self.metrics.queue_depth
+            )
+            try:
+                await self._wait_turn(chat_id)
+            finally:
+                self.metrics.queue_depth -= 1
+            waited = time.monotonic() - started
+            self.metrics.total_wait += waited
+            self.metrics.max_wait = max(self.metrics.max_wait, waited)
+
+            try:
+                response = await make_request(bot, method)
+                self.metrics.sent += 1
+                return response
+            except TelegramRetryAfter as e:
+                self.metrics.retry_after += 1
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.metrics.failed += 1
+                    logger.error(
+                        f"Flood-wait для {type(method).__name__} в чате {chat_id} "
+                        f"не прошел после {self.max_retries} повторов"
+                    )
+                    raise
+                logger.warning(
+                    f"Flood-wait {e.retry_after} c. для {type(method).__name__} "
+                    f"в чате {chat_id}, повтор {attempt}/{self.max_retries}"
+                )
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + e.retry_after
+                )
@@ -0,0 +1,193 @@
+import asyncio
+import secrets
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+from redis.asyncio import Redis
+
+from bot.config import bot, dp, redis_client, settings
+from bot.utils.idempotency import claim, idempotency_key
+
+
+@dataclass
+class WebhookMetrics:
+    """
+    Метрики приема апдейтов через webhook.
+
+    Атрибуты:
+        received (int): Сколько апдейтов принято от Telegram.
+        duplicates (int): Сколько повторных доставок (ретраев Telegram) отброшено.
+        in_flight (int): Сколько апдейтов сейчас обрабатывается или ждет обработки.
+        max_in_flight (int): Максимальное количество одновременно обрабатываемых апдейтов.
+    """
+
+    received: int = 0
+    duplicates: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики в виде словаря (удобно для логов)."""
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+class BackgroundRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик webhook-запросов Telegram с фоновой обработкой апдейтов.
+
+    Сразу отвечает Telegram `200 OK`, а апдейт обрабатывает в фоне: одновременно
+    выполняется не больше `concurrency` апдейтов. Telegram повторяет доставку, если
+    не получил ответ вовремя, поэтому принятые `update_id` запоминаются и повторы
+    отбрасываются: последние — в памяти процесса, все за `dedupe_ttl` секунд — в
+    Redis (`SET NX`), чтобы повтор, пришедший в другой экземпляр бота за
+    балансировщиком, тоже не обработался дважды.
+
+    Атрибуты:
+        metrics (WebhookMetrics): Метрики приема апдейтов.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        concurrency: int = 50,
+        dedupe_size: int = 10000,
+        redis: Optional[Redis] = None,
+        dedupe_ttl: int = 3600,
+        **data: Any,
+    ) -> None:
+        """
+        Args:
+            dispatcher (Dispatcher): Диспетчер бота.
+            bot (Bot): Экземпляр бота.
+            secret_token (Optional[str]): Секрет из заголовка `X-Telegram-Bot-Api-Secret-Token`.
+            concurrency (int): Максимальное количество одновременно обрабатываемых апдейтов.
+            dedupe_size (int): Сколько последних `update_id` помнить в памяти процесса.
+            redis (Optional[Redis]): Клиент Redis для отсечения повторов между процессами.
+            dedupe_ttl (int): Сколько секунд помнить `update_id` в Redis.
+        """
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.metrics = WebhookMetrics()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._dedupe_size = dedupe_size
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._redis = redis
+        self._dedupe_ttl = dedupe_ttl
+
+    async def _is_duplicate(self, update_id: Optional[int]) -> bool:
+        """Запоминает `update_id` и сообщает, встречался ли он недавно."""
+        if update_id is None:
+            return False
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = None
+        if len(self._seen) > self._dedupe_size:
+            self._seen.popitem(last=False)
+        if self._redis is not None:
+            try:
+                key = idempotency_key("update", update_id)
+                return not await claim(self._redis, [key], self._dedupe_ttl)
+            except Exception as e:
+                # Без Redis апдейт лучше обработать, чем потерять
+                logger.warning(f"Не удалось проверить апдейт {update_id} в Redis: {e}")
+        return False
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        self.metrics.in_flight += 1
+        self.metrics.max_in_flight = max(
+            self.metrics.max_in_flight, self.metrics.in_flight
+        )
+        try:
+            async with self._semaphore:
+                await super()._background_feed_update(bot=bot, update=update)
+        except Exception as e:
+            logger.error(f"Ошибка обработки апдейта {update.get('update_id')}: {e}")
+        finally:
+            self.metrics.in_flight -= 1
+
+    async def _handle_request_background(
+        self, bot: Bot, request: web.Request
+    ) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        self.metrics.received += 1
+        if await self._is_duplicate(update.get("update_id")):
+            self.metrics.duplicates += 1
+            logger.debug(f"Повторная доставка апдейта {update.get('update_id')}")
+            return web.json_response({}, dumps=bot.session.json_dumps)
+
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        """Дожидается фоновых апдейтов и закрывает сессию бота."""
+        if self._background_feed_update_tasks:
+            await asyncio.wait(self._background_feed_update_tasks, timeout=10)
+        logger.info(f"Метрики webhook: {self.metrics.as_dict()}")
+        await super().close()
+
+
+async def run_webhook() -> None:
+    """
+    Запускает бота в режиме webhook.
+
+    Поднимает aiohttp-сервер на `WEBAPP_HOST:WEBAPP_PORT`, регистрирует webhook в
+    Telegram с секретным токеном и работает до отмены задачи. Апдейты, накопившиеся
+    за время простоя, не сбрасываются: Telegram доставит их после регистрации.
+    """
+    if not settings.WEBHOOK_BASE_URL:
+        raise RuntimeError("Для режима webhook нужно задать WEBHOOK_BASE_URL")
+
+    # Без заданного секрета генерируем свой: webhook все равно регистрируется при каждом запуске
+    secret_token = (
+        settings.WEBHOOK_SECRET.get_secret_value()
+        if settings.WEBHOOK_SECRET
+        else secrets.token_urlsafe(32)
+    )
+    app = web.Application()
+    handler = BackgroundRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token,
+        concurrency=settings.WEBHOOK_CONCURRENCY,
+        redis=redis_client,
+        dedupe_ttl=settings.UPDATE_DEDUPE_TTL,
+    )
+    handler.register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await bot.set_webhook(
+            url=f"{settings.WEBHOOK_BASE_URL.rstrip('/')}{settings.WEBHOOK_PATH}",
+            secret_token=secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(settings.WEBHOOK_CONCURRENCY, 100),
+        )
+        site = web.TCPSite(runner, host=settings.WEBAPP_HOST, port=settings.WEBAPP_PORT)
+        await site.start()
+        logger.info(
+            f"Webhook-сервер слушает {settings.WEBAPP_HOST}:{settings.WEBAPP_PORT}"
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
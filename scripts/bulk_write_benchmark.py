@@ -0,0 +1,198 @@
+"""
+Замер `BaseDAO.bulk_update` и `BaseDAO.upsert` на таблице пользователей.
+
+Сравнивает:
+- обновление записей по одной (`UserDAO.update` на каждую запись) и
+  `UserDAO.bulk_update` (UPDATE с CASE по `BULK_UPDATE_CHUNK` записей);
+- upsert через поиск и последующую запись (`_upsert_select_first`) и
+  `UserDAO.upsert` (INSERT ... ON CONFLICT DO UPDATE).
+
+Для каждого способа печатаются время и число запросов (слушатель
+`before_cursor_execute`, executemany считается одним запросом). На SQLite в
+памяти запрос ничего не стоит по сети, поэтому время там показывает в основном
+работу Python: INSERT ... ON CONFLICT SQLAlchemy 2.0 не кэширует и компилирует
+при каждом вызове. Выигрыш upsert в один запрос вместо двух виден на PostgreSQL.
+
+Запуск из корня проекта:
+    python -m scripts.bulk_write_benchmark [DB_URL]
+
+По умолчанию используется SQLite в памяти (схема создается по моделям). Можно
+передать адрес PostgreSQL: все изменения выполняются в транзакции, которая в
+конце откатывается.
+"""
+
+import asyncio
+import sys
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Модели заявок нужны, чтобы настроить связи User
+from bot.application_form import models as application_models  # noqa: F401
+from bot.database import Base
+from bot.users.dao import UserDAO
+from bot.users.models import User
+from bot.users.schemas import UserModel
+
+# Сколько записей обновлять в каждом замере
+ROWS = (1000, 100000)
+# Обновление по одной записи на больших объемах идет минуты, поэтому ограничено
+ONE_BY_ONE_LIMIT = 10000
+# Сколько раз вызвать upsert (половина — новые записи, половина — существующие)
+UPSERTS = 1000
+# Тестовые пользователи получают отрицательные telegram_id
+TELEGRAM_ID_BASE = -10_000_000
+
+
+class UsernameUpdate(BaseModel):
+    """Новое имя пользователя для `bulk_update`."""
+
+    id: int
+    username: str
+
+
+async def update_one_by_one(
+    session: AsyncSession, records: List[UsernameUpdate]
+) -> int:
+    """Обновляет записи отдельным UPDATE на каждую."""
+    updated = 0
+    for record in records:
+        updated += await UserDAO.update(
+            session,
+            filters=UsernameUpdate.model_construct(id=record.id),
+            values=UsernameUpdate.model_construct(username=record.username),
+        )
+    return updated
+
+
+async def bulk_update(session: AsyncSession, records: List[UsernameUpdate]) -> int:
+    """Обновляет записи через `UserDAO.bulk_update`."""
+    return await UserDAO.bulk_update(session, records)
+
+
+async def upsert_select_first(session: AsyncSession, values: List[UserModel]) -> int:
+    """Upsert поиском записи и последующим обновлением или вставкой."""
+    for value in values:
+        await UserDAO._upsert_select_first(
+            session, ["telegram_id"], value.model_dump(exclude_unset=True)
+        )
+    return len(values)
+
+
+async def upsert_on_conflict(session: AsyncSession, values: List[UserModel]) -> int:
+    """Upsert через `UserDAO.upsert` (INSERT ... ON CONFLICT DO UPDATE)."""
+    for value in values:
+        await UserDAO.upsert(session, ["telegram_id"], value)
+    return len(values)
+
+
+async def seed(session: AsyncSession, rows: int) -> List[int]:
+    """Создает `rows` пользователей и возвращает их ID."""
+    await session.execute(
+        insert(User),
+        [
+            {
+                "telegram_id": TELEGRAM_ID_BASE - i,
+                "username": f"user_{i}",
+                "owner": True,
+            }
+            for i in range(rows)
+        ],
+    )
+    result = await session.execute(
+        select(User.id).where(User.telegram_id <= TELEGRAM_ID_BASE).order_by(User.id)
+    )
+    return list(result.scalars())
+
+
+async def measure(
+    session: AsyncSession,
+    statements: List[str],
+    name: str,
+    run: Callable[[], Awaitable[int]],
+) -> None:
+    """Выполняет сценарий и печатает время, число запросов и число записей."""
+    session.expunge_all()
+    statements.clear()
+    started = time.perf_counter()
+    count = await run()
+    elapsed = time.perf_counter() - started
+    print(f"  {name}: {elapsed:.2f} с, {len(statements)} запросов, записей: {count}")
+
+
+async def main(url: str) -> None:
+    """Выполняет замеры в одной транзакции и печатает результаты."""
+    engine = create_async_engine(url)
+    statements: List[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    if url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        try:
+            ids = await seed(session, max(ROWS))
+            for rows in ROWS:
+                print(f"Обновление {rows} записей:")
+                scenarios: List[Tuple[str, Callable[..., Awaitable[int]]]] = [
+                    ("по одной записи", update_one_by_one),
+                    ("bulk_update", bulk_update),
+                ]
+                for round_number, (name, update) in enumerate(scenarios):
+                    if update is update_one_by_one and rows > ONE_BY_ONE_LIMIT:
+                        print(f"  {name}: пропущено (больше {ONE_BY_ONE_LIMIT})")
+                        continue
+                    records = [
+                        UsernameUpdate(id=record_id, username=f"{name}_{round_number}")
+                        for record_id in ids[:rows]
+                    ]
+                    await measure(
+                        session,
+                        statements,
+                        name,
+                        lambda update=update, records=records: update(session, records),
+                    )
+
+            print(f"Upsert {UPSERTS} записей (половина новых):")
+            for name, upsert in (
+                ("поиск и запись", upsert_select_first),
+                ("ON CONFLICT", upsert_on_conflict),
+            ):
+                values = [
+                    UserModel(
+                        telegram_id=TELEGRAM_ID_BASE - i - (0 if i % 2 else len(ids)),
+                        username=f"{name}_{i}",
+                    )
+                    for i in range(UPSERTS)
+                ]
+                await measure(
+                    session,
+                    statements,
+                    name,
+                    lambda upsert=upsert, values=values: upsert(session, values),
+                )
+                # Новые записи удаляем, чтобы второй способ тоже их вставлял
+                await session.execute(
+                    User.__table__.delete().where(
+                        User.telegram_id <= TELEGRAM_ID_BASE - len(ids)
+                    )
+                )
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logger.remove()
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "sqlite+aiosqlite://"))
@@ -0,0 +1,118 @@
+"""
+Подсчет запросов к БД при создании заявки с фото, видео и задолженностями.
+
+Сравнивает прежний способ (отдельный `DAO.add` на заявку и на каждое фото, видео
+и банк) с `ApplicationDAO.create_with_children`. Запросы считаются слушателем
+`before_cursor_execute`, то есть так, как их видит драйвер БД.
+
+Запуск из корня проекта:
+    python -m scripts.count_create_queries [DB_URL]
+
+По умолчанию используется SQLite в памяти (схема создается по моделям). Можно
+передать адрес PostgreSQL: все изменения выполняются в транзакции, которая в
+конце откатывается.
+"""
+
+import asyncio
+import sys
+from typing import Awaitable, Callable, List, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from bot.application_form.dao import (
+    ApplicationDAO,
+    BankDebtDAO,
+    PhotoDAO,
+    VideoDAO,
+)
+from bot.application_form.models import ApplicationStatus
+from bot.application_form.schemas import (
+    BankDebtModelSchema,
+    PhotoModelSchema,
+    VideoModelSchema,
+)
+from bot.database import Base
+from bot.users.models import User
+
+PHOTOS = [f"photo-{i}" for i in range(10)]
+VIDEOS = ["video-0"]
+DEBTS = [(f"Банк {i}", 1000.0 * (i + 1)) for i in range(5)]
+
+
+async def create_one_by_one(session: AsyncSession, user_id: int) -> None:
+    """Создает заявку так, как до `create_with_children`: запрос на каждую запись."""
+    application = await ApplicationDAO.add(
+        session=session,
+        values={"user_id": user_id, "status": ApplicationStatus.PENDING},
+    )
+    for file_id in PHOTOS:
+        await PhotoDAO.add(
+            session, PhotoModelSchema(file_id=file_id, application_id=application.id)
+        )
+    for file_id in VIDEOS:
+        await VideoDAO.add(
+            session, VideoModelSchema(file_id=file_id, application_id=application.id)
+        )
+    for bank, amount in DEBTS:
+        await BankDebtDAO.add(
+            session,
+            BankDebtModelSchema(
+                bank_name=bank, total_amount=amount, application_id=application.id
+            ),
+        )
+
+
+async def create_with_children(session: AsyncSession, user_id: int) -> None:
+    """Создает ту же заявку через `ApplicationDAO.create_with_children`."""
+    await ApplicationDAO.create_with_children(
+        session=session,
+        values={"user_id": user_id, "status": ApplicationStatus.PENDING},
+        photos=PHOTOS,
+        videos=VIDEOS,
+        debts=DEBTS,
+    )
+
+
+async def main(url: str) -> None:
+    """Выполняет оба сценария в одной транзакции и печатает число запросов."""
+    engine = create_async_engine(url)
+    statements: List[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement.split(None, 1)[0].upper())
+
+    if url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    scenarios: List[Tuple[str, Callable[[AsyncSession, int], Awaitable[None]]]] = [
+        ("по одному запросу на запись", create_one_by_one),
+        ("create_with_children", create_with_children),
+    ]
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        user = User(telegram_id=-1, username="count_create_queries")
+        session.add(user)
+        await session.flush()
+        try:
+            for name, create in scenarios:
+                statements.clear()
+                await create(session, user.id)
+                print(
+                    f"{name}: {len(statements)} запросов "
+                    f"({', '.join(sorted(set(statements)))}), "
+                    f"фото: {len(PHOTOS)}, видео: {len(VIDEOS)}, банков: {len(DEBTS)}"
+                )
+        finally:
+            await session.close()
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logger.remove()
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "sqlite+aiosqlite://"))
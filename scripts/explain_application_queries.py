@@ -0,0 +1,180 @@
+"""
+Регрессионная проверка планов запросов к заявкам на заполненной базе.
+
+В транзакции создаются пользователи, заявки, фото, видео и задолженности в
+пропорциях, близких к рабочим (ожидающих заявок около 1%), выполняется `ANALYZE`,
+и для каждого запроса печатается план `EXPLAIN`. Настройки планировщика не
+меняются, поэтому проверяется, что он сам выбирает индекс: запрос не проходит
+проверку, если в плане есть `Seq Scan` или нет ожидаемого индекса миграции
+e51a37518a27. В конце транзакция откатывается, данные базы не меняются.
+
+Запуск из корня проекта (нужна PostgreSQL из `.env` после `alembic upgrade head`):
+    python -m scripts.explain_application_queries
+
+Код возврата 1, если хотя бы один запрос не прошел проверку.
+"""
+
+import asyncio
+import sys
+from typing import List, Tuple
+
+from loguru import logger
+from sqlalchemy import Select, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.application_form.models import (
+    Application,
+    ApplicationStatus,
+    BankDebt,
+    Photo,
+    Video,
+)
+from bot.database import async_session
+from bot.users.models import User
+
+USERS = 20000
+APPLICATIONS_PER_USER = 5
+PHOTOS_PER_APPLICATION = 3
+DEBTS_PER_APPLICATION = 2
+# Видео прикладывают к каждой десятой заявке
+VIDEO_EVERY = 10
+
+# Тестовые пользователи получают отрицательные telegram_id, чтобы не пересечься
+# с настоящими. Статусы: 1% ожидающих, 4% отклоненных, остальные приняты
+SEED = [
+    f"""
+    INSERT INTO users (telegram_id, username, owner)
+    SELECT -g, 'explain_' || g, true FROM generate_series(1, {USERS}) AS g
+    """,
+    f"""
+    INSERT INTO applications (user_id, status, admin_message_ids, created_at)
+    SELECT u.id,
+           CASE WHEN a % 100 = 0 THEN 'PENDING'
+                WHEN a % 100 < 5 THEN 'REJECTED'
+                ELSE 'APPROVED' END::applicationstatus,
+           '{{}}',
+           now() - (a || ' minutes')::interval
+    FROM users AS u, generate_series(1, {APPLICATIONS_PER_USER}) AS n,
+         LATERAL (SELECT u.id * {APPLICATIONS_PER_USER} + n AS a) AS s
+    WHERE u.telegram_id < 0
+    """,
+    f"""
+    INSERT INTO photos (file_id, application_id)
+    SELECT 'photo_' || a.id || '_' || n, a.id
+    FROM applications AS a JOIN users AS u ON u.id = a.user_id,
+         generate_series(1, {PHOTOS_PER_APPLICATION}) AS n
+    WHERE u.telegram_id < 0
+    """,
+    f"""
+    INSERT INTO videos (file_id, application_id)
+    SELECT 'video_' || a.id, a.id
+    FROM applications AS a JOIN users AS u ON u.id = a.user_id
+    WHERE u.telegram_id < 0 AND a.id % {VIDEO_EVERY} = 0
+    """,
+    f"""
+    INSERT INTO bankdebts (bank_name, total_amount, application_id)
+    SELECT 'Банк ' || n, 1000 * n, a.id
+    FROM applications AS a JOIN users AS u ON u.id = a.user_id,
+         generate_series(1, {DEBTS_PER_APPLICATION}) AS n
+    WHERE u.telegram_id < 0
+    """,
+    "ANALYZE users, applications, photos, videos, bankdebts",
+]
+
+
+def build_queries(application_ids: List[int]) -> List[Tuple[str, Select, str]]:
+    """
+    Возвращает проверяемые запросы: (описание, запрос, индекс, который должен быть в плане).
+
+    Args:
+        application_ids (List[int]): ID созданных заявок для запросов дочерних записей.
+    """
+    return [
+        (
+            "последняя заявка пользователя (ApplicationDAO.last_for_user)",
+            select(Application)
+            .join(User, Application.user_id == User.id)
+            .where(User.telegram_id == -1)
+            .order_by(Application.id.desc())
+            .limit(1),
+            "ix_applications_user_id_id",
+        ),
+        (
+            "очередь ожидающих заявок",
+            select(Application)
+            .where(Application.status == ApplicationStatus.PENDING)
+            .order_by(Application.created_at)
+            .limit(50),
+            "ix_applications_pending",
+        ),
+        (
+            "отклоненные заявки",
+            select(Application).where(Application.status == ApplicationStatus.REJECTED),
+            "ix_applications_status",
+        ),
+        (
+            "последние заявки по дате создания",
+            select(Application).order_by(Application.created_at.desc()).limit(20),
+            "ix_applications_created_at",
+        ),
+        (
+            "фото заявок (selectinload)",
+            select(Photo).where(Photo.application_id.in_(application_ids)),
+            "ix_photos_application_id",
+        ),
+        (
+            "видео заявок (selectinload)",
+            select(Video).where(Video.application_id.in_(application_ids)),
+            "ix_videos_application_id",
+        ),
+        (
+            "задолженности заявок (selectinload)",
+            select(BankDebt).where(BankDebt.application_id.in_(application_ids)),
+            "ix_bankdebts_application_id",
+        ),
+    ]
+
+
+def to_sql(query: Select) -> str:
+    """Возвращает SQL запроса с подставленными значениями."""
+    return str(
+        query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+async def seed(session: AsyncSession) -> List[int]:
+    """Заполняет таблицы, обновляет статистику и возвращает ID последних заявок."""
+    for statement in SEED:
+        await session.execute(text(statement))
+    result = await session.execute(
+        select(Application.id).order_by(Application.id.desc()).limit(3)
+    )
+    return list(result.scalars())
+
+
+async def main() -> int:
+    """Печатает планы запросов и возвращает количество запросов, не прошедших проверку."""
+    failed = 0
+    async with async_session() as session:
+        try:
+            application_ids = await seed(session)
+            for name, query, index in build_queries(application_ids):
+                result = await session.execute(text(f"EXPLAIN {to_sql(query)}"))
+                plan = "\n".join(row[0] for row in result)
+                ok = index in plan and "Seq Scan" not in plan
+                failed += not ok
+                print(
+                    f"{'OK  ' if ok else 'FAIL'} {name}: ожидается {index} "
+                    f"без Seq Scan\n{plan}\n"
+                )
+        finally:
+            await session.rollback()
+    return failed
+
+
+if __name__ == "__main__":
+    logger.remove()
+    sys.exit(1 if asyncio.run(main()) else 0)
@@ -0,0 +1,204 @@
+"""
+Сравнение FSM-хранилищ на одной анкете: запросы к Redis, отправленные байты и
+объем данных.
+
+Одна и та же анкета (3 шага, 30 фото, 3 банка с суммами) проходит через
+`RedisStorage` aiogram так, как раньше работали обработчики (get_data +
+update_data целиком), и через `CachedStorage(HashRedisStorage)` так, как
+работают сейчас (пачка записей на апдейт, `append_list`). Затем проверяется,
+что обе анкеты читаются одинаково.
+
+Запуск из корня проекта:
+    python -m scripts.fsm_storage_check [REDIS_URL]
+
+Без адреса используется fakeredis (`pip install fakeredis`). На настоящем Redis
+ключи пишутся с префиксом `fsm_check` и удаляются в конце.
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from loguru import logger
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from bot.utils.fsm_storage import CachedStorage, HashRedisStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+KEY_BUILDER = DefaultKeyBuilder(prefix="fsm_check", with_destiny=True)
+PHOTOS = [f"AgACAgIAAxkBAAI{i:04d}" + "x" * 60 for i in range(30)]
+BANKS = 3
+
+
+class RedisCounter:
+    """Считает обращения к Redis: отдельные команды и pipeline (по одному на запрос)."""
+
+    def __init__(self) -> None:
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self._pipeline_execute = Pipeline.execute
+
+    @staticmethod
+    def _size(args: Iterable[Any]) -> int:
+        return sum(
+            len(arg) if isinstance(arg, (bytes, str)) else len(str(arg)) for arg in args
+        )
+
+    def install(self, redis: Redis) -> None:
+        """Подменяет отправку команд клиента `redis` и всех pipeline."""
+        counter = self
+        execute_command = redis.execute_command
+        pipeline_execute = self._pipeline_execute
+
+        async def counted_command(*args: Any, **options: Any) -> Any:
+            counter.round_trips += 1
+            counter.bytes_sent += counter._size(args)
+            return await execute_command(*args, **options)
+
+        async def counted_pipeline(pipe: Pipeline, *args: Any, **kwargs: Any) -> Any:
+            counter.round_trips += 1
+            for command_args, _ in pipe.command_stack:
+                counter.bytes_sent += counter._size(command_args)
+            return await pipeline_execute(pipe, *args, **kwargs)
+
+        redis.execute_command = counted_command
+        Pipeline.execute = counted_pipeline
+
+    def uninstall(self, redis: Redis) -> None:
+        """Возвращает исходную отправку команд клиента `redis` и pipeline."""
+        del redis.execute_command
+        Pipeline.execute = self._pipeline_execute
+
+
+async def fill_plain(storage: BaseStorage) -> None:
+    """Анкета так, как её заполняли обработчики до `HashRedisStorage`."""
+    await storage.set_state(KEY, "ApplicationForm:approve_work")
+    await storage.update_data(KEY, {"approve_work": True})
+    await storage.set_state(KEY, "ApplicationForm:owner")
+    await storage.update_data(KEY, {"owner": True})
+    await storage.set_state(KEY, "ApplicationForm:photo")
+    for photo in PHOTOS:
+        data = await storage.get_data(KEY)
+        photos = data.get("photos", []) + [photo]
+        await storage.update_data(KEY, {"photos": photos, "question_asked": True})
+    for i in range(BANKS):
+        data = await storage.get_data(KEY)
+        banks = data.get("bank_name", []) + [f"Банк {i}"]
+        await storage.update_data(KEY, {"bank_name": banks})
+        await storage.set_state(KEY, "ApplicationForm:total_amount")
+        data = await storage.get_data(KEY)
+        amounts = data.get("total_amount", []) + [1000.5 * i]
+        await storage.update_data(KEY, {"total_amount": amounts})
+        await storage.set_state(KEY, "ApplicationForm:new_bank")
+
+
+async def fill_cached(storage: CachedStorage) -> None:
+    """Та же анкета так, как её заполняют обработчики сейчас: пачка на апдейт."""
+
+    async def update(step: Callable[[], Awaitable[None]]) -> None:
+        async with storage.batch():
+            await step()
+
+    async def approve_work() -> None:
+        await storage.update_data(KEY, {"approve_work": True})
+        await storage.set_state(KEY, "ApplicationForm:owner")
+
+    async def owner() -> None:
+        await storage.update_data(KEY, {"owner": True})
+        await storage.set_state(KEY, "ApplicationForm:photo")
+
+    await update(lambda: storage.set_state(KEY, "ApplicationForm:approve_work"))
+    await update(approve_work)
+    await update(owner)
+    for photo in PHOTOS:
+
+        async def add_photo(photo: str = photo) -> None:
+            data = await storage.get_data(KEY)
+            await storage.append_list(KEY, "photos", [photo])
+            if not data.get("question_asked"):
+                await storage.update_data(KEY, {"question_asked": True})
+
+        await update(add_photo)
+    for i in range(BANKS):
+
+        async def add_bank(i: int = i) -> None:
+            await storage.append_list(KEY, "bank_name", [f"Банк {i}"])
+            await storage.set_state(KEY, "ApplicationForm:total_amount")
+
+        async def add_amount(i: int = i) -> None:
+            await storage.append_list(KEY, "total_amount", [1000.5 * i])
+            await storage.set_state(KEY, "ApplicationForm:new_bank")
+
+        await update(add_bank)
+        await update(add_amount)
+
+
+async def stored_bytes(redis: Redis) -> int:
+    """Возвращает объем ключей и значений анкеты в Redis."""
+    size = 0
+    async for key in redis.scan_iter(match=f"{KEY_BUILDER.prefix}:*"):
+        if await redis.type(key) == b"hash":
+            fields = await redis.hgetall(key)
+            size += sum(len(name) + len(value) for name, value in fields.items())
+        else:
+            size += len(await redis.get(key))
+    return size
+
+
+async def clear(redis: Redis) -> None:
+    """Удаляет ключи анкеты."""
+    keys = [key async for key in redis.scan_iter(match=f"{KEY_BUILDER.prefix}:*")]
+    if keys:
+        await redis.delete(*keys)
+
+
+def connect(url: str) -> Redis:
+    """Возвращает клиент Redis по адресу или fakeredis, если адрес не задан."""
+    if url:
+        return Redis.from_url(url)
+    from fakeredis.aioredis import FakeRedis
+
+    return FakeRedis()
+
+
+async def main(url: str) -> None:
+    """Заполняет анкету в обоих хранилищах и печатает результаты."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in ("RedisStorage", "CachedStorage(HashRedisStorage)"):
+        redis = connect(url)
+        await clear(redis)
+        counter = RedisCounter()
+        counter.install(redis)
+        started = time.perf_counter()
+        if name == "RedisStorage":
+            storage = RedisStorage(redis, key_builder=KEY_BUILDER)
+            await fill_plain(storage)
+        else:
+            storage = CachedStorage(HashRedisStorage(redis, key_builder=KEY_BUILDER))
+            await fill_cached(storage)
+        elapsed = time.perf_counter() - started
+        counter.uninstall(redis)
+        size = await stored_bytes(redis)
+        print(
+            f"{name}: {counter.round_trips} запросов, "
+            f"{counter.bytes_sent / 1024:.1f} KB отправлено, {size} B хранится, "
+            f"{elapsed * 1000:.1f} мс"
+        )
+        # Читаем заново из Redis, минуя кэш процесса
+        if isinstance(storage, CachedStorage):
+            storage = storage.backend
+        results[name] = await storage.get_data(KEY)
+        await clear(redis)
+        await redis.aclose()
+
+    plain, cached = results.values()
+    print("Данные совпадают" if plain == cached else f"Данные различаются: {results}")
+
+
+if __name__ == "__main__":
+    logger.remove()
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else ""))